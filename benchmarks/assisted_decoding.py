@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Assisted Decoding Benchmark
+
+Generates the same chapters with the target model alone and with a draft
+model assisting it, and reports chapter latency, tokens/sec, the speedup and
+the draft acceptance rate. Defaults to gpt2-medium drafted by distilgpt2,
+which are downloaded on first use; pass local paths to run offline.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.story_generator import StoryGenerator
+from src.telemetry import configure_telemetry
+from src.utils import get_sample_prompts
+
+
+def run_chapters(story_gen, prompts, length):
+    """
+    Generate one chapter per prompt.
+
+    Returns:
+        dict: Chapter count, new tokens, seconds and mean acceptance rate
+    """
+    import torch
+
+    tokens = 0
+    seconds = 0.0
+    acceptance = []
+    tokenizer = story_gen.text_generator.tokenizer
+    for i, prompt in enumerate(prompts):
+        torch.manual_seed(i)
+        start = time.perf_counter()
+        text = story_gen.generate_chapter(prompt, max_length=length)
+        seconds += time.perf_counter() - start
+        tokens += len(tokenizer(text)['input_ids'])
+        if story_gen.last_assisted_stats is not None:
+            acceptance.append(story_gen.last_assisted_stats['acceptance_rate'])
+    return {
+        'chapters': len(prompts),
+        'tokens': tokens,
+        'seconds': seconds,
+        'seconds_per_chapter': seconds / len(prompts),
+        'tokens_per_second': tokens / seconds if seconds else 0.0,
+        'acceptance_rate': sum(acceptance) / len(acceptance) if acceptance else None
+    }
+
+
+def main():
+    """Compare plain and assisted decoding and print the speedup."""
+    parser = argparse.ArgumentParser(description="Measure assisted decoding speedup")
+    parser.add_argument('--model', default='gpt2-medium', help='Target model name or local path')
+    parser.add_argument('--draft-model', default='distilgpt2', help='Draft model name or local path')
+    parser.add_argument('--prompts', type=int, default=4, help='Number of chapters per mode')
+    parser.add_argument('--length', type=int, default=200, help='Chapter length in tokens')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    configure_telemetry([])
+    sample_prompts = get_sample_prompts()
+    prompts = [sample_prompts[i % len(sample_prompts)] for i in range(args.prompts)]
+
+    plain = StoryGenerator(model_name=args.model)
+    assisted = StoryGenerator(model_name=args.model, draft_model_name=args.draft_model)
+    plain.load_model()
+    assisted.load_model()
+
+    # Warm-up, so one-off allocation costs count for neither mode
+    plain.generate_chapter(prompts[0], max_length=32)
+    assisted.generate_chapter(prompts[0], max_length=32)
+
+    results = {'plain': run_chapters(plain, prompts, args.length),
+               'assisted': run_chapters(assisted, prompts, args.length)}
+    speedup = results['plain']['seconds_per_chapter'] / results['assisted']['seconds_per_chapter']
+
+    print(f"\n{'mode':<10} {'s/chapter':>10} {'tokens/sec':>11} {'acceptance':>11}")
+    for mode, result in results.items():
+        rate = result['acceptance_rate']
+        rate_text = f"{rate:.0%}" if rate is not None else "-"
+        print(f"{mode:<10} {result['seconds_per_chapter']:>10.2f} {result['tokens_per_second']:>11.1f} "
+              f"{rate_text:>11}")
+    print(f"\n⚡ Speedup: {speedup:.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'model': args.model, 'draft_model': args.draft_model, 'speedup': speedup,
+                       'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Batch Throughput Benchmark
+
+Measures text generation throughput (new tokens per second) of
+StoryGenerator.generate_chapters for a range of batch sizes, so the
+batch size for --batch-file runs can be chosen per host.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import StoryGenerator
+from src.utils import get_sample_prompts
+
+
+def main():
+    """Run the batch size sweep and print a tokens/sec table."""
+    parser = argparse.ArgumentParser(description="Measure tokens/sec vs. batch size")
+    parser.add_argument('--model', default='gpt2-medium', help='Text model name or local path')
+    parser.add_argument('--batch-sizes', default='1,2,4,8,16', help='Comma-separated batch sizes')
+    parser.add_argument('--prompts', type=int, default=32, help='Number of prompts per run')
+    parser.add_argument('--length', type=int, default=100, help='Chapter length in tokens')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    sample_prompts = get_sample_prompts()
+    prompts = [sample_prompts[i % len(sample_prompts)] for i in range(args.prompts)]
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    story_gen = StoryGenerator(model_name=args.model)
+
+    # Warm-up run so one-off allocation costs don't skew the first size
+    story_gen.generate_chapters(prompts[:1], max_length=args.length, batch_size=1)
+
+    results = []
+    print(f"\n{'batch':>6} {'tokens':>8} {'seconds':>9} {'tokens/sec':>11}")
+    for batch_size in batch_sizes:
+        story_gen.generate_chapters(prompts, max_length=args.length, batch_size=batch_size)
+        stats = story_gen.last_batch_stats
+        results.append(stats)
+        print(f"{batch_size:>6} {stats['new_tokens']:>8} {stats['seconds']:>9.2f} "
+              f"{stats['tokens_per_second']:>11.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'model': args.model, 'length': args.length, 'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
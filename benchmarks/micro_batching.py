@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching Benchmark
+
+Measures chapters/sec when many threads call StoryGenerator.generate_chapter
+at the same time, with and without the micro-batching scheduler. Uses the
+tiny local GPT-2 by default, so it runs offline.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.tiny_models import CORPUS, build_tiny_gpt2
+from src.story_generator import StoryGenerator
+from src.telemetry import configure_telemetry
+
+
+def run_clients(story_gen, clients, chapters_per_client, length):
+    """
+    Call generate_chapter from several threads at once.
+
+    Returns:
+        float: Wall time in seconds
+    """
+    barrier = threading.Barrier(clients)
+
+    def client(index):
+        barrier.wait()
+        for i in range(chapters_per_client):
+            story_gen.generate_chapter(CORPUS[(index + i) % len(CORPUS)], max_length=length)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    """Compare concurrent chapter throughput with and without micro-batching."""
+    parser = argparse.ArgumentParser(description="Measure concurrent chapters/sec with micro-batching")
+    parser.add_argument('--model', help='Text model name or local path (default: tiny local GPT-2)')
+    parser.add_argument('--clients', type=int, default=8, help='Number of concurrent threads')
+    parser.add_argument('--chapters', type=int, default=4, help='Chapters per thread')
+    parser.add_argument('--length', type=int, default=64, help='Chapter length in tokens')
+    parser.add_argument('--window-ms', type=float, default=10.0, help='Batching window in milliseconds')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    configure_telemetry([])
+    model = args.model or build_tiny_gpt2(os.path.join(tempfile.gettempdir(), 'story-benchmarks', 'tiny-gpt2'))
+    story_gen = StoryGenerator(model_name=model)
+    story_gen.load_model()
+    story_gen.generate_chapter(CORPUS[0], max_length=args.length)
+
+    total = args.clients * args.chapters
+    results = []
+    print(f"\n{'mode':<16} {'seconds':>9} {'chapters/sec':>13} {'mean batch':>11}")
+
+    seconds = run_clients(story_gen, args.clients, args.chapters, args.length)
+    results.append({'mode': 'unbatched', 'seconds': seconds, 'chapters_per_second': total / seconds})
+    print(f"{'unbatched':<16} {seconds:>9.2f} {total / seconds:>13.1f} {1.0:>11.1f}")
+
+    scheduler = story_gen.enable_micro_batching(window=args.window_ms / 1000, max_batch_size=args.clients)
+    seconds = run_clients(story_gen, args.clients, args.chapters, args.length)
+    stats = scheduler.stats()
+    story_gen.disable_micro_batching()
+    results.append({'mode': 'micro-batched', 'seconds': seconds, 'chapters_per_second': total / seconds,
+                    'mean_batch_size': stats['mean_batch_size']})
+    print(f"{'micro-batched':<16} {seconds:>9.2f} {total / seconds:>13.1f} {stats['mean_batch_size']:>11.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'model': model, 'clients': args.clients, 'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Precision Benchmark
+
+Compares the fp32, bf16 and int8-dynamic precision modes of StoryGenerator:
+decoding tokens/sec, model memory footprint and perplexity on a fixed local
+text sample, relative to fp32. Uses the tiny local GPT-2 by default, so it
+runs offline; pass --model gpt2-medium for numbers that mean something.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.tiny_models import CORPUS, build_tiny_gpt2
+from src.model_registry import estimate_model_size, get_registry
+from src.story_generator import PRECISIONS, StoryGenerator
+from src.telemetry import configure_telemetry
+
+# Fixed evaluation text, so perplexities are comparable between runs
+SAMPLE_TEXT = " ".join(CORPUS)
+
+
+def perplexity(story_gen, text):
+    """
+    Compute the model's perplexity on a text.
+
+    Args:
+        story_gen (StoryGenerator): Generator with a loaded model
+        text (str): Evaluation text
+
+    Returns:
+        float: Perplexity
+    """
+    import torch
+
+    model = story_gen.text_generator.model
+    tokenizer = story_gen.text_generator.tokenizer
+    inputs = tokenizer(text, return_tensors='pt').to(model.device)
+    with torch.no_grad():
+        loss = model(**inputs, labels=inputs['input_ids']).loss
+    return math.exp(float(loss))
+
+
+def decode_speed(story_gen, length, repeats):
+    """
+    Measure decoding speed.
+
+    Returns:
+        float: Generated tokens per second
+    """
+    tokens = 0
+    seconds = 0.0
+    for i in range(repeats):
+        for _ in story_gen.generate_chapter_stream(CORPUS[i % len(CORPUS)], max_length=length):
+            pass
+        tokens += story_gen.last_stream_stats['tokens']
+        seconds += story_gen.last_stream_stats['seconds']
+    return tokens / seconds if seconds else 0.0
+
+
+def main():
+    """Run every precision mode and print a comparison table."""
+    parser = argparse.ArgumentParser(description="Compare text model precision modes")
+    parser.add_argument('--model', help='Text model name or local path (default: tiny local GPT-2)')
+    parser.add_argument('--precisions', default=','.join(PRECISIONS), help='Comma-separated precision modes')
+    parser.add_argument('--length', type=int, default=128, help='Chapter length in tokens')
+    parser.add_argument('--repeats', type=int, default=3, help='Chapters generated per mode')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    import torch
+
+    configure_telemetry([])
+    model = args.model or build_tiny_gpt2(os.path.join(tempfile.gettempdir(), 'story-benchmarks', 'tiny-gpt2'))
+
+    results = []
+    baseline = None
+    print(f"\n{'precision':<14} {'tokens/sec':>11} {'memory MB':>10} {'perplexity':>11} {'delta':>8}")
+    for precision in args.precisions.split(','):
+        torch.manual_seed(0)
+        story_gen = StoryGenerator(model_name=model, precision=precision)
+        story_gen.load_model()
+        story_gen.generate_chapter(CORPUS[0], max_length=32)
+
+        result = {
+            'precision': precision,
+            'tokens_per_second': decode_speed(story_gen, args.length, args.repeats),
+            'memory_bytes': estimate_model_size(story_gen.text_generator),
+            'perplexity': perplexity(story_gen, SAMPLE_TEXT)
+        }
+        if baseline is None:
+            baseline = result['perplexity']
+        result['perplexity_delta'] = result['perplexity'] / baseline - 1
+        results.append(result)
+        print(f"{precision:<14} {result['tokens_per_second']:>11.1f} {result['memory_bytes'] / 2**20:>10.1f} "
+              f"{result['perplexity']:>11.2f} {result['perplexity_delta']:>+8.2%}")
+
+        # Free this mode's copy before loading the next
+        story_gen.close()
+        get_registry().evict_idle()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'model': model, 'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
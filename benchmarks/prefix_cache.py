@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Prompt Prefix Cache Benchmark
+
+Measures generate_chapter latency for prompts that share a long common
+beginning (a story setting followed by a different opening line each
+time), with and without the prefix cache. Uses the tiny local GPT-2 by
+default, so it runs offline; pass --model for a realistic prefill cost.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.tiny_models import CORPUS, build_tiny_gpt2
+from src.story_generator import StoryGenerator
+from src.telemetry import configure_telemetry
+
+
+def run_requests(story_gen, prompts, new_tokens):
+    """
+    Generate one chapter per prompt, one after another.
+
+    Returns:
+        float: Mean seconds per chapter
+    """
+    tokenizer = story_gen.text_generator.tokenizer
+    start = time.perf_counter()
+    for i, prompt in enumerate(prompts):
+        prompt_length = len(tokenizer(prompt)['input_ids'])
+        story_gen.generate_chapter(prompt, max_length=prompt_length + new_tokens, seed=i)
+    return (time.perf_counter() - start) / len(prompts)
+
+
+def main():
+    """Compare chapter latency with and without the prefix cache."""
+    parser = argparse.ArgumentParser(description="Measure chapter latency with the prompt prefix cache")
+    parser.add_argument('--model', help='Text model name or local path (default: tiny local GPT-2)')
+    parser.add_argument('--prefix-sentences', type=int, default=16,
+                        help='Sentences in the shared beginning of every prompt')
+    parser.add_argument('--requests', type=int, default=16, help='Chapters per mode')
+    parser.add_argument('--new-tokens', type=int, default=8, help='Tokens generated per chapter')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    configure_telemetry([])
+    model = args.model or build_tiny_gpt2(os.path.join(tempfile.gettempdir(), 'story-benchmarks', 'tiny-gpt2'))
+    story_gen = StoryGenerator(model_name=model)
+    story_gen.load_model()
+
+    setting = " ".join(CORPUS[i % len(CORPUS)] for i in range(args.prefix_sentences))
+    prompts = [f"{setting} {CORPUS[i % len(CORPUS)]}" for i in range(args.requests)]
+    prompt_tokens = len(story_gen.text_generator.tokenizer(prompts[0])['input_ids'])
+    story_gen.generate_chapter(prompts[0], max_length=prompt_tokens + args.new_tokens)
+
+    results = []
+    print(f"\nPrompts of ~{prompt_tokens} tokens, {args.new_tokens} new tokens each")
+    print(f"{'mode':<14} {'ms/chapter':>11} {'reused tokens':>14}")
+
+    seconds = run_requests(story_gen, prompts, args.new_tokens)
+    results.append({'mode': 'no cache', 'seconds_per_chapter': seconds})
+    print(f"{'no cache':<14} {seconds * 1000:>11.1f} {0:>14}")
+
+    prefix_cache = story_gen.enable_prefix_cache()
+    seconds = run_requests(story_gen, prompts, args.new_tokens)
+    stats = prefix_cache.stats()
+    story_gen.disable_prefix_cache()
+    results.append({'mode': 'prefix cache', 'seconds_per_chapter': seconds, **stats})
+    print(f"{'prefix cache':<14} {seconds * 1000:>11.1f} {stats['reused_tokens']:>14}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'model': model, 'prompt_tokens': prompt_tokens, 'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Suite
+
+Benchmarks the text, scene extraction and image paths of the story
+generator against tiny randomly initialised models built locally, so it
+runs without network access or multi-GB downloads. Each group runs in
+its own process so peak memory is measured per group.
+
+Results are written as JSON and compared against a stored baseline; the
+run fails if any metric regressed by more than the threshold.
+
+Usage:
+  python benchmarks/run_benchmarks.py                      # Run and compare
+  python benchmarks/run_benchmarks.py --update-baseline    # Store a new baseline
+  python benchmarks/run_benchmarks.py --groups text,scenes # Run some groups only
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..'))
+
+GROUPS = ['text', 'scenes', 'image']
+
+# Metrics where a larger value is an improvement; all others are times or sizes
+HIGHER_IS_BETTER = {
+    'tokens_per_second',
+    'batch_tokens_per_second',
+    'chapters_per_second',
+    'images_per_second',
+    'draft_images_per_second',
+}
+
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the generators' progress output while timing."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_text(models_dir, repeats):
+    """Measure text model load time, decoding speed and complete-story time."""
+    import torch
+    from benchmarks.tiny_models import CORPUS, build_tiny_gpt2
+    from src.story_generator import StoryGenerator
+
+    model_path = build_tiny_gpt2(os.path.join(models_dir, 'tiny-gpt2'))
+    torch.manual_seed(0)
+
+    story_gen = StoryGenerator(model_name=model_path)
+    start = time.perf_counter()
+    with quiet():
+        story_gen.load_model()
+    load_seconds = time.perf_counter() - start
+
+    prompt = CORPUS[0]
+    tokens = 0
+    seconds = 0.0
+    first_token = []
+    with quiet():
+        for _ in range(repeats):
+            for _ in story_gen.generate_chapter_stream(prompt, max_length=128):
+                pass
+            stats = story_gen.last_stream_stats
+            tokens += stats['tokens']
+            seconds += stats['seconds']
+            if stats['time_to_first_token'] is not None:
+                first_token.append(stats['time_to_first_token'])
+
+    prompts = [CORPUS[i % len(CORPUS)] for i in range(8)]
+    with quiet():
+        story_gen.generate_chapters(prompts, max_length=128, batch_size=4)
+    batch_stats = story_gen.last_batch_stats
+
+    start = time.perf_counter()
+    with quiet():
+        story_gen.generate_complete_story(prompt, num_chapters=3, chapter_length=96)
+    story_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with quiet():
+        story_gen.generate_complete_story(prompt, num_chapters=3, chapter_length=96, continuation="kv_cache")
+    story_kv_seconds = time.perf_counter() - start
+
+    return {
+        'load_seconds': load_seconds,
+        'tokens_per_second': tokens / seconds if seconds else 0.0,
+        'time_to_first_token_seconds': sum(first_token) / len(first_token) if first_token else None,
+        'batch_tokens_per_second': batch_stats['tokens_per_second'],
+        'complete_story_seconds': story_seconds,
+        'complete_story_kv_cache_seconds': story_kv_seconds,
+    }
+
+
+def bench_scenes(models_dir, repeats):
+    """Measure scene extraction throughput over a synthetic story corpus."""
+    from benchmarks.tiny_models import CORPUS
+    from src.story_generator import StoryGenerator
+
+    # Extraction does not touch the model, so it is never loaded here
+    story_gen = StoryGenerator(model_name=os.path.join(models_dir, 'tiny-gpt2'))
+    chapters = [" ".join(CORPUS[i:] + CORPUS[:i]) * 5 for i in range(len(CORPUS))] * 25
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for chapter in chapters:
+            story_gen.extract_scene_descriptions(chapter)
+    seconds = time.perf_counter() - start
+
+    return {
+        'chapters_per_second': len(chapters) * repeats / seconds if seconds else 0.0,
+    }
+
+
+def bench_image(models_dir, repeats):
+    """Measure image model load time and diffusion throughput."""
+    import torch
+    from benchmarks.tiny_models import CORPUS, build_tiny_stable_diffusion
+    from src.image_generator import ImageGenerator
+    from src.model_resolver import ModelResolver
+
+    model_path = build_tiny_stable_diffusion(os.path.join(models_dir, 'tiny-sd'))
+    torch.manual_seed(0)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        image_gen = ImageGenerator(
+            model_id=model_path,
+            image_cache=False,
+            resolver=ModelResolver(manifest_path=os.path.join(scratch, 'models.json'))
+        )
+        start = time.perf_counter()
+        with quiet():
+            image_gen.load_model()
+        load_seconds = time.perf_counter() - start
+        if not image_gen.model_loaded:
+            raise RuntimeError("Tiny Stable Diffusion pipeline failed to load")
+        image_gen.pipeline.set_progress_bar_config(disable=True)
+
+        scenes = CORPUS[:2]
+        start = time.perf_counter()
+        with quiet():
+            for _ in range(repeats):
+                image_gen.generate_story_images(scenes, display=False)
+        seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with quiet():
+            for _ in range(repeats):
+                image_gen.generate_story_images(scenes, display=False, quality='draft')
+        draft_seconds = time.perf_counter() - start
+
+    return {
+        'load_seconds': load_seconds,
+        'images_per_second': len(scenes) * repeats / seconds if seconds else 0.0,
+        'draft_images_per_second': len(scenes) * repeats / draft_seconds if draft_seconds else 0.0,
+    }
+
+
+BENCHMARKS = {
+    'text': bench_text,
+    'scenes': bench_scenes,
+    'image': bench_image,
+}
+
+
+def run_group_in_subprocess(group, models_dir, repeats):
+    """
+    Run one benchmark group in a fresh interpreter.
+
+    Args:
+        group (str): Benchmark group name
+        models_dir (str): Directory holding (or receiving) the tiny models
+        repeats (int): Repetitions per measurement
+
+    Returns:
+        dict: Metrics reported by the group
+    """
+    env = dict(os.environ, HF_HUB_OFFLINE='1', TRANSFORMERS_OFFLINE='1', TOKENIZERS_PARALLELISM='false')
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', group,
+         '--models-dir', models_dir, '--repeats', str(repeats)],
+        cwd=os.path.join(BENCHMARK_DIR, '..'),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"Benchmark group '{group}' failed:\n{output.stderr[-2000:]}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare metrics against a baseline.
+
+    Args:
+        results (dict): Metrics from this run
+        baseline (dict): Metrics from the baseline run
+        threshold (float): Allowed relative regression (0.2 = 20%)
+
+    Returns:
+        list: Descriptions of the metrics that regressed
+    """
+    regressions = []
+    print(f"\n{'metric':<42} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, base in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None or not base:
+            continue
+        change = (current - base) / base
+        regressed = change < -threshold if name.split('.')[-1] in HIGHER_IS_BETTER else change > threshold
+        marker = "  ❌" if regressed else ""
+        print(f"{name:<42} {base:>10.4g} {current:>10.4g} {change:>+7.0%}{marker}")
+        if regressed:
+            regressions.append(f"{name}: {base:.4g} -> {current:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    """Run the benchmark groups, write JSON results and check the baseline."""
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument('--groups', default=','.join(GROUPS), help='Comma-separated groups to run')
+    parser.add_argument('--repeats', type=int, default=3, help='Repetitions per measurement')
+    parser.add_argument('--models-dir', default=os.path.join(BENCHMARK_DIR, '.models'),
+                        help='Where the tiny models are built and cached')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'),
+                        help='Where to write the JSON results')
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'),
+                        help='Baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative regression per metric (default: 0.2)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--worker', choices=GROUPS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        metrics = BENCHMARKS[args.worker](args.models_dir, args.repeats)
+        metrics['peak_rss_bytes'] = peak_rss_bytes()
+        print(json.dumps(metrics))
+        return 0
+
+    import torch
+
+    metrics = {}
+    for group in args.groups.split(','):
+        print(f"⏱️ Running {group} benchmarks...")
+        for name, value in run_group_in_subprocess(group, args.models_dir, args.repeats).items():
+            if value is not None:
+                metrics[f"{group}.{name}"] = value
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'torch_threads': torch.get_num_threads(),
+        'metrics': metrics,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"📁 Results saved to: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️ No baseline found; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)['metrics']
+
+    regressions = compare(metrics, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
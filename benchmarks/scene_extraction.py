@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Scene Extraction Benchmark
+
+Measures scene extraction throughput over a large synthetic corpus of
+archived chapters, comparing the original per-sentence keyword loop with
+SceneExtractor. Needs no models, so it runs anywhere in seconds.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.tiny_models import CORPUS
+from src.scene_extractor import SceneExtractor
+
+# Sentences without visual keywords, so chapters are not all scenery
+FILLER = [
+    "He thought about what she had said for a long time.",
+    "Nobody knew the answer, and nobody wanted to ask.",
+    "They talked until it was late, then went to bed.",
+    "Dr. Reyes wrote another letter to the council!",
+    "Was it really worth it, after everything?",
+    "\"We leave at first light,\" the captain said quietly.",
+    "It had been three years since the last message arrived from the capital.",
+    "Everyone agreed that the plan was reckless, but nobody had a better one.",
+]
+
+LEGACY_KEYWORDS = [
+    'looked', 'saw', 'appeared', 'stood', 'walked', 'dark', 'bright',
+    'beautiful', 'scary', 'ancient', 'mysterious', 'golden', 'silver',
+    'forest', 'castle', 'mountain', 'ocean', 'sky', 'moon', 'sun'
+]
+
+
+def legacy_extract(text):
+    """The original extraction: split on '.', test every keyword per sentence, keep the first two."""
+    scene_descriptions = []
+    for sentence in text.split('.'):
+        sentence = sentence.strip()
+        if len(sentence) > 20 and any(keyword in sentence.lower() for keyword in LEGACY_KEYWORDS):
+            clean_sentence = re.sub(r'[^\w\s,.-]', '', sentence)
+            if len(clean_sentence) > 10:
+                scene_descriptions.append(clean_sentence)
+    return scene_descriptions[:2]
+
+
+def build_corpus(chapters, sentences_per_chapter, seed=0):
+    """
+    Build a reproducible corpus of chapters mixing visual and filler sentences.
+
+    Args:
+        chapters (int): Number of chapters
+        sentences_per_chapter (int): Sentences in each chapter
+        seed (int): Random seed
+
+    Returns:
+        list: Chapter texts
+    """
+    rng = random.Random(seed)
+    # Most prose in archived stories is not scenery
+    pool = CORPUS + FILLER * 3
+    corpus = []
+    for _ in range(chapters):
+        sentences = [rng.choice(pool) for _ in range(sentences_per_chapter)]
+        paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        corpus.append("\n\n".join(paragraphs))
+    return corpus
+
+
+def time_run(function, repeats):
+    """Return the best wall time of several runs of a function."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Run the extraction benchmark and print chapters/sec per implementation."""
+    parser = argparse.ArgumentParser(description="Measure scene extraction throughput")
+    parser.add_argument('--chapters', type=int, default=20000, help='Number of chapters in the corpus')
+    parser.add_argument('--sentences', type=int, default=30, help='Sentences per chapter')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per implementation (best is kept)')
+    parser.add_argument('--json', type=str, help='Optional path to write results as JSON')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.chapters, args.sentences)
+    size_mb = sum(len(chapter) for chapter in corpus) / 2**20
+    print(f"📚 Corpus: {len(corpus)} chapters, {size_mb:.1f} MB")
+
+    extractor = SceneExtractor()
+    runs = {
+        'legacy loop': lambda: [legacy_extract(chapter) for chapter in corpus],
+        'SceneExtractor.extract': lambda: [extractor.extract(chapter) for chapter in corpus],
+    }
+
+    results = []
+    print(f"\n{'implementation':<30} {'seconds':>9} {'chapters/sec':>13}")
+    for name, run in runs.items():
+        seconds = time_run(run, args.repeats)
+        rate = len(corpus) / seconds if seconds else 0.0
+        results.append({'implementation': name, 'seconds': seconds, 'chapters_per_second': rate})
+        print(f"{name:<30} {seconds:>9.2f} {rate:>13.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'chapters': len(corpus), 'sentences': args.sentences, 'results': results}, f, indent=2)
+        print(f"\n📁 Results saved to: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
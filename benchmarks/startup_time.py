@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+
+Measures how long quick CLI commands take to start and checks that
+importing the package does not load heavy dependencies. Exits with a
+non-zero status if a command is slower than the allowed budget or a
+heavy module is imported eagerly, so it can guard against regressions.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+HEAVY_MODULES = ['torch', 'transformers', 'diffusers', 'matplotlib', 'ipywidgets', 'IPython']
+
+COMMANDS = {
+    'import src': [sys.executable, '-c', 'import src, src.utils'],
+    'main.py --samples': [sys.executable, 'main.py', '--samples'],
+    'main.py --tips': [sys.executable, 'main.py', '--tips'],
+}
+
+
+def time_command(command, runs):
+    """
+    Run a command several times and return its median wall time.
+
+    Args:
+        command (list): Command line to run
+        runs (int): Number of runs
+
+    Returns:
+        float: Median run time in seconds
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def eagerly_imported_modules():
+    """
+    Import the package in a fresh interpreter and list heavy modules it loaded.
+
+    Returns:
+        list: Names of heavy modules present in sys.modules after import
+    """
+    code = (
+        "import json, sys, src, src.utils; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def main():
+    """Time quick commands and check for eager heavy imports."""
+    parser = argparse.ArgumentParser(description="Measure CLI startup time")
+    parser.add_argument('--runs', type=int, default=5, help='Runs per command')
+    parser.add_argument('--max-seconds', type=float, default=1.0,
+                        help='Budget for the median run time of each command')
+    args = parser.parse_args()
+
+    failed = False
+
+    print(f"{'command':<20} {'median (s)':>10}")
+    for name, command in COMMANDS.items():
+        seconds = time_command(command, args.runs)
+        status = "" if seconds <= args.max_seconds else "  ❌ over budget"
+        failed = failed or bool(status)
+        print(f"{name:<20} {seconds:>10.3f}{status}")
+
+    loaded = eagerly_imported_modules()
+    if loaded:
+        failed = True
+        print(f"\n❌ Importing the package loaded: {', '.join(loaded)}")
+    else:
+        print("\n✅ Importing the package loads no heavy dependencies")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Tiny randomly initialised models for offline benchmarks.
+
+Builds a small GPT-2 (with a byte-level BPE tokenizer trained on a
+built-in corpus) and a small Stable Diffusion pipeline (UNet, VAE and
+CLIP text encoder) entirely locally, so benchmarks exercise the real
+code paths without downloading any weights. Models are seeded, so the
+same configuration always produces the same weights.
+"""
+
+import json
+import os
+
+# Text used to train the tiny tokenizer and to drive the benchmarks
+CORPUS = [
+    "In a mystical forest where ancient trees whispered secrets, a young girl walked alone.",
+    "The castle stood on the mountain, dark and mysterious against the silver sky.",
+    "She looked up at the golden moon and saw a dragon flying over the ocean.",
+    "Ancient ruins appeared in the bright morning sun, covered in beautiful vines.",
+    "The wizard studied old books in his tower while the storm raged outside.",
+    "On a distant planet where two moons cast silver light, explorers found a city.",
+    "Deep in the ocean, mermaids guarded treasures older than the kingdom itself.",
+    "The knight drew his sword as the scary shadow moved through the forest.",
+]
+
+
+def _bytes_to_unicode():
+    """Map bytes to printable unicode characters, as GPT-2 and CLIP tokenizers do."""
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(2 ** 8):
+        if b not in bs:
+            bs.append(b)
+            cs.append(2 ** 8 + n)
+            n += 1
+    return dict(zip(bs, [chr(c) for c in cs]))
+
+
+def build_tiny_gpt2(path):
+    """
+    Build and save a tiny GPT-2 model with its tokenizer.
+
+    Args:
+        path (str): Directory to save the model to (reused if it exists)
+
+    Returns:
+        str: Model directory, usable as StoryGenerator(model_name=...)
+    """
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import GPT2Config, GPT2LMHeadModel, GPT2TokenizerFast
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=1000,
+        special_tokens=["<|endoftext|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    )
+    tokenizer.train_from_iterator(CORPUS * 20, trainer)
+
+    gpt2_tokenizer = GPT2TokenizerFast(
+        tokenizer_object=tokenizer,
+        bos_token="<|endoftext|>",
+        eos_token="<|endoftext|>",
+        unk_token="<|endoftext|>"
+    )
+
+    torch.manual_seed(0)
+    config = GPT2Config(
+        vocab_size=len(gpt2_tokenizer),
+        n_positions=1024,
+        n_embd=64,
+        n_layer=2,
+        n_head=2,
+        bos_token_id=gpt2_tokenizer.eos_token_id,
+        eos_token_id=gpt2_tokenizer.eos_token_id
+    )
+    model = GPT2LMHeadModel(config)
+
+    model.save_pretrained(path)
+    gpt2_tokenizer.save_pretrained(path)
+    return path
+
+
+def build_tiny_stable_diffusion(path):
+    """
+    Build and save a tiny Stable Diffusion pipeline.
+
+    The VAE keeps the 8x downsampling of SD 1.5, so 512x512 images use
+    64x64 latents like the real model, just with far fewer channels.
+
+    Args:
+        path (str): Directory to save the pipeline to (reused if it exists)
+
+    Returns:
+        str: Pipeline directory, usable as ImageGenerator(model_id=...)
+    """
+    if os.path.exists(os.path.join(path, "model_index.json")):
+        return path
+
+    import torch
+    from diffusers import AutoencoderKL, PNDMScheduler, StableDiffusionPipeline, UNet2DConditionModel
+    from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+
+    # A CLIP vocabulary of single byte-level characters, with no merges
+    tokenizer_dir = os.path.join(path, "_tokenizer_source")
+    os.makedirs(tokenizer_dir, exist_ok=True)
+    characters = list(_bytes_to_unicode().values())
+    vocab = {c: i for i, c in enumerate(characters)}
+    for c in characters:
+        vocab[c + "</w>"] = len(vocab)
+    vocab["<|startoftext|>"] = len(vocab)
+    vocab["<|endoftext|>"] = len(vocab)
+    with open(os.path.join(tokenizer_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(tokenizer_dir, "merges.txt"), "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+    tokenizer = CLIPTokenizer(
+        os.path.join(tokenizer_dir, "vocab.json"),
+        os.path.join(tokenizer_dir, "merges.txt"),
+        model_max_length=77
+    )
+
+    torch.manual_seed(0)
+    text_encoder = CLIPTextModel(CLIPTextConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        projection_dim=32,
+        max_position_embeddings=77,
+        bos_token_id=vocab["<|startoftext|>"],
+        eos_token_id=vocab["<|endoftext|>"],
+        pad_token_id=vocab["<|endoftext|>"]
+    ))
+    unet = UNet2DConditionModel(
+        block_out_channels=(32, 64),
+        layers_per_block=1,
+        sample_size=64,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=32,
+        norm_num_groups=32
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[8, 8, 8, 8],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D"] * 4,
+        up_block_types=["UpDecoderBlock2D"] * 4,
+        latent_channels=4,
+        norm_num_groups=8,
+        layers_per_block=1
+    )
+    scheduler = PNDMScheduler(skip_prk_steps=True)
+
+    pipeline = StableDiffusionPipeline(
+        vae=vae,
+        text_encoder=text_encoder,
+        tokenizer=tokenizer,
+        unet=unet,
+        scheduler=scheduler,
+        safety_checker=None,
+        feature_extractor=None,
+        requires_safety_checker=False
+    )
+    # The loader asks for safetensors weights
+    pipeline.save_pretrained(path, safe_serialization=True)
+    return path
@@ -6,16 +6,178 @@ Main application script for running the story generator.
 """
 
 import argparse
+import json
 import sys
 import os
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src import StoryGenerator, ImageGenerator, StoryGeneratorApp
+# Generator classes are imported inside the commands that use them, so quick
+# commands such as --samples and --tips start without loading torch & co.
 from src.utils import configure_network_settings, get_sample_prompts, display_usage_tips
 
 
+def read_batch_prompts(path):
+    """
+    Read prompts from a JSONL file.
+
+    Each line is either a JSON string or an object with a "prompt" field.
+    Blank lines are skipped.
+
+    Args:
+        path (str): Path to the JSONL file
+
+    Yields:
+        str: Story prompts in file order
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                record = record.get('prompt')
+            if not isinstance(record, str):
+                raise ValueError(f"Line {line_number}: expected a prompt string or {{\"prompt\": ...}}")
+            yield record
+
+
+def build_image_cache(args):
+    """
+    Create the on-disk image cache selected on the command line.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        ImageCache: Image cache, or False when caching is turned off
+    """
+    from src.image_cache import ImageCache
+
+    if args.no_image_cache:
+        return False
+    return ImageCache(cache_dir=args.image_cache_dir)
+
+
+def configure_metrics(args):
+    """
+    Set up the telemetry sinks selected on the command line.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    from src.telemetry import JsonLinesSink, PrometheusSink, PrintSink, configure_telemetry
+
+    sinks = []
+    if not args.quiet:
+        sinks.append(PrintSink(show_spans=args.show_timings))
+    if args.metrics_jsonl:
+        sinks.append(JsonLinesSink(args.metrics_jsonl))
+    if args.metrics_prom:
+        sinks.append(PrometheusSink(args.metrics_prom))
+    configure_telemetry(sinks)
+
+
+def run_batch_file(args):
+    """
+    Generate one chapter per prompt in a JSONL file and stream results to JSONL.
+
+    Prompts are processed in windows of several batches so results can be
+    written as they complete while memory stays bounded.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    output_path = args.output or os.path.splitext(args.batch_file)[0] + "_chapters.jsonl"
+    window_size = args.batch_size * 8
+
+    from src import StoryGenerator
+
+    story_gen = StoryGenerator(precision=args.precision, draft_model_name=args.draft_model)
+
+    total_prompts = 0
+    total_tokens = 0
+    total_seconds = 0.0
+
+    def flush(window, out):
+        nonlocal total_prompts, total_tokens, total_seconds
+        texts = story_gen.generate_chapters(
+            window,
+            max_length=args.length,
+            temperature=args.creativity,
+            batch_size=args.batch_size
+        )
+        for prompt, text in zip(window, texts):
+            out.write(json.dumps({'prompt': prompt, 'text': text}, ensure_ascii=False) + "\n")
+        out.flush()
+
+        stats = story_gen.last_batch_stats
+        total_prompts += stats['prompts']
+        total_tokens += stats['new_tokens']
+        total_seconds += stats['seconds']
+        print(f"✅ {total_prompts} chapters written ({stats['tokens_per_second']:.1f} tokens/sec)")
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        window = []
+        for prompt in read_batch_prompts(args.batch_file):
+            window.append(prompt)
+            if len(window) == window_size:
+                flush(window, out)
+                window = []
+        if window:
+            flush(window, out)
+
+    rate = total_tokens / total_seconds if total_seconds > 0 else 0.0
+    print(f"📊 {total_prompts} chapters, {total_tokens} tokens in {total_seconds:.1f}s "
+          f"({rate:.1f} tokens/sec, batch size {args.batch_size})")
+    print(f"📁 Results saved to: {output_path}")
+
+
+def run_batch_stories(args):
+    """
+    Generate a complete story per prompt in a JSONL file on a pool of worker processes.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    from src.batch_runner import BatchRunner
+
+    output_path = args.output or os.path.splitext(args.batch)[0] + "_stories.jsonl"
+    runner = BatchRunner(
+        workers=args.workers,
+        num_chapters=args.chapters,
+        chapter_length=args.length,
+        temperature=args.creativity,
+        continuation=args.continuation,
+        precision=args.precision,
+        draft_model_name=args.draft_model,
+        seed=args.seed
+    )
+    print(f"⚙️ {runner.workers} workers on cores {runner.core_sets}")
+
+    stats = runner.run(read_batch_prompts(args.batch), output_path)
+    print(f"📊 {stats['stories']} stories ({stats['failed']} failed), {stats['chapters']} chapters "
+          f"in {stats['seconds']:.1f}s ({stats['stories_per_second']:.2f} stories/sec, "
+          f"{stats['chapters_per_second']:.2f} chapters/sec)")
+    if stats['crashes']:
+        print(f"⚠️ Worker pool restarted {stats['crashes']} times after crashes")
+    print(f"📁 Results saved to: {output_path}")
+
+
+def report_image_breaker(image_gen):
+    """
+    Tell the user when images were replaced by placeholders because the image model is failing.
+
+    Args:
+        image_gen (ImageGenerator): Generator whose circuit breaker is checked
+    """
+    breaker = image_gen.circuit_breaker.snapshot()
+    if breaker['state'] != 'closed':
+        print(f"⚠️ Image model unavailable, placeholder images were used ({breaker['last_error']})")
+
+
 def main():
     """Main application entry point."""
     parser = argparse.ArgumentParser(
@@ -26,6 +188,9 @@ Examples:
   python main.py --interactive                    # Launch interactive app
   python main.py --generate "Once upon a time"   # Generate single chapter
   python main.py --complete "Magic kingdom" -c 3 # Generate complete story
+  python main.py --complete "Dragons" --export out # Save story and images to out/
+  python main.py --batch-file prompts.jsonl      # Generate a chapter per prompt
+  python main.py --batch prompts.jsonl -w 4      # Generate a story per prompt
   python main.py --samples                       # Show sample prompts
         """
     )
@@ -48,6 +213,38 @@ Examples:
         help='Generate complete story from prompt'
     )
     
+    parser.add_argument(
+        '--batch-file',
+        type=str,
+        help='Generate one chapter per prompt in a JSONL file'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=8,
+        help='Number of prompts per model batch for --batch-file (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        type=str,
+        help='Generate a complete story per prompt in a JSONL file, in parallel worker processes'
+    )
+    
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        help='Number of worker processes for --batch (default: one per CPU core)'
+    )
+    
+    parser.add_argument(
+        '--output', '-o',
+        type=str,
+        help='Output JSONL path for --batch-file or --batch '
+             '(default: <file>_chapters.jsonl or <file>_stories.jsonl)'
+    )
+    
     parser.add_argument(
         '--chapters', '-n',
         type=int,
@@ -55,6 +252,26 @@ Examples:
         help='Number of chapters for complete story (default: 3)'
     )
     
+    parser.add_argument(
+        '--continuation',
+        choices=['prompt', 'kv_cache'],
+        default='prompt',
+        help='How chapters of a complete story are chained (default: prompt)'
+    )
+    
+    parser.add_argument(
+        '--pipelined',
+        action='store_true',
+        help='Generate images in the background while later chapters are written'
+    )
+    
+    parser.add_argument(
+        '--export',
+        type=str,
+        metavar='DIR',
+        help='Write the complete story and its images to DIR as Markdown/HTML, chapter by chapter'
+    )
+    
     parser.add_argument(
         '--length', '-l',
         type=int,
@@ -62,6 +279,19 @@ Examples:
         help='Chapter length in tokens (default: 150)'
     )
     
+    parser.add_argument(
+        '--precision',
+        choices=['fp32', 'bf16', 'int8-dynamic'],
+        default='fp32',
+        help='Text model precision; int8-dynamic is fastest on CPU (default: fp32)'
+    )
+    
+    parser.add_argument(
+        '--draft-model',
+        type=str,
+        help='Smaller model with the same tokenizer (e.g. distilgpt2) to speed up decoding'
+    )
+    
     parser.add_argument(
         '--creativity', '-t',
         type=float,
@@ -69,6 +299,12 @@ Examples:
         help='Creativity/temperature setting (0.1-1.5, default: 0.8)'
     )
     
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='Random seed for reproducible text and images (recorded in the story metadata)'
+    )
+    
     parser.add_argument(
         '--style', '-s',
         type=str,
@@ -76,12 +312,82 @@ Examples:
         help='Art style for image generation'
     )
     
+    parser.add_argument(
+        '--image-quality',
+        choices=['draft', 'standard', 'final'],
+        default='standard',
+        help='Image speed/quality preset: draft (8 steps), standard (20) or final (50) (default: standard)'
+    )
+    
+    parser.add_argument(
+        '--display',
+        choices=['none', 'file', 'notebook', 'contact-sheet', 'matplotlib'],
+        help='Where generated images are shown (default: none, or notebook for --interactive)'
+    )
+    
+    parser.add_argument(
+        '--display-dir',
+        type=str,
+        default='story_images',
+        help='Directory for --display file and contact-sheet (default: story_images)'
+    )
+    
+    parser.add_argument(
+        '--image-memory-mb',
+        type=int,
+        default=64,
+        help='Memory for full-size images in the interactive app; older ones are spilled to disk (default: 64)'
+    )
+    
+    parser.add_argument(
+        '--prefix-cache-mb',
+        type=int,
+        default=64,
+        help='Memory for cached prompt prefixes reused between chapters in the interactive app; 0 turns it off (default: 64)'
+    )
+    
     parser.add_argument(
         '--no-images',
         action='store_true',
         help='Skip image generation (text only)'
     )
     
+    parser.add_argument(
+        '--no-image-cache',
+        action='store_true',
+        help='Always render images instead of reusing cached ones'
+    )
+    
+    parser.add_argument(
+        '--image-cache-dir',
+        type=str,
+        help='Directory for cached images (default: ~/.cache/ai-story-generator/images)'
+    )
+    
+    parser.add_argument(
+        '--metrics-jsonl',
+        type=str,
+        help='Append timing spans and counters to this JSON lines file'
+    )
+    
+    parser.add_argument(
+        '--metrics-prom',
+        type=str,
+        help='Write aggregated metrics to this Prometheus text file'
+    )
+    
+    parser.add_argument(
+        '--show-timings',
+        action='store_true',
+        help='Print how long each generation stage took'
+    )
+    
+    parser.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='Hide progress messages from the generators'
+    )
+    
     parser.add_argument(
         '--samples',
         action='store_true',
@@ -109,14 +415,27 @@ Examples:
         display_usage_tips()
         return
     
-    # Configure network settings
+    # Configure network settings and metrics output
     configure_network_settings()
+    configure_metrics(args)
     
     # Launch interactive app
     if args.interactive:
         print("🚀 Launching Interactive Story Generator...")
         try:
-            app = StoryGeneratorApp()
+            from src import StoryGeneratorApp
+            from src.display import create_display
+            from src.image_store import ImageStore
+
+            app = StoryGeneratorApp(
+                image_cache=build_image_cache(args),
+                precision=args.precision,
+                draft_model_name=args.draft_model,
+                image_quality=args.image_quality,
+                image_store=ImageStore(max_bytes=args.image_memory_mb * 2**20),
+                display=create_display(args.display or 'notebook', args.display_dir),
+                prefix_cache_mb=args.prefix_cache_mb
+            )
             print("✅ App initialized successfully!")
             print("\n" + "="*60)
             print("📱 Interactive Story Generator Ready!")
@@ -131,28 +450,54 @@ Examples:
     elif args.generate:
         print(f"📖 Generating single chapter from: '{args.generate}'")
         try:
-            story_gen = StoryGenerator()
-            chapter_text = story_gen.generate_chapter(
-                args.generate,
-                max_length=args.length,
-                temperature=args.creativity
-            )
+            from src import StoryGenerator, ImageGenerator
+            from src.image_generator import scene_seeds
+            from src.display import create_display
+
+            story_gen = StoryGenerator(precision=args.precision, draft_model_name=args.draft_model)
             
             print("\n" + "="*60)
             print("📚 Generated Chapter:")
             print("="*60)
-            print(chapter_text)
+            
+            # Print the chapter progressively as it is generated
+            pieces = []
+            for piece in story_gen.generate_chapter_stream(
+                args.generate,
+                max_length=args.length,
+                temperature=args.creativity,
+                seed=args.seed
+            ):
+                print(piece, end="", flush=True)
+                pieces.append(piece)
+            print()
+            chapter_text = "".join(pieces)
+            
+            stats = story_gen.last_stream_stats
+            if stats['time_to_first_token'] is not None:
+                latency = stats['mean_inter_token_latency'] or 0.0
+                print(f"\n⏱️ First token after {stats['time_to_first_token']:.2f}s, "
+                      f"{latency * 1000:.0f}ms per token, {stats['tokens']} tokens in {stats['seconds']:.1f}s")
+            assisted = story_gen.last_assisted_stats
+            if assisted is not None:
+                print(f"🤝 Draft model: {assisted['accepted_tokens']}/{assisted['draft_tokens']} drafted tokens "
+                      f"accepted ({assisted['acceptance_rate']:.0%})")
             
             # Generate images if requested
             if not args.no_images:
                 print("\n🎨 Generating images...")
-                image_gen = ImageGenerator()
-                image_gen.load_model()
+                image_gen = ImageGenerator(
+                    image_cache=build_image_cache(args),
+                    quality=args.image_quality,
+                    display=create_display(args.display or 'none', args.display_dir)
+                )
                 
                 scene_descriptions = story_gen.extract_scene_descriptions(chapter_text)
                 if scene_descriptions:
-                    images = image_gen.generate_story_images(scene_descriptions, args.style)
+                    images = image_gen.generate_story_images(scene_descriptions, args.style,
+                                                             seed=scene_seeds(args.seed, len(scene_descriptions)))
                     print(f"✅ Generated {len(images)} images")
+                    report_image_breaker(image_gen)
                 else:
                     print("ℹ️ No visual scenes detected for image generation")
             
@@ -164,32 +509,77 @@ Examples:
     elif args.complete:
         print(f"📚 Generating {args.chapters}-chapter story from: '{args.complete}'")
         try:
+            from src import StoryGenerator, StoryGeneratorApp
+            from src.display import create_display
+            from src.story_exporter import StoryExporter
+
+            exporter = StoryExporter(args.export) if args.export else None
+
             if args.no_images:
                 # Text only
-                story_gen = StoryGenerator()
+                story_gen = StoryGenerator(precision=args.precision, draft_model_name=args.draft_model)
+                if exporter is not None:
+                    exporter.start({'initial_prompt': args.complete})
                 story_data = story_gen.generate_complete_story(
                     args.complete,
                     num_chapters=args.chapters,
                     chapter_length=args.length,
-                    temperature=args.creativity
+                    temperature=args.creativity,
+                    continuation=args.continuation,
+                    on_chapter=exporter.add_chapter if exporter is not None else None,
+                    seed=args.seed
                 )
+                if exporter is not None:
+                    exporter.finish(story_data['metadata'])
                 print(f"✅ Generated {len(story_data['chapters'])} chapters")
             else:
                 # Text and images
-                app = StoryGeneratorApp()
+                app = StoryGeneratorApp(
+                    image_cache=build_image_cache(args),
+                    precision=args.precision,
+                    draft_model_name=args.draft_model,
+                    image_quality=args.image_quality,
+                    display=create_display(args.display or 'none', args.display_dir)
+                )
                 story_data = app.generate_complete_story(
                     args.complete,
                     num_chapters=args.chapters,
                     chapter_length=args.length,
                     temperature=args.creativity,
-                    art_style=args.style
+                    art_style=args.style,
+                    continuation=args.continuation,
+                    pipelined=args.pipelined,
+                    exporter=exporter,
+                    seed=args.seed
                 )
                 print(f"✅ Generated {len(story_data['chapters'])} chapters and {len(story_data['images'])} images")
+                report_image_breaker(app.image_generator)
+            
+            if exporter is not None:
+                print(f"📁 Story saved to: {exporter.directory} (index: {exporter.manifest_path})")
                 
         except Exception as e:
             print(f"❌ Error generating complete story: {e}")
             return 1
     
+    # Generate chapters for a file of prompts
+    elif args.batch_file:
+        print(f"📚 Generating chapters for prompts in: '{args.batch_file}'")
+        try:
+            run_batch_file(args)
+        except Exception as e:
+            print(f"❌ Error generating batch: {e}")
+            return 1
+    
+    # Generate complete stories for a file of prompts
+    elif args.batch:
+        print(f"📚 Generating stories for prompts in: '{args.batch}'")
+        try:
+            run_batch_stories(args)
+        except Exception as e:
+            print(f"❌ Error generating stories: {e}")
+            return 1
+    
     else:
         # No specific action, show help
         parser.print_help()
@@ -2,18 +2,43 @@
 
 A Python package for generating stories with AI-generated images using
 Hugging Face's transformers and diffusers libraries.
+
+The generator classes are imported on first access, so importing the
+package (or its lightweight helpers such as ``src.utils``) does not pull
+in torch, transformers, diffusers, matplotlib or ipywidgets.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "AI Story Generator"
 __description__ = "Generate stories with AI-powered text and images"
 
-from .story_generator import StoryGenerator
-from .image_generator import ImageGenerator
-from .story_app import StoryGeneratorApp
+# Public name -> module that defines it
+_LAZY_EXPORTS = {
+    'StoryGenerator': '.story_generator',
+    'ImageGenerator': '.image_generator',
+    'StoryGeneratorApp': '.story_app',
+    'SceneExtractor': '.scene_extractor',
+}
 
 __all__ = [
     'StoryGenerator',
     'ImageGenerator', 
-    'StoryGeneratorApp'
-]
\ No newline at end of file
+    'StoryGeneratorApp',
+    'SceneExtractor'
+]
+
+
+def __getattr__(name):
+    """Import the module defining a public class the first time it is accessed."""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    """List module attributes, including exports that are not imported yet."""
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
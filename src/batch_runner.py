@@ -0,0 +1,312 @@
+"""Run many complete-story jobs in parallel worker processes."""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from .telemetry import configure_telemetry, get_telemetry
+
+# The story generator of this worker process, loaded by its first job
+_worker_generator = None
+
+
+def available_cores():
+    """
+    List the CPU cores this process may run on.
+
+    Returns:
+        list: Core ids
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cores(workers, cores=None):
+    """
+    Split cores into disjoint, contiguous sets, one per worker.
+
+    When there are more workers than cores, every worker gets one core and
+    cores are shared round-robin.
+
+    Args:
+        workers (int): Number of worker processes
+        cores (list): Cores to split (defaults to available_cores())
+
+    Returns:
+        list: One list of core ids per worker
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+
+    share, extra = divmod(len(cores), workers)
+    partitions = []
+    start = 0
+    for i in range(workers):
+        size = share + (1 if i < extra else 0)
+        partitions.append(cores[start:start + size])
+        start += size
+    return partitions
+
+
+def _init_worker(core_sets, slot_counter):
+    """Pin a new worker process to its share of cores and size torch's thread pools to match."""
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+    cores = core_sets[slot % len(core_sets)]
+
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError:
+            pass
+
+    # OpenMP and MKL read these when torch is first imported, which is now
+    threads = str(len(cores))
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = threads
+    import torch
+
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    # Progress messages from several processes would interleave
+    configure_telemetry([])
+
+
+def _run_job(index, prompt, options):
+    """Generate one complete story in a worker process."""
+    global _worker_generator
+
+    start = time.perf_counter()
+    try:
+        if _worker_generator is None:
+            from .story_generator import StoryGenerator
+
+            _worker_generator = StoryGenerator(
+                model_name=options['model_name'],
+                precision=options['precision'],
+                draft_model_name=options['draft_model_name']
+            )
+            _worker_generator.load_model()
+
+        # Every story gets its own range of chapter seeds, whichever worker runs it
+        seed = options['seed']
+        if seed is not None:
+            seed += index * options['num_chapters']
+        story_data = _worker_generator.generate_complete_story(
+            prompt,
+            num_chapters=options['num_chapters'],
+            chapter_length=options['chapter_length'],
+            temperature=options['temperature'],
+            continuation=options['continuation'],
+            seed=seed
+        )
+        record = {'prompt': prompt, **story_data}
+        error = None
+    except Exception as e:
+        record = None
+        error = str(e)
+
+    return {
+        'index': index,
+        'record': record,
+        'error': error,
+        'seconds': time.perf_counter() - start,
+        'worker': os.getpid()
+    }
+
+
+class BatchRunner:
+    """Runs complete-story jobs from a prompt list on a pool of worker processes.
+
+    Each worker is pinned to a disjoint share of the host's cores, with
+    torch's thread pool sized to that share, so workers do not oversubscribe
+    the CPU. A worker loads the text model once and keeps it for all of its
+    jobs. Finished stories are written to a JSONL file in input order as
+    soon as every earlier story is done.
+
+    If a worker process dies (for example killed by the out-of-memory
+    killer), the pool is restarted and the jobs that were in flight are
+    retried, up to max_attempts times each; a job that keeps crashing its
+    worker is written as an error record instead.
+    """
+
+    def __init__(self, workers=None, model_name="gpt2-medium", num_chapters=3, chapter_length=150,
+                 temperature=0.8, continuation="prompt", precision="fp32", draft_model_name=None,
+                 max_attempts=3, cores=None, seed=None):
+        """
+        Initialize the batch runner.
+
+        Args:
+            workers (int): Number of worker processes (defaults to one per available core)
+            model_name (str): Text model every worker loads
+            num_chapters (int): Chapters per story
+            chapter_length (int): Length of each chapter in tokens
+            temperature (float): Creativity setting
+            continuation (str): How chapters are chained ("prompt" or "kv_cache")
+            precision (str): Text model precision ("fp32", "bf16" or "int8-dynamic")
+            draft_model_name (str): Draft model for assisted generation (None to turn it off)
+            max_attempts (int): Times a job is tried when workers crash
+            cores (list): Cores to spread the workers over (defaults to all available)
+            seed (int): Random seed making the whole batch reproducible; story i
+                starts at seed + i * num_chapters
+        """
+        self.core_sets = partition_cores(workers or len(available_cores()), cores)
+        self.workers = len(self.core_sets)
+        self.max_attempts = max_attempts
+        self.options = {
+            'model_name': model_name,
+            'num_chapters': num_chapters,
+            'chapter_length': chapter_length,
+            'temperature': temperature,
+            'continuation': continuation,
+            'precision': precision,
+            'draft_model_name': draft_model_name,
+            'seed': seed
+        }
+        self.last_stats = None
+        # Spawned workers start without a copy of the parent's torch threads and state
+        self._context = multiprocessing.get_context("spawn")
+
+    def run(self, prompts, output_path):
+        """
+        Generate a complete story per prompt and write them to a JSONL file.
+
+        Each output line is the story data returned by generate_complete_story
+        plus the "prompt", or {"prompt": ..., "error": ...} for a failed job.
+
+        Args:
+            prompts (iterable): Story prompts; read lazily, so it may be a generator
+            output_path (str): JSONL file to write
+
+        Returns:
+            dict: Throughput statistics
+        """
+        telemetry = get_telemetry()
+        prompts = iter(prompts)
+        max_in_flight = self.workers * 2
+        # Bounds the stories held back behind a slow earlier one
+        max_buffered = self.workers * 8
+
+        jobs = {}            # index -> [prompt, attempts]
+        retries = []         # indices to resubmit after a crash
+        finished = {}        # index -> output record, waiting for earlier ones
+        in_flight = {}       # future -> index
+        next_index = 0       # next prompt to read
+        next_write = 0       # next record to write
+        stats = {'stories': 0, 'failed': 0, 'chapters': 0, 'crashes': 0, 'workers': self.workers}
+        exhausted = False
+        start = time.perf_counter()
+
+        pool = self._new_pool()
+        try:
+            with open(output_path, "w", encoding="utf-8") as out:
+                while True:
+                    # Keep every worker busy, with one job queued behind it
+                    crashed = False
+                    while len(in_flight) < max_in_flight and not crashed:
+                        if retries:
+                            index = retries.pop(0)
+                        elif not exhausted and next_index - next_write < max_buffered:
+                            try:
+                                prompt = next(prompts)
+                            except StopIteration:
+                                exhausted = True
+                                continue
+                            index = next_index
+                            next_index += 1
+                            jobs[index] = [prompt, 0]
+                        else:
+                            break
+                        jobs[index][1] += 1
+                        try:
+                            in_flight[pool.submit(_run_job, index, jobs[index][0], self.options)] = index
+                        except BrokenProcessPool:
+                            retries.insert(0, index)
+                            jobs[index][1] -= 1
+                            crashed = True
+
+                    if not in_flight and not crashed:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED) if in_flight else (set(), None)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool:
+                            crashed = True
+                            self._retry_or_fail(index, jobs, retries, finished, stats)
+                            continue
+
+                        prompt = jobs[index][0]
+                        if result['error'] is not None:
+                            finished[index] = {'prompt': prompt, 'error': result['error']}
+                            stats['failed'] += 1
+                        else:
+                            finished[index] = result['record']
+                            stats['stories'] += 1
+                            stats['chapters'] += len(result['record'].get('chapters', []))
+                            telemetry.observe("batch.story_seconds", result['seconds'])
+
+                    if crashed:
+                        # Every job still in flight died with the pool
+                        stats['crashes'] += 1
+                        telemetry.counter("batch.worker_crashes")
+                        telemetry.log("⚠️ A worker process crashed; restarting the pool", level="warning")
+                        for index in in_flight.values():
+                            self._retry_or_fail(index, jobs, retries, finished, stats)
+                        in_flight = {}
+                        retries.sort()
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = self._new_pool()
+
+                    # Write finished stories in input order
+                    while next_write in finished:
+                        record = finished.pop(next_write)
+                        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                        del jobs[next_write]
+                        next_write += 1
+                    out.flush()
+                    if done:
+                        telemetry.log(f"✅ {next_write} stories written")
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = elapsed
+        stats['stories_per_second'] = stats['stories'] / elapsed if elapsed > 0 else 0.0
+        stats['chapters_per_second'] = stats['chapters'] / elapsed if elapsed > 0 else 0.0
+        telemetry.counter("batch.stories", stats['stories'])
+        telemetry.counter("batch.failures", stats['failed'])
+        self.last_stats = stats
+        return stats
+
+    def _new_pool(self):
+        """Start a pool of pinned worker processes."""
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self.core_sets, self._context.Value('i', 0))
+        )
+
+    def _retry_or_fail(self, index, jobs, retries, finished, stats):
+        """Queue a job lost in a crash for another attempt, or record it as failed."""
+        prompt, attempts = jobs[index]
+        if attempts < self.max_attempts:
+            retries.append(index)
+        else:
+            finished[index] = {'prompt': prompt, 'error': f"Worker crashed {attempts} times running this job"}
+            stats['failed'] += 1
@@ -0,0 +1,186 @@
+"""Dynamic micro-batching of concurrent generation requests."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .telemetry import get_telemetry
+
+
+class SchedulerOverloaded(RuntimeError):
+    """Raised when a request cannot be queued because the scheduler is full."""
+
+
+class _Request:
+    """A queued request and the future its result is delivered through."""
+
+    def __init__(self, item, key):
+        self.item = item
+        self.key = key
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """Collects concurrent requests into batches for a batched function.
+
+    The first request to arrive opens a collection window. Requests arriving
+    during the window, up to max_batch_size, join the batch; the batch is then
+    split into groups of requests with the same key (e.g. the same sampling
+    parameters) and every group is run with one call of the batch function.
+    One worker thread runs all batches, so the model is never used by two
+    threads at once.
+
+    The queue is bounded: once max_pending requests are waiting, submit()
+    blocks for up to submit_timeout seconds and then raises
+    SchedulerOverloaded, so overload shows up at the caller instead of as
+    ever-growing latency.
+    """
+
+    def __init__(self, run_batch, window=0.01, max_batch_size=8, max_pending=64, submit_timeout=30.0,
+                 name="scheduler"):
+        """
+        Initialize the scheduler.
+
+        Args:
+            run_batch (callable): Called as run_batch(items, key) with the
+                items of one group; returns one result per item, in order
+            window (float): Seconds to wait for more requests after the first
+            max_batch_size (int): Maximum number of requests per batch
+            max_pending (int): Maximum number of queued requests
+            submit_timeout (float): Seconds submit() waits for queue space
+                (None waits forever, 0 fails immediately)
+            name (str): Prefix of the metrics emitted by this scheduler
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self.name = name
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._worker = None
+        self._stats = {'requests': 0, 'batches': 0, 'rejected': 0, 'largest_batch': 0}
+
+    def submit(self, item, key=None):
+        """
+        Queue a request.
+
+        Args:
+            item: Request payload passed to run_batch
+            key: Hashable batching key; only requests with equal keys share a call
+
+        Returns:
+            Future: Resolves to the result for this item
+
+        Raises:
+            SchedulerOverloaded: If the queue stays full for submit_timeout seconds
+        """
+        request = _Request(item, key)
+        telemetry = get_telemetry()
+
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            if not self._condition.wait_for(lambda: len(self._queue) < self.max_pending or self._closed,
+                                            timeout=self.submit_timeout):
+                self._stats['rejected'] += 1
+                telemetry.counter(f"{self.name}.rejected")
+                raise SchedulerOverloaded(f"{len(self._queue)} requests already waiting")
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+
+            self._queue.append(request)
+            self._stats['requests'] += 1
+            depth = len(self._queue)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+
+        telemetry.observe(f"{self.name}.queue_depth", depth)
+        return request.future
+
+    def stats(self):
+        """
+        Get scheduler statistics.
+
+        Returns:
+            dict: Request, batch and rejection counts, largest batch and current queue depth
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queue_depth'] = len(self._queue)
+        stats['mean_batch_size'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def close(self):
+        """Stop the worker after it has finished the queued requests."""
+        with self._condition:
+            self._closed = True
+            worker = self._worker
+            self._condition.notify_all()
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def _next_batch(self):
+        """Wait for the first request, then collect more until the window closes or the batch is full."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._queue or self._closed)
+            if not self._queue:
+                return None
+
+            deadline = time.perf_counter() + self.window
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch_size))]
+            # Room in the queue again for blocked submitters
+            self._condition.notify_all()
+            return batch
+
+    def _run(self):
+        """Worker loop: form batches and run them group by group."""
+        telemetry = get_telemetry()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+
+            started = time.perf_counter()
+            for request in batch:
+                telemetry.observe(f"{self.name}.wait_seconds", started - request.queued_at)
+
+            for key, requests in groups.items():
+                with self._condition:
+                    self._stats['batches'] += 1
+                    self._stats['largest_batch'] = max(self._stats['largest_batch'], len(requests))
+                telemetry.observe(f"{self.name}.batch_size", len(requests))
+
+                try:
+                    results = self.run_batch([request.item for request in requests], key)
+                    if len(results) != len(requests):
+                        raise RuntimeError(f"run_batch returned {len(results)} results for {len(requests)} items")
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+
+                for request, result in zip(requests, results):
+                    request.future.set_result(result)
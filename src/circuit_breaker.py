@@ -0,0 +1,180 @@
+"""Circuit breaker that stops calling a failing dependency for a while."""
+
+import threading
+import time
+
+from .telemetry import get_telemetry
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Switches to a degraded mode after repeated failures.
+
+    While the breaker is closed, every call is allowed. After
+    failure_threshold consecutive failures it opens: calls are refused
+    (callers take their fallback path) for recovery_timeout seconds. Then
+    it is half-open and lets a single trial call through; if that call
+    succeeds the breaker closes again, otherwise it reopens for another
+    timeout.
+
+    Callers wrap the protected operation like this::
+
+        if breaker.allow():
+            try:
+                result = operation()
+            except Exception as e:
+                breaker.record_failure(e)
+                result = fallback()
+            else:
+                breaker.record_success()
+        else:
+            result = fallback()
+    """
+
+    def __init__(self, failure_threshold=3, recovery_timeout=60.0, name="breaker", clock=time.monotonic):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            recovery_timeout (float): Seconds the breaker stays open before a trial call
+            name (str): Prefix of the metrics emitted by this breaker
+            clock (callable): Returns the current time in seconds
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.name = name
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._trips = 0
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """str: "closed", "open" or "half_open"."""
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """
+        Check whether a call may go through.
+
+        Returns:
+            bool: True to make the call, False to take the fallback path.
+                When half-open, only the first caller gets True; it must
+                report the outcome with record_success() or record_failure().
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                get_telemetry().log(f"🔌 {self.name}: trying again after {self.recovery_timeout:.0f}s")
+                return True
+            return False
+
+    def record_success(self):
+        """Report a successful call; closes the breaker."""
+        with self._lock:
+            recovered = self._state != CLOSED
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+        if recovered:
+            get_telemetry().log(f"✅ {self.name}: recovered")
+
+    def record_failure(self, error=None):
+        """
+        Report a failed call.
+
+        Args:
+            error (Exception or str): What went wrong, kept for snapshot()
+        """
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error)[:200] if error is not None else None
+            # A failed trial reopens the breaker right away
+            if self._trial_running:
+                self._open(f"after a failed trial call ({self._last_error})")
+            elif self._failures >= self.failure_threshold:
+                self._open(f"after {self._failures} failures ({self._last_error})")
+
+    def release(self):
+        """Report that an allowed call ended without an outcome, e.g. because it was cancelled."""
+        with self._lock:
+            self._trial_running = False
+
+    def trip(self, error=None):
+        """
+        Open the breaker immediately, e.g. when the dependency is known to be missing.
+
+        Args:
+            error (Exception or str): Why the breaker was opened
+        """
+        with self._lock:
+            self._last_error = str(error)[:200] if error is not None else None
+            self._open(f"({self._last_error})" if error is not None else "")
+
+    def reset(self):
+        """Close the breaker and forget all failures."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+            self._last_error = None
+
+    def snapshot(self):
+        """
+        Describe the breaker's state.
+
+        Returns:
+            dict: State, consecutive failures, number of times it opened,
+                seconds until the next trial (None unless open) and the last error
+        """
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == OPEN:
+                retry_in = max(0.0, self._opened_at + self.recovery_timeout - self._clock())
+            return {
+                'state': state,
+                'failures': self._failures,
+                'trips': self._trips,
+                'retry_in': retry_in,
+                'last_error': self._last_error
+            }
+
+    def _current_state(self):
+        """Move from open to half-open once the timeout has passed; call with the lock held."""
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _open(self, reason):
+        """
+        Open the breaker; call with the lock held.
+
+        Args:
+            reason (str): Why it opens, for the log
+        """
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trial_running = False
+        self._trips += 1
+        telemetry = get_telemetry()
+        telemetry.counter(f"{self.name}.trips")
+        reason = f" {reason}" if reason else ""
+        telemetry.log(f"⚠️ {self.name}: open{reason}; retrying in {self.recovery_timeout:.0f}s", level="warning")
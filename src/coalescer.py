@@ -0,0 +1,86 @@
+"""Sharing one computation between concurrent identical requests."""
+
+import threading
+from concurrent.futures import Future
+
+from .telemetry import get_telemetry
+
+
+class RequestCoalescer:
+    """Runs concurrent requests with the same key only once.
+
+    The first caller with a key (the leader) runs the computation. Callers
+    arriving with the same key while it is running wait for it and receive
+    its result, or its exception. Nothing is kept once the computation has
+    finished, so this only removes duplicate work that overlaps in time;
+    use a cache for repeats that come later.
+
+    Keys must describe everything that determines the result. Requests whose
+    result is random (no seed) are not identical and should not share a key.
+    """
+
+    def __init__(self, name="coalescer"):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name (str): Prefix of the metrics emitted by this coalescer
+        """
+        self.name = name
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced': 0}
+
+    def run(self, key, compute, share=None):
+        """
+        Compute the result for a key, or wait for the identical computation in flight.
+
+        Args:
+            key: Hashable description of the request
+            compute (callable): Called without arguments to produce the result
+            share (callable): Applied to the result for every caller except the
+                leader, e.g. to give each caller its own copy of a mutable result
+
+        Returns:
+            The result of compute()
+
+        Raises:
+            Exception: Whatever compute() raised, for the leader and every waiting caller
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._stats['leaders'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            get_telemetry().counter(f"{self.name}.coalesced")
+            result = future.result()
+            return share(result) if share is not None else result
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """
+        Get coalescing statistics.
+
+        Returns:
+            dict: Computations run (leaders), requests that shared one
+                (coalesced) and computations currently in flight
+        """
+        with self._lock:
+            return {**self._stats, 'in_flight': len(self._in_flight)}
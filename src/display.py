@@ -0,0 +1,302 @@
+"""Pluggable sinks that show or save generated images."""
+
+import math
+import os
+import re
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .telemetry import get_telemetry
+
+DISPLAY_MODES = ("none", "file", "notebook", "contact-sheet", "matplotlib")
+
+DEFAULT_DISPLAY_DIR = "story_images"
+
+# TrueType fonts tried for captions before Pillow's built-in font
+CAPTION_FONTS = ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf")
+
+_UNSAFE_FILE_CHARACTERS = re.compile(r'[^\w-]+')
+
+
+@lru_cache(maxsize=8)
+def caption_font(size=14):
+    """
+    Load a font for captions, falling back to Pillow's built-in font.
+
+    Fonts are cached, so the font files are only searched once per size.
+
+    Args:
+        size (int): Font size in pixels
+
+    Returns:
+        ImageFont: Font
+    """
+    for name in CAPTION_FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow before 10.1 has a single fixed-size default font
+        return ImageFont.load_default()
+
+
+def wrap_text(draw, text, font, width, max_lines=None):
+    """
+    Break text into lines that fit a pixel width.
+
+    Args:
+        draw (ImageDraw): Drawing context used to measure text
+        text (str): Text to wrap
+        font (ImageFont): Font the text is drawn in
+        width (int): Maximum line width in pixels
+        max_lines (int): Maximum number of lines; the last one is
+            shortened with "..." if the text does not fit
+
+    Returns:
+        list: Lines of text
+    """
+    lines = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and draw.textlength(candidate, font=font) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+
+    if max_lines is not None and len(lines) > max_lines:
+        lines = lines[:max_lines]
+        last = lines[-1]
+        while last and draw.textlength(last + "...", font=font) > width:
+            last = last[:-1]
+        lines[-1] = last.rstrip() + "..."
+    return lines
+
+
+def make_contact_sheet(items, title=None, columns=None, tile_size=256, caption_lines=3, font_size=14):
+    """
+    Tile images with their captions into one image.
+
+    Args:
+        items (list): (image, caption) pairs
+        title (str): Optional heading drawn above the tiles
+        columns (int): Tiles per row (defaults to a roughly square grid)
+        tile_size (int): Longest side of each tile in pixels
+        caption_lines (int): Maximum caption lines under each tile
+        font_size (int): Caption font size in pixels
+
+    Returns:
+        PIL.Image: Contact sheet
+    """
+    if not items:
+        raise ValueError("A contact sheet needs at least one image")
+
+    columns = min(columns or math.ceil(math.sqrt(len(items))), len(items))
+    rows = math.ceil(len(items) / columns)
+    padding = 8
+    font = caption_font(font_size)
+    line_height = font_size + 4
+    caption_height = caption_lines * line_height
+    title_height = 2 * line_height if title else 0
+    cell_width = tile_size + 2 * padding
+    cell_height = tile_size + caption_height + 2 * padding
+
+    sheet = Image.new("RGB", (columns * cell_width, title_height + rows * cell_height), "white")
+    draw = ImageDraw.Draw(sheet)
+    if title:
+        title_line = wrap_text(draw, title, font, sheet.width - 2 * padding, max_lines=1)[0]
+        draw.text((padding, padding), title_line, fill="black", font=font)
+
+    for index, (image, caption) in enumerate(items):
+        row, column = divmod(index, columns)
+        left = column * cell_width + padding
+        top = title_height + row * cell_height + padding
+
+        tile = image.convert("RGB") if image.mode != "RGB" else image.copy()
+        tile.thumbnail((tile_size, tile_size))
+        # Center the tile in its cell
+        sheet.paste(tile, (left + (tile_size - tile.width) // 2, top + (tile_size - tile.height) // 2))
+
+        for line_number, line in enumerate(wrap_text(draw, caption, font, tile_size, max_lines=caption_lines)):
+            draw.text((left, top + tile_size + 4 + line_number * line_height), line, fill="black", font=font)
+
+    return sheet
+
+
+class NullDisplay:
+    """Display that shows nothing; for headless and batch runs."""
+
+    def show(self, image, caption):
+        """
+        Show one image.
+
+        Args:
+            image (PIL.Image): Image to show
+            caption (str): Caption text
+        """
+
+    def show_group(self, items, title=None):
+        """
+        Show a group of related images, such as the scenes of a chapter.
+
+        Args:
+            items (list): (image, caption) pairs
+            title (str): Optional title of the group
+        """
+        for image, caption in items:
+            self.show(image, caption)
+
+    def close(self):
+        """Release resources held by the display."""
+
+
+class FileDisplay(NullDisplay):
+    """Display that saves every image to a directory, numbered in display order."""
+
+    def __init__(self, directory=DEFAULT_DISPLAY_DIR, image_format="png"):
+        """
+        Initialize the file display.
+
+        Args:
+            directory (str): Directory images are saved to, created if missing
+            image_format (str): File extension Pillow saves in, e.g. "png" or "jpg"
+        """
+        self.directory = directory
+        self.image_format = image_format
+        self.saved = []
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def show(self, image, caption):
+        """Save the image, named after its number and caption."""
+        with self._lock:
+            self._count += 1
+            number = self._count
+        slug = _UNSAFE_FILE_CHARACTERS.sub("-", caption.lower())[:40].strip("-") or "image"
+        path = os.path.join(self.directory, f"{number:04d}-{slug}.{self.image_format}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self.image_format in ("jpg", "jpeg") and image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(path)
+        self.saved.append(path)
+        get_telemetry().log(f"🖼️ Saved {caption[:50]} to: {path}")
+
+
+class NotebookDisplay(NullDisplay):
+    """Display that shows images inline in a Jupyter notebook, without matplotlib."""
+
+    def __init__(self, max_width=400):
+        """
+        Initialize the notebook display.
+
+        Args:
+            max_width (int): Images wider than this are scaled down for display
+        """
+        self.max_width = max_width
+
+    def show(self, image, caption):
+        """Show the image and its caption in the current notebook output."""
+        from IPython.display import display
+
+        if image.width > self.max_width:
+            image = image.copy()
+            image.thumbnail((self.max_width, self.max_width * image.height // image.width))
+        print(caption)
+        display(image)
+
+
+class ContactSheetDisplay(NullDisplay):
+    """Display that tiles each group of images into one captioned contact sheet.
+
+    The sheet is passed on to another display, so a whole chapter costs one
+    save or one notebook output instead of one per image.
+    """
+
+    def __init__(self, target=None, columns=None, tile_size=256):
+        """
+        Initialize the contact sheet display.
+
+        Args:
+            target (NullDisplay): Display the sheets are shown on (defaults
+                to a FileDisplay saving to DEFAULT_DISPLAY_DIR)
+            columns (int): Tiles per row (defaults to a roughly square grid)
+            tile_size (int): Longest side of each tile in pixels
+        """
+        self.target = target if target is not None else FileDisplay()
+        self.columns = columns
+        self.tile_size = tile_size
+
+    def show(self, image, caption):
+        """Show a single image as a one-tile sheet."""
+        self.show_group([(image, caption)])
+
+    def show_group(self, items, title=None):
+        """Compose the group into one sheet and show it on the target display."""
+        items = list(items)
+        if not items:
+            return
+        sheet = make_contact_sheet(items, title=title, columns=self.columns, tile_size=self.tile_size)
+        self.target.show(sheet, title or items[0][1])
+
+    def close(self):
+        """Close the target display."""
+        self.target.close()
+
+
+class MatplotlibDisplay(NullDisplay):
+    """Display that draws every image in its own matplotlib figure and shows it."""
+
+    def __init__(self, max_width=400):
+        """
+        Initialize the matplotlib display.
+
+        Args:
+            max_width (int): Figure width in pixels at 100 dpi
+        """
+        self.max_width = max_width
+
+    def show(self, image, caption):
+        """Draw the image with its caption as the figure title and show the figure."""
+        import matplotlib.pyplot as plt
+
+        plt.figure(figsize=(self.max_width/100, self.max_width/100))
+        plt.imshow(image)
+        plt.axis('off')
+        plt.title(caption, fontsize=12, wrap=True)
+        plt.tight_layout()
+        plt.show()
+
+
+def create_display(mode, directory=None):
+    """
+    Create a display by name.
+
+    Args:
+        mode (str): One of DISPLAY_MODES
+        directory (str): Output directory for "file" and "contact-sheet"
+            (defaults to DEFAULT_DISPLAY_DIR)
+
+    Returns:
+        NullDisplay: The display
+    """
+    directory = directory or DEFAULT_DISPLAY_DIR
+    if mode == "none":
+        return NullDisplay()
+    if mode == "file":
+        return FileDisplay(directory)
+    if mode == "notebook":
+        return NotebookDisplay()
+    if mode == "contact-sheet":
+        return ContactSheetDisplay(FileDisplay(directory))
+    if mode == "matplotlib":
+        return MatplotlibDisplay()
+    raise ValueError(f"Unknown display mode: {mode} (choose from {', '.join(DISPLAY_MODES)})")
@@ -0,0 +1,207 @@
+"""Content-addressed on-disk cache for generated images."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from PIL import Image
+from .telemetry import get_telemetry
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-story-generator", "images")
+
+# Temporary files older than this are left over from crashed writers
+STALE_TEMP_SECONDS = 3600
+
+
+class ImageCache:
+    """Persistent image cache keyed by a hash of the generation parameters.
+
+    Files are written atomically (temporary file + rename), so several
+    processes can share one cache directory. When the directory grows past
+    its size cap, the least recently used files are deleted; reading a file
+    refreshes its modification time.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=2 * 2**30, image_format="png", enabled=True):
+        """
+        Initialize the image cache.
+
+        Args:
+            cache_dir (str): Cache directory (defaults to $STORY_GENERATOR_IMAGE_CACHE
+                or ~/.cache/ai-story-generator/images)
+            max_bytes (int): Size cap for all cached files together
+            image_format (str): File format, "png" or "webp" (stored lossless)
+            enabled (bool): Set to False to turn the cache off
+        """
+        if image_format not in ("png", "webp"):
+            raise ValueError(f"Unsupported image cache format: {image_format}")
+
+        self.cache_dir = cache_dir or os.environ.get("STORY_GENERATOR_IMAGE_CACHE", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**params):
+        """
+        Build a cache key from generation parameters.
+
+        Args:
+            **params: Everything that affects the generated image (model id,
+                prompt, style, negative prompt, steps, guidance, size, seed, ...)
+
+        Returns:
+            str: Hex digest identifying the image
+        """
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        """
+        Get the file path an image with the given key is stored at.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            str: File path inside the cache directory
+        """
+        return os.path.join(self.cache_dir, f"{key}.{self.image_format}")
+
+    def get(self, key):
+        """
+        Load a cached image.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            PIL.Image: Cached image, or None on a miss or when disabled
+        """
+        if not self.enabled:
+            return None
+
+        path = self.path_for(key)
+        try:
+            with Image.open(path) as cached:
+                image = cached.convert('RGB')
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            # Missing, evicted by another process, or a corrupt file
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def put(self, key, image):
+        """
+        Store an image in the cache.
+
+        Args:
+            key (str): Cache key from make_key()
+            image (PIL.Image): Image to store
+        """
+        if not self.enabled:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=f".{self.image_format}", dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    if self.image_format == "webp":
+                        image.save(f, format="WEBP", lossless=True)
+                    else:
+                        image.save(f, format="PNG")
+                size = os.path.getsize(temp_path)
+                os.replace(temp_path, self.path_for(key))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        except OSError as e:
+            get_telemetry().log(f"⚠️ Could not write image cache entry: {e}", level="warning")
+            return
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            over_limit = self._size is None or self._size > self.max_bytes
+
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits its size cap."""
+        entries = []
+        now = time.time()
+        suffix = f".{self.image_format}"
+
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.startswith(".tmp-"):
+                        if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                            self._remove(entry.path)
+                        continue
+                    if entry.name.endswith(suffix):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            entries = []
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+        with self._lock:
+            self._size = total
+
+    @staticmethod
+    def _remove(path):
+        """Remove a file, ignoring files another process already removed."""
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def stats(self):
+        """
+        Get cache usage counters.
+
+        Returns:
+            dict: Hits, misses, and the cache size in bytes (None if not scanned yet)
+        """
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'size_bytes': self._size
+            }
+
+    def clear(self):
+        """Delete every cached image."""
+        max_bytes, self.max_bytes = self.max_bytes, 0
+        try:
+            self._evict()
+        finally:
+            self.max_bytes = max_bytes
@@ -1,201 +1,879 @@
 """Image generation module using diffusers."""
 
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
 import torch
-from diffusers import StableDiffusionPipeline
-from PIL import Image, ImageDraw, ImageFont
-import matplotlib.pyplot as plt
+from diffusers import (
+    DPMSolverMultistepScheduler,
+    EulerAncestralDiscreteScheduler,
+    EulerDiscreteScheduler,
+    StableDiffusionPipeline
+)
+from PIL import Image
 import warnings
+from .circuit_breaker import CircuitBreaker
+from .coalescer import RequestCoalescer
+from .display import MatplotlibDisplay, create_display
+from .image_cache import ImageCache
+from .model_registry import get_registry
+from .model_resolver import ModelResolver
+from .placeholder import PlaceholderRenderer
+from .telemetry import get_telemetry
 
 warnings.filterwarnings('ignore')
 
+# Schedulers that can replace the one shipped with the checkpoint, with the
+# settings they are created with from the checkpoint's scheduler config
+SCHEDULERS = {
+    'default': None,  # The checkpoint's own scheduler
+    'dpm++': (DPMSolverMultistepScheduler, {'algorithm_type': 'dpmsolver++', 'use_karras_sigmas': True}),
+    'euler': (EulerDiscreteScheduler, {}),
+    'euler-a': (EulerAncestralDiscreteScheduler, {}),
+}
+
+# Named speed/quality trade-offs. Multistep schedulers such as DPM-Solver++
+# reach in 8-20 steps what the default scheduler needs 50 for.
+QUALITY_PRESETS = {
+    'draft': {'scheduler': 'dpm++', 'steps': 8, 'guidance_scale': 7.0, 'size': (512, 512)},
+    'standard': {'scheduler': 'dpm++', 'steps': 20, 'guidance_scale': 7.5, 'size': (512, 512)},
+    'final': {'scheduler': 'default', 'steps': 50, 'guidance_scale': 7.5, 'size': (512, 512)},
+}
+DEFAULT_QUALITY = 'standard'
+
+# Rough peak memory needed per 512x512 image in a batch (both guidance branches
+# included), used to pick a batch size that fits in the memory currently free.
+IMAGE_MEMORY_PER_BATCH_ITEM = {
+    'cuda': 1.0 * 2**30,
+    'cpu': 1.5 * 2**30
+}
+
+
+class PromptEmbeddingCache:
+    """Size-bounded LRU cache of text-encoder embeddings, keyed by model id and text."""
+
+    def __init__(self, max_entries=128):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            max_entries (int): Maximum number of embeddings kept before the
+                least recently used one is evicted
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, model_id, text, encode):
+        """
+        Return the cached embedding for a text, encoding and storing it on a miss.
+
+        Args:
+            model_id (str): Model the embedding belongs to
+            text (str): Text that was encoded
+            encode (callable): Function that encodes the text when it is not cached
+
+        Returns:
+            torch.Tensor: Text embedding
+        """
+        key = (model_id, text)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        embedding = encode(text)
+
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return embedding
+
+    def stats(self):
+        """
+        Get cache usage counters.
+
+        Returns:
+            dict: Number of entries, hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Remove all cached embeddings and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by all ImageGenerator instances in the process
+DEFAULT_EMBEDDING_CACHE = PromptEmbeddingCache()
+
+
+def _is_out_of_memory(error):
+    """Return True if an exception was caused by running out of memory."""
+    if isinstance(error, MemoryError):
+        return True
+    if hasattr(torch.cuda, 'OutOfMemoryError') and isinstance(error, torch.cuda.OutOfMemoryError):
+        return True
+    message = str(error).lower()
+    return "out of memory" in message or "can't allocate memory" in message
+
+
+# Linear map from Stable Diffusion 1.x latent channels to RGB, a cheap
+# stand-in for the VAE decoder that is good enough for previews
+LATENT_RGB_FACTORS = [
+    [0.3512, 0.2297, 0.3227],
+    [0.3250, 0.4974, 0.2350],
+    [-0.2829, 0.1762, 0.2721],
+    [-0.2120, -0.2616, -0.7177],
+]
+
+
+class GenerationCancelled(Exception):
+    """Raised when image generation is stopped through a CancellationToken."""
+
+
+class CancellationToken:
+    """Lets another thread stop an image generation between diffusion steps."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Ask the generation using this token to stop."""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """bool: Whether cancel() has been called."""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Raise GenerationCancelled if cancel() has been called."""
+        if self._event.is_set():
+            raise GenerationCancelled("Image generation was cancelled")
+
+
+def latents_to_preview(latents, scale=2):
+    """
+    Turn diffusion latents into low-resolution RGB previews without the VAE.
+
+    Args:
+        latents (torch.Tensor): Latents of shape (batch, 4, height / 8, width / 8)
+        scale (int): Upscaling factor applied to the 1/8-resolution preview
+
+    Returns:
+        list: One PIL.Image per batch item
+    """
+    factors = torch.tensor(LATENT_RGB_FACTORS, dtype=torch.float32, device=latents.device)
+    rgb = torch.einsum("bchw,cr->bhwr", latents.float(), factors)
+    pixels = ((rgb + 1) * 127.5).clamp(0, 255).to(torch.uint8).cpu().numpy()
+
+    previews = []
+    for array in pixels:
+        image = Image.fromarray(array)
+        if scale != 1:
+            image = image.resize((image.width * scale, image.height * scale), Image.BILINEAR)
+        previews.append(image)
+    return previews
+
+
+class _StepCallback:
+    """Pipeline step callback: times steps, streams previews and checks for cancellation."""
+
+    def __init__(self, telemetry, batch_size, total_steps, on_preview=None, preview_every=1, cancel_token=None):
+        self.telemetry = telemetry
+        self.batch_size = batch_size
+        self.total_steps = total_steps
+        self.on_preview = on_preview
+        self.preview_every = max(1, preview_every)
+        self.cancel_token = cancel_token
+        self.last = time.perf_counter()
+
+    def __call__(self, pipeline, step, timestep, callback_kwargs):
+        now = time.perf_counter()
+        self.telemetry.observe("image.diffusion_step_seconds", now - self.last, batch_size=self.batch_size)
+        self.last = now
+
+        # Raising leaves the denoising loop at once, skipping the VAE decode too
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+        done = step + 1
+        if self.on_preview is not None and (done % self.preview_every == 0 or done == self.total_steps):
+            try:
+                self.on_preview(latents_to_preview(callback_kwargs['latents']), done, self.total_steps)
+            except Exception as e:
+                self.telemetry.log(f"⚠️ Preview callback failed: {e}", level="warning")
+        return callback_kwargs
+
+
+def image_seeds(seed, count):
+    """
+    Expand a seed argument into one seed per image.
+
+    Args:
+        seed (int or list): None, a base seed (image i gets seed + i) or a
+            list with one seed (or None) per image
+        count (int): Number of images
+
+    Returns:
+        list: Seed or None per image
+    """
+    if seed is None:
+        return [None] * count
+    if isinstance(seed, int):
+        return [seed + i for i in range(count)]
+    seeds = list(seed)
+    if len(seeds) != count:
+        raise ValueError(f"Got {len(seeds)} seeds for {count} images")
+    return seeds
+
+
+
+def scene_seeds(seed, count):
+    """
+    Derive the image seeds of a chapter's scenes from the chapter's seed.
+
+    Chapter seeds are consecutive, so scene i cannot simply use seed + i:
+    scene 2 of one chapter would share its seed, and its starting noise,
+    with scene 1 of the next. Each scene seed is hashed from the chapter
+    seed and the scene number instead.
+
+    Args:
+        seed (int): Chapter seed, or None for random images
+        count (int): Number of scenes
+
+    Returns:
+        list: Seed or None per scene
+    """
+    if seed is None:
+        return [None] * count
+    return [
+        int.from_bytes(hashlib.blake2b(f"{seed}:{scene}".encode(), digest_size=8).digest(), "big") >> 1
+        for scene in range(1, count + 1)
+    ]
 
 class ImageGenerator:
     """Handles AI image generation using Stable Diffusion."""
     
-    def __init__(self, model_id="runwayml/stable-diffusion-v1-5"):
+    def __init__(self, model_id="runwayml/stable-diffusion-v1-5", embedding_cache=None, image_cache=None,
+                 resolver=None, quality=DEFAULT_QUALITY, display=None, circuit_breaker=None):
         """
         Initialize the image generator.
+
+        The model is loaded by load_model(), or automatically the first time an
+        image is not found in the image cache.
         
         Args:
             model_id (str): Hugging Face model ID for Stable Diffusion
+            embedding_cache (PromptEmbeddingCache): Cache for prompt embeddings
+                (defaults to a cache shared across the process)
+            image_cache (ImageCache): On-disk cache of generated images (defaults
+                to the user cache directory; pass False to turn caching off)
+            resolver (ModelResolver): Decides which model candidate to load and
+                whether the network is needed
+            quality (str): Default quality preset ("draft", "standard" or "final")
+            display (NullDisplay or str): Where generated images are shown: a
+                display sink or one of the modes of create_display() (defaults
+                to a matplotlib figure per image; "none" for headless runs)
+            circuit_breaker (CircuitBreaker): Switches to placeholder images
+                while the model is missing or failing (defaults to one opening
+                after 3 consecutive failures and retrying every 60 seconds)
         """
+        self._check_quality(quality)
         self.model_id = model_id
+        # Model that actually loaded, which may be a fallback of model_id
+        self.loaded_model_id = None
+        self.quality = quality
+        self.resolver = resolver or ModelResolver()
+        self.embedding_cache = embedding_cache if embedding_cache is not None else DEFAULT_EMBEDDING_CACHE
+        if image_cache is None:
+            image_cache = ImageCache()
+        self.image_cache = image_cache or None
+        if display is None:
+            display = MatplotlibDisplay()
+        elif isinstance(display, str):
+            display = create_display(display)
+        self.display = display
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60.0, name="image.breaker")
+        self.circuit_breaker = circuit_breaker
+        self.placeholders = PlaceholderRenderer()
+        # Concurrent identical seeded requests share one generation
+        self.coalescer = RequestCoalescer(name="image.coalescer")
         self.pipeline = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
         self.model_loaded = False
+        self.load_attempted = False
+        self._load_lock = threading.Lock()
+        self._release = None
+        self._pipeline_views = {}
     
     def load_model(self):
-        """Load the Stable Diffusion model with fallback options."""
-        print("Loading image generation model...")
+        """
+        Load the Stable Diffusion model with fallback options.
+
+        The requested model is tried first, then the fallbacks. Candidates that
+        are already on disk are loaded without touching the network; the others
+        are only tried if the Hub answers within the resolver's deadline.
+        Pipelines come from the process-wide model registry, so generators
+        using the same model, device and dtype share one copy of it.
+        """
+        self.close()
+        self.load_attempted = True
+        telemetry = get_telemetry()
+        telemetry.log("Loading image generation model...")
         
         # Try multiple model options with fallbacks
         model_options = [
+            self.model_id,
             "runwayml/stable-diffusion-v1-5",
             "CompVis/stable-diffusion-v1-4", 
             "stabilityai/stable-diffusion-2-1-base"
         ]
+        registry = get_registry()
         
-        for model_id in model_options:
-            try:
-                print(f"Attempting to load: {model_id}")
-                
-                self.pipeline = StableDiffusionPipeline.from_pretrained(
-                    model_id,
-                    torch_dtype=self.torch_dtype,
-                    use_safetensors=True,
-                    resume_download=True,
-                    local_files_only=False,
-                    use_auth_token=False,
-                    low_cpu_mem_usage=True
-                )
-                
-                self.pipeline = self.pipeline.to(self.device)
-                
-                # Enable memory efficient attention if using GPU
-                if torch.cuda.is_available():
-                    self.pipeline.enable_attention_slicing()
-                    self.pipeline.enable_model_cpu_offload()
-                
-                print("✅ Image generation model loaded successfully!")
-                print(f"Model: {model_id}")
-                print(f"Device: {self.device}")
-                self.model_loaded = True
-                self.model_id = model_id
-                break
+        for model_id, local_files_only in self.resolver.resolve("stable-diffusion", model_options):
+            key = ("stable-diffusion", model_id, self.device, str(self.torch_dtype).replace("torch.", ""))
+
+            def load():
+                telemetry.log(f"Attempting to load: {model_id}")
                 
+                with telemetry.span("model.load", kind="stable-diffusion", model=model_id, device=self.device):
+                    pipeline = StableDiffusionPipeline.from_pretrained(
+                        model_id,
+                        torch_dtype=self.torch_dtype,
+                        use_safetensors=True,
+                        resume_download=True,
+                        local_files_only=local_files_only,
+                        use_auth_token=False,
+                        low_cpu_mem_usage=True
+                    )
+                    
+                    pipeline = pipeline.to(self.device)
+                    
+                    # Enable memory efficient attention if using GPU
+                    if torch.cuda.is_available():
+                        pipeline.enable_attention_slicing()
+                        pipeline.enable_model_cpu_offload()
+                return pipeline
+
+            try:
+                pipeline = registry.acquire(key, load)
             except Exception as e:
-                print(f"❌ Failed to load {model_id}: {str(e)[:100]}...")
+                telemetry.log(f"❌ Failed to load {model_id}: {str(e)[:100]}...", level="error")
+                self.resolver.record_failure("stable-diffusion", model_id, e)
                 continue
+
+            self.resolver.record_success("stable-diffusion", model_id)
+                
+            self.pipeline = pipeline
+            # Give the pipeline back to the registry when this generator is
+            # closed or garbage collected
+            self._release = weakref.finalize(self, registry.release, key)
+            telemetry.log("✅ Image generation model loaded successfully!")
+            telemetry.log(f"Model: {model_id}")
+            telemetry.log(f"Device: {self.device}")
+            self.model_loaded = True
+            self.loaded_model_id = model_id
+            break
         
         if not self.model_loaded:
-            print("⚠️ Could not load any Stable Diffusion model.")
-            print("Image generation will use placeholder images.")
+            telemetry.log("⚠️ Could not load any Stable Diffusion model.", level="warning")
+            telemetry.log("Image generation will use placeholder images.", level="warning")
+
+    def close(self):
+        """
+        Release the pipeline so the registry can unload it when memory is needed.
+
+        The model is loaded again on the next image that is not cached.
+        """
+        if self._release is not None:
+            self._release()
+            self._release = None
+        self.pipeline = None
+        self._pipeline_views = {}
+        self.model_loaded = False
+        self.loaded_model_id = None
+        self.load_attempted = False
     
     def generate_image(self, prompt, style="fantasy art, detailed, high quality", 
-                      negative_prompt="blurry, low quality, distorted"):
+                      negative_prompt="blurry, low quality, distorted", quality=None, on_preview=None,
+                      preview_every=1, cancel_token=None, seed=None):
         """
         Generate an image based on a text description.
 
+        With a seed, the same request always gives the same image, and
+        identical seeded requests made while one is already running wait for
+        it and get a copy of its image instead of generating again. Requests
+        with previews or a cancel token are never shared, since those belong
+        to one caller.
+
         Args:
             prompt (str): Text description to generate image from
             style (str): Art style specification
             negative_prompt (str): What to avoid in the image
+            quality (str): Quality preset (defaults to the generator's quality)
+            on_preview (callable): Called as on_preview(images, step, total_steps)
+                with low-resolution previews while the image is denoised
+            preview_every (int): Steps between previews
+            cancel_token (CancellationToken): Stops the generation between steps
+            seed (int): Random seed for a reproducible image (None for random)
 
         Returns:
             PIL.Image: Generated image
+
+        Raises:
+            GenerationCancelled: If the cancel token was cancelled
+        """
+        def generate():
+            return self.generate_images([prompt], style=style, negative_prompt=negative_prompt, batch_size=1,
+                                        quality=quality, on_preview=on_preview, preview_every=preview_every,
+                                        cancel_token=cancel_token, seed=seed)[0]
+
+        if seed is None or on_preview is not None or cancel_token is not None:
+            return generate()
+        settings = self.quality_settings(quality)
+        key = (prompt, style, negative_prompt, settings['scheduler'], settings['steps'],
+               settings['guidance_scale'], settings['size'], seed)
+        return self.coalescer.run(key, generate, share=lambda image: image.copy())
+
+    def generate_images(self, prompts, style="fantasy art, detailed, high quality",
+                        negative_prompt="blurry, low quality, distorted", batch_size=None, quality=None,
+                        on_preview=None, preview_every=1, cancel_token=None, seed=None):
+        """
+        Generate images for several prompts, running them through the pipeline in batches.
+
+        Images found in the image cache are returned without running (or
+        loading) the pipeline. If a batch runs out of memory it is retried at
+        half the size, down to single images. Prompts that still fail get a
+        placeholder image, which is never cached.
+
+        Failures are reported to the circuit breaker. While it is open, every
+        missing image is a placeholder right away, without loading or running
+        the model; once its timeout has passed, one call tries again
+        (reloading the model if it could not be loaded before).
+
+        Seeded images do not depend on the batch they are generated in (up
+        to floating-point rounding): every image gets its own torch.Generator,
+        created on the CPU so that seeds also reproduce across devices.
+
+        Args:
+            prompts (list): Text descriptions to generate images from
+            style (str): Art style specification applied to every prompt
+            negative_prompt (str): What to avoid in the images
+            batch_size (int): Images per pipeline call (picked from free memory if None)
+            quality (str): Quality preset (defaults to the generator's quality)
+            on_preview (callable): Called as on_preview(images, step, total_steps)
+                with low-resolution previews of the batch being denoised
+            preview_every (int): Steps between previews
+            cancel_token (CancellationToken): Stops the generation between steps
+            seed (int or list): Random seed; image i uses seed + i. A list gives
+                one seed (or None for random) per prompt
+
+        Returns:
+            list: Generated images (PIL.Image), in prompt order
+
+        Raises:
+            GenerationCancelled: If the cancel token was cancelled; images
+                finished before that are already cached
         """
+        settings = self.quality_settings(quality)
+        prompts = list(prompts)
+        images = [None] * len(prompts)
+        telemetry = get_telemetry()
+        seeds = image_seeds(seed, len(prompts))
+
+        # The model the lookups below are keyed on (see _cache_key)
+        looked_up_model = self.loaded_model_id or self.model_id
+        missing = []
+        for i, prompt in enumerate(prompts):
+            if self.image_cache is not None:
+                images[i] = self.image_cache.get(self._cache_key(prompt, style, negative_prompt, settings, seeds[i]))
+            if images[i] is None:
+                missing.append(i)
+
+        if self.image_cache is not None:
+            telemetry.counter("image.cache_hits", len(prompts) - len(missing))
+            telemetry.counter("image.cache_misses", len(missing))
+
+        if not missing:
+            return images
+
+        breaker = self.circuit_breaker
+        if not breaker.allow():
+            telemetry.counter("image.placeholders", len(missing), reason="circuit_open")
+            for i in missing:
+                images[i] = self.create_placeholder_image(prompts[i])
+            return images
+
+        with self._load_lock:
+            if self.load_attempted and not self.model_loaded:
+                # Allowed after an outage: see whether the model loads now
+                self.load_attempted = False
+        self._ensure_model()
         if not self.model_loaded or not self.pipeline:
-            print("⚠️ Image generator not available. Creating placeholder image...")
-            return self.create_placeholder_image(prompt)
+            breaker.trip("image model could not be loaded")
+            telemetry.log("⚠️ Image generator not available. Creating placeholder images...", level="warning")
+            telemetry.counter("image.placeholders", len(missing), reason="model_unavailable")
+            for i in missing:
+                images[i] = self.create_placeholder_image(prompts[i])
+            return images
 
-        try:
-            # Enhance the prompt with style information
-            enhanced_prompt = f"{prompt}, {style}"
-
-            # Generate image with timeout handling
-            with torch.no_grad():
-                image = self.pipeline(
-                    enhanced_prompt,
-                    negative_prompt=negative_prompt,
-                    num_inference_steps=20,  # Reduced for faster generation
-                    guidance_scale=7.5,
-                    height=512,
-                    width=512
-                ).images[0]
-
-            return image
+        if self.image_cache is not None and self.loaded_model_id != looked_up_model:
+            # A fallback loaded, and may have rendered some of these before
+            for i in missing:
+                images[i] = self.image_cache.get(self._cache_key(prompts[i], style, negative_prompt, settings, seeds[i]))
+            telemetry.counter("image.cache_hits", sum(images[i] is not None for i in missing))
+            missing = [i for i in missing if images[i] is None]
+            if not missing:
+                return images
 
-        except Exception as e:
-            print(f"Error generating image: {str(e)[:100]}...")
-            return self.create_placeholder_image(prompt)
-    
-    def create_placeholder_image(self, text, size=(512, 512)):
+        if batch_size is None:
+            batch_size = self.auto_batch_size(height=settings['size'][1], width=settings['size'][0])
+        batch_size = max(1, batch_size)
+
+        step_options = {'on_preview': on_preview, 'preview_every': preview_every, 'cancel_token': cancel_token}
+        start = 0
+        # The first batch was allowed above; later ones ask again, since
+        # earlier batches may have opened the breaker
+        allowed = True
+        while start < len(missing):
+            batch = missing[start:start + batch_size]
+            batch_prompts = [prompts[i] for i in batch]
+            batch_seeds = [seeds[i] for i in batch]
+            if not allowed and not breaker.allow():
+                telemetry.counter("image.placeholders", len(batch_prompts), reason="circuit_open")
+                generated = [self.create_placeholder_image(prompt) for prompt in batch_prompts]
+            else:
+                allowed = True
+                try:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    generated = self._run_pipeline(batch_prompts, style, negative_prompt, settings, step_options,
+                                                   batch_seeds)
+                except GenerationCancelled:
+                    breaker.release()
+                    telemetry.counter("image.cancelled", len(missing) - start)
+                    raise
+                except Exception as e:
+                    if _is_out_of_memory(e) and batch_size > 1:
+                        batch_size //= 2
+                        if torch.cuda.is_available():
+                            torch.cuda.empty_cache()
+                        telemetry.counter("image.oom_retries")
+                        telemetry.log(f"⚠️ Out of memory, retrying with batch size {batch_size}...", level="warning")
+                        continue
+                    breaker.record_failure(e)
+                    telemetry.log(f"Error generating image: {str(e)[:100]}...", level="error")
+                    telemetry.counter("image.placeholders", len(batch_prompts), reason="generation_error")
+                    generated = [self.create_placeholder_image(prompt) for prompt in batch_prompts]
+                else:
+                    breaker.record_success()
+                    if self.image_cache is not None:
+                        for prompt, image_seed, image in zip(batch_prompts, batch_seeds, generated):
+                            key = self._cache_key(prompt, style, negative_prompt, settings, image_seed)
+                            self.image_cache.put(key, image)
+
+            for i, image in zip(batch, generated):
+                images[i] = image
+            start += len(batch)
+            allowed = False
+
+        return images
+
+    def _ensure_model(self):
+        """Load the model on first use if load_model() has not been called yet."""
+        with self._load_lock:
+            if not self.load_attempted:
+                self.load_model()
+
+    def quality_settings(self, quality=None):
         """
-        Create a simple placeholder image with text when image generation fails.
+        Get the diffusion settings of a quality preset.
 
         Args:
-            text (str): Text to display on placeholder
-            size (tuple): Image size
+            quality (str): Preset name (defaults to the generator's quality)
 
         Returns:
-            PIL.Image: Placeholder image
+            dict: Scheduler name, number of steps, guidance scale and (width, height)
+        """
+        quality = quality or self.quality
+        self._check_quality(quality)
+        return QUALITY_PRESETS[quality]
+
+    @staticmethod
+    def _check_quality(quality):
+        """Raise ValueError for an unknown quality preset."""
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown image quality: {quality} (choose from {', '.join(QUALITY_PRESETS)})")
+
+    def _cache_key(self, prompt, style, negative_prompt, settings, seed=None):
+        """
+        Build the image cache key for a generation request.
+
+        The key names the model that renders the image: the loaded model,
+        or before loading the requested one, so a new process finds images
+        of the requested model without loading any model. Images rendered
+        by a fallback are keyed on the fallback and never served for the
+        requested model.
+
+        Args:
+            prompt (str): Text description
+            style (str): Art style specification
+            negative_prompt (str): What to avoid in the image
+            settings (dict): Diffusion settings from quality_settings()
+            seed (int): Random seed, if any
+
+        Returns:
+            str: Cache key
+        """
+        return ImageCache.make_key(
+            model_id=self.loaded_model_id or self.model_id,
+            prompt=prompt,
+            style=style,
+            negative_prompt=negative_prompt,
+            scheduler=settings['scheduler'],
+            steps=settings['steps'],
+            guidance=settings['guidance_scale'],
+            size=settings['size'],
+            seed=seed
+        )
+
+    def auto_batch_size(self, height=512, width=512, max_batch_size=8):
         """
-        # Create a light blue background
-        img = Image.new('RGB', size, color='lightblue')
-        draw = ImageDraw.Draw(img)
+        Pick a diffusion batch size from the memory currently available.
+
+        Args:
+            height (int): Image height in pixels
+            width (int): Image width in pixels
+            max_batch_size (int): Upper limit on the batch size
 
-        # Try to use a default font, fallback to basic if not available
+        Returns:
+            int: Number of images to generate per pipeline call
+        """
+        available = self._available_memory()
+        if available is None:
+            return 1
+
+        per_image = IMAGE_MEMORY_PER_BATCH_ITEM[self.device] * (height * width) / (512 * 512)
+        # Keep some headroom for the rest of the process
+        return max(1, min(max_batch_size, int(available * 0.8 // per_image)))
+
+    def _available_memory(self):
+        """Return free memory in bytes on the generation device, or None if unknown."""
         try:
-            font = ImageFont.truetype("arial.ttf", 16)
-        except:
-            font = ImageFont.load_default()
+            if self.device == "cuda":
+                return torch.cuda.mem_get_info()[0]
 
-        # Add placeholder text
-        placeholder_text = "🖼️ IMAGE PLACEHOLDER\n\n" + text[:60] + "..."
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+            return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError, RuntimeError):
+            return None
 
-        # Calculate text position (centered)
-        bbox = draw.textbbox((0, 0), placeholder_text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+    def _pipeline_with_scheduler(self, scheduler_name):
+        """
+        Get a view of the loaded pipeline that uses another scheduler.
 
-        x = (size[0] - text_width) // 2
-        y = (size[1] - text_height) // 2
+        The view shares the UNet, VAE and text encoder with the loaded
+        pipeline and only has its own scheduler, so switching presets costs
+        no memory and never changes the pipeline other generators share.
 
-        # Draw text with shadow effect
-        draw.text((x+2, y+2), placeholder_text, fill='gray', font=font, align='center')
-        draw.text((x, y), placeholder_text, fill='black', font=font, align='center')
+        Args:
+            scheduler_name (str): Name from SCHEDULERS
+
+        Returns:
+            StableDiffusionPipeline: Pipeline to run
+        """
+        if SCHEDULERS[scheduler_name] is None:
+            return self.pipeline
+
+        with self._load_lock:
+            view = self._pipeline_views.get(scheduler_name)
+            if view is None:
+                scheduler_class, options = SCHEDULERS[scheduler_name]
+                components = dict(self.pipeline.components)
+                components['scheduler'] = scheduler_class.from_config(self.pipeline.scheduler.config, **options)
+                if 'requires_safety_checker' in self.pipeline.config:
+                    components['requires_safety_checker'] = self.pipeline.config.requires_safety_checker
+                view = type(self.pipeline)(**components)
+                view.set_progress_bar_config(**getattr(self.pipeline, '_progress_bar_config', {}))
+                self._pipeline_views[scheduler_name] = view
+            return view
+
+    def _run_pipeline(self, prompts, style, negative_prompt, settings, step_options=None, seeds=None):
+        """
+        Run one batch of prompts through the diffusion pipeline.
+
+        Args:
+            prompts (list): Text descriptions in this batch
+            style (str): Art style specification
+            negative_prompt (str): What to avoid in the images
+            settings (dict): Diffusion settings from quality_settings()
+            step_options (dict): on_preview, preview_every and cancel_token
+                for the step callback
+            seeds (list): Random seed (or None) per prompt
+
+        Returns:
+            list: Generated images (PIL.Image)
+        """
+        # Enhance the prompts with style information
+        enhanced_prompts = [f"{prompt}, {style}" for prompt in prompts]
+        telemetry = get_telemetry()
+
+        with torch.no_grad():
+            # Encode through the embedding cache so repeated texts (the negative
+            # prompt in particular) skip the text encoder
+            prompt_embeds = torch.cat([self._encode_text(text) for text in enhanced_prompts])
+            negative_prompt_embeds = self._encode_text(negative_prompt).repeat(len(prompts), 1, 1)
+
+            pipeline = self._pipeline_with_scheduler(settings['scheduler'])
+            generators = None
+            if seeds is not None and any(seed is not None for seed in seeds):
+                # One generator per image; unseeded images in the batch get a random seed
+                generators = [torch.Generator("cpu") for _ in seeds]
+                for generator, seed in zip(generators, seeds):
+                    if seed is None:
+                        generator.seed()
+                    else:
+                        generator.manual_seed(seed)
+            with telemetry.span("image.diffusion", batch_size=len(prompts), steps=settings['steps'],
+                                scheduler=settings['scheduler']):
+                return pipeline(
+                    prompt_embeds=prompt_embeds,
+                    negative_prompt_embeds=negative_prompt_embeds,
+                    num_inference_steps=settings['steps'],
+                    guidance_scale=settings['guidance_scale'],
+                    height=settings['size'][1],
+                    width=settings['size'][0],
+                    generator=generators,
+                    callback_on_step_end=_StepCallback(telemetry, len(prompts), settings['steps'],
+                                                       **(step_options or {}))
+                ).images
+    
+    def _encode_text(self, text):
+        """
+        Get the text-encoder embedding of a prompt, using the embedding cache.
+
+        Args:
+            text (str): Prompt text
+
+        Returns:
+            torch.Tensor: Embedding of shape (1, tokens, hidden size)
+        """
+        def encode(value):
+            with get_telemetry().span("image.encode_prompt"):
+                return self.pipeline.encode_prompt(
+                    value,
+                    device=self.pipeline._execution_device,
+                    num_images_per_prompt=1,
+                    do_classifier_free_guidance=False
+                )[0]
 
-        return img
+        return self.embedding_cache.get_or_encode(self.loaded_model_id, text, encode)
     
-    def display_image_with_caption(self, image, caption, max_width=400):
+    def create_placeholder_image(self, text, size=(512, 512)):
+        """
+        Create a simple placeholder image with text when image generation fails.
+
+        Args:
+            text (str): Text to display on placeholder
+            size (tuple): Image size
+
+        Returns:
+            PIL.Image: Placeholder image
+        """
+        return self.placeholders.render(text, size)
+    
+    def display_image_with_caption(self, image, caption):
         """
-        Display an image with a caption.
+        Display an image with a caption on the generator's display.
 
         Args:
             image (PIL.Image): Image to display
             caption (str): Caption text
-            max_width (int): Maximum display width
-        """
-        plt.figure(figsize=(max_width/100, max_width/100))
-        plt.imshow(image)
-        plt.axis('off')
-        plt.title(caption, fontsize=12, wrap=True)
-        plt.tight_layout()
-        plt.show()
+        """
+        self.display.show(image, caption)
     
-    def generate_story_images(self, scene_descriptions, art_style="fantasy art, detailed, high quality"):
+    def generate_story_images(self, scene_descriptions, art_style="fantasy art, detailed, high quality",
+                              display=True, batch_size=None, quality=None, on_preview=None,
+                              cancel_token=None, title=None, seed=None):
         """
         Generate multiple images for story scenes.
         
         Args:
             scene_descriptions (list): List of scene descriptions
             art_style (str): Art style for all images
+            display (bool): Whether to show the images on the generator's display
+            batch_size (int): Scenes per diffusion batch (picked from free memory if None)
+            quality (str): Quality preset (defaults to the generator's quality)
+            on_preview (callable): Called as on_preview(images, step, total_steps)
+                with low-resolution previews while images are denoised
+            cancel_token (CancellationToken): Stops the generation between steps
+            title (str): Title the images are displayed under, e.g. the chapter
+            seed (int): Random seed; scene i is generated with seed + i - 1
             
         Returns:
             list: List of generated images with metadata
+
+        Raises:
+            GenerationCancelled: If the cancel token was cancelled
         """
         images = []
+        telemetry = get_telemetry()
         
-        print(f"🎨 Generating {len(scene_descriptions)} image(s)...")
+        telemetry.log(f"🎨 Generating {len(scene_descriptions)} image(s)...")
         
-        for i, scene in enumerate(scene_descriptions):
-            try:
-                image = self.generate_image(scene, style=art_style)
-                image_info = {
-                    'scene': i + 1,
-                    'description': scene,
-                    'image': image
-                }
-                images.append(image_info)
-                
-                # Display image
-                self.display_image_with_caption(
-                    image,
-                    f"Scene {i+1}: {scene[:50]}..."
-                )
-                
-            except Exception as e:
-                print(f"❌ Error generating image for scene {i+1}: {e}")
+        try:
+            with telemetry.span("image.generate_story_images", scenes=len(scene_descriptions)):
+                generated = self.generate_images(scene_descriptions, style=art_style, batch_size=batch_size,
+                                                 quality=quality, on_preview=on_preview,
+                                                 cancel_token=cancel_token, seed=seed)
+        except GenerationCancelled:
+            telemetry.log("⏹️ Image generation cancelled")
+            raise
+        except Exception as e:
+            telemetry.log(f"❌ Error generating images: {e}", level="error")
+            return images
+        
+        seeds = image_seeds(seed, len(scene_descriptions))
+        for i, (scene, image) in enumerate(zip(scene_descriptions, generated)):
+            image_info = {
+                'scene': i + 1,
+                'description': scene,
+                'seed': seeds[i],
+                'image': image
+            }
+            images.append(image_info)
+        
+        # Shown as one group, so a contact sheet display can tile the scenes
+        if display:
+            self.display.show_group(
+                [(info['image'], f"Scene {info['scene']}: {info['description'][:50]}...") for info in images],
+                title=title
+            )
         
-        return images
\ No newline at end of file
+        return images
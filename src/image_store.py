@@ -0,0 +1,255 @@
+"""Memory-bounded store for the images of an interactive session."""
+
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+from PIL import Image
+
+from .telemetry import get_telemetry
+
+
+def image_bytes(image):
+    """
+    Estimate the memory held by an image's pixel data.
+
+    Args:
+        image (PIL.Image): Image
+
+    Returns:
+        int: Size in bytes
+    """
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageStore:
+    """Keeps a session's images without holding them all in memory.
+
+    Full-resolution images live in a least-recently-used cache capped at
+    max_bytes; images pushed out of it are written ("spilled") to a private
+    session directory and loaded back when they are asked for again. Small
+    thumbnails are kept in a second LRU cache capped at max_thumbnail_bytes
+    and rebuilt from the full image when needed. Only the image metadata
+    (chapter, scene, description, ...) is kept for every image.
+
+    The store is thread-safe, so images can be added from a background
+    generation thread while the notebook reads them. clear() drops every
+    image and deletes the session directory.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, max_thumbnail_bytes=8 * 2**20, thumbnail_size=128,
+                 session_dir=None):
+        """
+        Initialize the image store.
+
+        Args:
+            max_bytes (int): Memory cap for full-resolution images
+            max_thumbnail_bytes (int): Memory cap for thumbnails
+            thumbnail_size (int): Longest side of a thumbnail in pixels
+            session_dir (str): Directory in which the spill directory is
+                created (defaults to the system temporary directory)
+        """
+        if max_bytes < 0 or max_thumbnail_bytes < 0:
+            raise ValueError("Memory caps must not be negative")
+
+        self.max_bytes = max_bytes
+        self.max_thumbnail_bytes = max_thumbnail_bytes
+        self.thumbnail_size = thumbnail_size
+        self.session_dir = session_dir
+
+        self._info = OrderedDict()      # image id -> metadata, in insertion order
+        self._images = OrderedDict()    # image id -> full image, least recently used first
+        self._thumbnails = OrderedDict()
+        self._image_bytes = 0
+        self._thumbnail_bytes = 0
+        self._spilled = set()
+        self._next_id = 1
+        self._spill_dir = None
+        self._cleanup = None
+        self._stats = {'spills': 0, 'loads': 0}
+        self._lock = threading.RLock()
+
+    def add(self, image, **info):
+        """
+        Add an image.
+
+        Args:
+            image (PIL.Image): Full-resolution image
+            **info: Metadata kept with the image (e.g. chapter, scene, description)
+
+        Returns:
+            str: Id of the stored image
+        """
+        with self._lock:
+            image_id = f"img-{self._next_id:06d}"
+            self._next_id += 1
+            self._info[image_id] = {'image_id': image_id, 'size': image.size, **info}
+            self._put_thumbnail(image_id, self._make_thumbnail(image))
+            self._put_image(image_id, image)
+        return image_id
+
+    def get(self, image_id):
+        """
+        Get a full-resolution image, loading it back from disk if it was spilled.
+
+        Args:
+            image_id (str): Id returned by add()
+
+        Returns:
+            PIL.Image: The image
+
+        Raises:
+            KeyError: If the store holds no image with this id
+        """
+        with self._lock:
+            if image_id not in self._info:
+                raise KeyError(image_id)
+            image = self._images.get(image_id)
+            if image is not None:
+                self._images.move_to_end(image_id)
+                return image
+
+            with Image.open(self._spill_path(image_id)) as spilled:
+                image = spilled.copy()
+            self._stats['loads'] += 1
+            get_telemetry().counter("image_store.loads")
+            self._put_image(image_id, image)
+            return image
+
+    def thumbnail(self, image_id):
+        """
+        Get a thumbnail of an image.
+
+        Args:
+            image_id (str): Id returned by add()
+
+        Returns:
+            PIL.Image: Thumbnail no larger than thumbnail_size on either side
+
+        Raises:
+            KeyError: If the store holds no image with this id
+        """
+        with self._lock:
+            thumbnail = self._thumbnails.get(image_id)
+            if thumbnail is not None:
+                self._thumbnails.move_to_end(image_id)
+                return thumbnail
+            thumbnail = self._make_thumbnail(self.get(image_id))
+            self._put_thumbnail(image_id, thumbnail)
+            return thumbnail
+
+    def info(self, image_id):
+        """
+        Get the metadata of an image.
+
+        Args:
+            image_id (str): Id returned by add()
+
+        Returns:
+            dict: Metadata passed to add(), plus "image_id" and "size"
+        """
+        with self._lock:
+            return dict(self._info[image_id])
+
+    def entries(self):
+        """
+        List the metadata of every image, in the order they were added.
+
+        Returns:
+            list: Metadata dicts, see info()
+        """
+        with self._lock:
+            return [dict(info) for info in self._info.values()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._info)
+
+    def memory_usage(self):
+        """
+        Report the store's current footprint.
+
+        Returns:
+            dict: Image counts (total, full images in memory, spilled to
+                disk, thumbnails in memory), bytes held by full images and
+                thumbnails, their total, bytes on disk, and spill/load counts
+        """
+        with self._lock:
+            disk_bytes = 0
+            for image_id in self._spilled:
+                try:
+                    disk_bytes += os.path.getsize(self._spill_path(image_id))
+                except OSError:
+                    pass
+            return {
+                'images': len(self._info),
+                'in_memory': len(self._images),
+                'on_disk': len(self._spilled),
+                'thumbnails': len(self._thumbnails),
+                'image_bytes': self._image_bytes,
+                'thumbnail_bytes': self._thumbnail_bytes,
+                'memory_bytes': self._image_bytes + self._thumbnail_bytes,
+                'disk_bytes': disk_bytes,
+                **self._stats
+            }
+
+    def clear(self):
+        """Drop every image and thumbnail and delete the session directory."""
+        with self._lock:
+            self._info.clear()
+            self._images.clear()
+            self._thumbnails.clear()
+            self._image_bytes = 0
+            self._thumbnail_bytes = 0
+            self._spilled.clear()
+            if self._cleanup is not None:
+                self._cleanup()
+            self._spill_dir = None
+            self._cleanup = None
+
+    def _make_thumbnail(self, image):
+        """Scale a copy of an image down to thumbnail size."""
+        thumbnail = image.copy()
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        return thumbnail
+
+    def _put_image(self, image_id, image):
+        """Cache a full image, spilling the least recently used ones over the cap."""
+        self._images[image_id] = image
+        self._image_bytes += image_bytes(image)
+        # The newest image stays even if it alone is over the cap
+        while self._image_bytes > self.max_bytes and len(self._images) > 1:
+            old_id, old_image = self._images.popitem(last=False)
+            self._image_bytes -= image_bytes(old_image)
+            if old_id not in self._spilled:
+                self._spill(old_id, old_image)
+
+    def _put_thumbnail(self, image_id, thumbnail):
+        """Cache a thumbnail, dropping the least recently used ones over the cap."""
+        self._thumbnails[image_id] = thumbnail
+        self._thumbnail_bytes += image_bytes(thumbnail)
+        while self._thumbnail_bytes > self.max_thumbnail_bytes and len(self._thumbnails) > 1:
+            _, old_thumbnail = self._thumbnails.popitem(last=False)
+            self._thumbnail_bytes -= image_bytes(old_thumbnail)
+
+    def _spill(self, image_id, image):
+        """Write an image to the session directory."""
+        if self._spill_dir is None:
+            if self.session_dir:
+                os.makedirs(self.session_dir, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="story-images-", dir=self.session_dir)
+            # Removes the directory on clear(), garbage collection or interpreter exit
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+
+        # Fast compression; these files only live for the session
+        image.save(self._spill_path(image_id), format="PNG", compress_level=1)
+        self._spilled.add(image_id)
+        self._stats['spills'] += 1
+        get_telemetry().counter("image_store.spills")
+
+    def _spill_path(self, image_id):
+        """Path a spilled image is stored at."""
+        return os.path.join(self._spill_dir, f"{image_id}.png")
@@ -0,0 +1,270 @@
+"""Process-wide registry of shared, reference-counted model pipelines."""
+
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_model_size(model):
+    """
+    Estimate the memory held by a model's parameters and buffers.
+
+    Works for torch modules, transformers pipelines (through their ``model``)
+    and diffusers pipelines (through their ``components``).
+
+    Args:
+        model: Loaded model or pipeline
+
+    Returns:
+        int: Size in bytes
+    """
+    import torch
+
+    modules = []
+    if isinstance(model, torch.nn.Module):
+        modules.append(model)
+    elif hasattr(model, 'components'):
+        modules.extend(c for c in model.components.values() if isinstance(c, torch.nn.Module))
+    elif isinstance(getattr(model, 'model', None), torch.nn.Module):
+        modules.append(model.model)
+
+    size = 0
+    seen = set()
+    for module in modules:
+        tensors = list(module.parameters()) + list(module.buffers())
+        # Dynamically quantized layers keep their int8 weights in packed
+        # parameters, which only show up in the state dict
+        for value in module.state_dict().values():
+            for item in value if isinstance(value, tuple) else (value,):
+                if isinstance(item, torch.Tensor):
+                    tensors.append(item)
+        for tensor in tensors:
+            # Tied weights are shared tensors; count them once
+            if tensor.data_ptr() in seen:
+                continue
+            seen.add(tensor.data_ptr())
+            size += tensor.numel() * tensor.element_size()
+    return size
+
+
+class _Entry:
+    """A loaded model together with its bookkeeping."""
+
+    def __init__(self, model, size_bytes):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.refcount = 1
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class ModelRegistry:
+    """Hands out shared model instances keyed by (kind, model id, device, dtype).
+
+    Each acquire() increments the model's reference count and must be paired
+    with a release(). Models nobody holds stay loaded for reuse until the
+    total size exceeds the memory budget, at which point the least recently
+    used idle models are evicted.
+    """
+
+    def __init__(self, memory_budget_bytes=None):
+        """
+        Initialize the registry.
+
+        Args:
+            memory_budget_bytes (int): Total model size to keep loaded before
+                idle models are evicted (None for no limit)
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        # Reentrant: a garbage collection triggered while the lock is held can
+        # run a generator's finalizer, which calls release() on this thread
+        self._lock = threading.RLock()
+
+    def acquire(self, key, loader):
+        """
+        Get the shared model for a key, loading it on first use.
+
+        Args:
+            key (tuple): (kind, model id, device, dtype) identifying the model
+            loader (callable): Function that loads the model; exceptions are
+                passed to the caller and nothing is registered
+
+        Returns:
+            object: The shared model instance
+        """
+        with self._lock:
+            entry = self._take(key)
+            if entry is not None:
+                return entry.model
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other models stay available, but
+        # only once per key when several callers ask at the same time
+        with key_lock:
+            with self._lock:
+                entry = self._take(key)
+                if entry is not None:
+                    return entry.model
+
+            model = loader()
+            size_bytes = estimate_model_size(model)
+
+            with self._lock:
+                self._entries[key] = _Entry(model, size_bytes)
+                evicted = self._enforce_budget()
+            self._drop(evicted)
+
+        return model
+
+    def release(self, key):
+        """
+        Give back a model obtained from acquire().
+
+        Args:
+            key (tuple): Key the model was acquired with
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                return
+            entry.refcount -= 1
+            entry.last_used = time.time()
+            evicted = self._enforce_budget()
+        self._drop(evicted)
+
+    def set_memory_budget(self, memory_budget_bytes):
+        """
+        Change the memory budget and evict idle models that no longer fit.
+
+        Args:
+            memory_budget_bytes (int): New budget in bytes (None for no limit)
+        """
+        with self._lock:
+            self.memory_budget_bytes = memory_budget_bytes
+            evicted = self._enforce_budget()
+        self._drop(evicted)
+
+    def evict_idle(self):
+        """
+        Unload every model that is not currently in use.
+
+        Returns:
+            int: Number of models evicted
+        """
+        with self._lock:
+            idle = [self._entries.pop(key) for key, entry in list(self._entries.items()) if entry.refcount == 0]
+        self._drop(idle)
+        return len(idle)
+
+    def report(self):
+        """
+        Describe the loaded models.
+
+        Returns:
+            dict: Memory budget, total size, and one record per loaded model
+                (least recently used first)
+        """
+        with self._lock:
+            models = [
+                {
+                    'kind': key[0],
+                    'model_id': key[1],
+                    'device': key[2],
+                    'dtype': key[3],
+                    'size_bytes': entry.size_bytes,
+                    'refcount': entry.refcount,
+                    'loaded_at': entry.loaded_at,
+                    'last_used': entry.last_used
+                }
+                for key, entry in self._entries.items()
+            ]
+            return {
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'total_bytes': sum(model['size_bytes'] for model in models),
+                'models': models
+            }
+
+    def print_report(self):
+        """Print the loaded models and their sizes."""
+        report = self.report()
+        budget = report['memory_budget_bytes']
+        budget_text = f"{budget / 2**20:.0f} MB" if budget else "unlimited"
+        print(f"📦 Loaded models: {len(report['models'])}, "
+              f"{report['total_bytes'] / 2**20:.0f} MB (budget: {budget_text})")
+        for model in report['models']:
+            print(f"  - {model['kind']}: {model['model_id']} [{model['device']}, {model['dtype']}] "
+                  f"{model['size_bytes'] / 2**20:.0f} MB, {model['refcount']} user(s)")
+
+    def _take(self, key):
+        """Return the entry for a key with its reference count bumped (lock held)."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.refcount += 1
+            entry.last_used = time.time()
+            self._entries.move_to_end(key)
+        return entry
+
+    def _enforce_budget(self):
+        """
+        Remove least recently used idle models until within budget (lock held).
+
+        The removed entries are returned rather than freed here: freeing them
+        may run finalizers that call back into the registry, so callers pass
+        them to _drop() after releasing the lock.
+
+        Returns:
+            list: Removed entries
+        """
+        evicted = []
+        if self.memory_budget_bytes is None:
+            return evicted
+
+        total = sum(entry.size_bytes for entry in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount == 0:
+                total -= entry.size_bytes
+                evicted.append(self._entries.pop(key))
+        return evicted
+
+    def _drop(self, evicted):
+        """Free evicted entries; call without the lock held."""
+        if evicted:
+            evicted.clear()
+            self._free_memory()
+
+    @staticmethod
+    def _free_memory():
+        """Return memory of evicted models to the system."""
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+def _budget_from_environment():
+    """Read the memory budget from STORY_GENERATOR_MEMORY_BUDGET_MB, if set."""
+    value = os.environ.get("STORY_GENERATOR_MEMORY_BUDGET_MB")
+    return int(float(value) * 2**20) if value else None
+
+
+_registry = ModelRegistry(memory_budget_bytes=_budget_from_environment())
+
+
+def get_registry():
+    """
+    Get the process-wide model registry.
+
+    Returns:
+        ModelRegistry: Registry shared by all generators in the process
+    """
+    return _registry
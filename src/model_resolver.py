@@ -0,0 +1,203 @@
+"""Bounded-time, cache-first resolution of which model to load."""
+
+import json
+import os
+import tempfile
+import time
+from .telemetry import get_telemetry
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-story-generator", "models.json")
+
+
+class ModelResolver:
+    """Decides which candidate model to load, and from where, without stalling.
+
+    The requested model is tried first, from disk (a local directory or the
+    Hugging Face cache, loaded with ``local_files_only=True``) or else from
+    the Hub. Fallbacks are tried after it, those already on disk before
+    those that must be downloaded. Hub candidates are probed within a
+    deadline, skipping any that failed recently. Cached copies that failed
+    to load (e.g. an interrupted download) are fetched from the Hub again.
+    Outcomes are recorded in a small JSON manifest so later starts try the
+    fallback that worked last time before the other fallbacks.
+    """
+
+    def __init__(self, manifest_path=None, deadline_seconds=20.0, probe_timeout=5.0, failure_ttl=24 * 3600):
+        """
+        Initialize the resolver.
+
+        Args:
+            manifest_path (str): Where to record load outcomes (defaults to
+                $STORY_GENERATOR_MODEL_MANIFEST or ~/.cache/ai-story-generator/models.json)
+            deadline_seconds (float): Time allowed for probing the Hub for the
+                requested model, and again for the fallbacks
+            probe_timeout (float): Timeout for a single Hub request
+            failure_ttl (float): Seconds a failed candidate is skipped for
+        """
+        self.manifest_path = manifest_path or os.environ.get("STORY_GENERATOR_MODEL_MANIFEST", DEFAULT_MANIFEST_PATH)
+        self.deadline_seconds = deadline_seconds
+        self.probe_timeout = probe_timeout
+        self.failure_ttl = failure_ttl
+
+    def resolve(self, kind, candidates, required_file="model_index.json"):
+        """
+        Yield the candidates worth trying, in the order to try them.
+
+        The requested model comes first: its cached copy if there is one,
+        then the Hub, so a cached fallback never shadows a requested model
+        that can still be downloaded. Fallbacks follow only if the caller
+        asks for more (the requested model was unavailable or failed to
+        load): cached ones first, then those reachable on the Hub. Asking
+        for more after a cached candidate means it failed to load, so
+        cached models are then tried from the Hub as well.
+
+        Args:
+            kind (str): Model family the manifest entry belongs to (e.g. "stable-diffusion")
+            candidates (list): Model ids or local paths, in order of
+                preference; the first is the requested model and always stays first
+            required_file (str): File whose presence marks a usable cached copy
+
+        Yields:
+            tuple: (model_id, local_files_only)
+        """
+        manifest = self._read_manifest()
+        entry = manifest.get(kind, {})
+        candidates = list(dict.fromkeys(candidates))
+
+        # The fallback that loaded last time goes right after the requested model
+        last_success = entry.get('last_success')
+        if last_success in candidates[1:]:
+            candidates.remove(last_success)
+            candidates.insert(1, last_success)
+
+        offline = self._is_offline()
+        failures = entry.get('failures', {})
+
+        requested, fallbacks = candidates[:1], candidates[1:]
+        for group in (requested, fallbacks):
+            local = [model_id for model_id in group if self._is_available_locally(model_id, required_file)]
+            for model_id in local:
+                yield model_id, True
+            if not offline:
+                yield from self._from_hub(kind, group, local, failures)
+
+    def _from_hub(self, kind, candidates, local, failures):
+        """
+        Yield the candidates found on the Hub within deadline_seconds.
+
+        Time spent by the caller loading a yielded candidate does not count
+        against the deadline.
+
+        Args:
+            kind (str): Model family
+            candidates (list): Model ids to probe, in order
+            local (list): Candidates whose cached copy was already tried
+            failures (dict): Recorded failures from the manifest
+
+        Yields:
+            tuple: (model_id, False)
+        """
+        now = time.time()
+        probing = 0.0
+        for model_id in candidates:
+            failure = failures.get(model_id)
+            if model_id in local:
+                # The cached copy just failed to load; a local directory cannot
+                # be fetched, but an incomplete download can be resumed
+                if os.path.isdir(model_id):
+                    continue
+            elif failure and now - failure.get('time', 0) < self.failure_ttl:
+                get_telemetry().log(f"⏭️ Skipping {model_id} (failed recently: {failure.get('error', '')[:60]})")
+                continue
+
+            remaining = self.deadline_seconds - probing
+            if remaining <= 0:
+                get_telemetry().log("⏱️ Model resolution deadline reached; skipping remaining candidates", level="warning")
+                return
+
+            start = time.monotonic()
+            found = self._probe(model_id, min(self.probe_timeout, remaining))
+            probing += time.monotonic() - start
+            if found:
+                yield model_id, False
+            else:
+                self.record_failure(kind, model_id, "not reachable on the Hub")
+
+    def record_success(self, kind, model_id):
+        """
+        Remember that a model loaded successfully.
+
+        Args:
+            kind (str): Model family
+            model_id (str): Model that loaded
+        """
+        manifest = self._read_manifest()
+        entry = manifest.setdefault(kind, {})
+        entry['last_success'] = model_id
+        entry['last_success_time'] = time.time()
+        entry.setdefault('failures', {}).pop(model_id, None)
+        self._write_manifest(manifest)
+
+    def record_failure(self, kind, model_id, error):
+        """
+        Remember that a model failed to resolve or load.
+
+        Args:
+            kind (str): Model family
+            model_id (str): Model that failed
+            error (str): Short description of the failure
+        """
+        manifest = self._read_manifest()
+        entry = manifest.setdefault(kind, {})
+        entry.setdefault('failures', {})[model_id] = {'time': time.time(), 'error': str(error)[:200]}
+        self._write_manifest(manifest)
+
+    @staticmethod
+    def _is_available_locally(model_id, required_file):
+        """Check whether a model is a local directory or already in the HF cache."""
+        if os.path.isdir(model_id):
+            return True
+        try:
+            from huggingface_hub import try_to_load_from_cache
+            return isinstance(try_to_load_from_cache(model_id, required_file), str)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _is_offline():
+        """Check whether Hugging Face Hub access is switched off."""
+        return any(
+            os.environ.get(name, "").upper() in ("1", "ON", "YES", "TRUE")
+            for name in ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE")
+        )
+
+    @staticmethod
+    def _probe(model_id, timeout):
+        """Check that a model exists on the Hub, giving up after a timeout."""
+        try:
+            from huggingface_hub import HfApi
+            HfApi().model_info(model_id, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def _read_manifest(self):
+        """Load the manifest, treating a missing or corrupt file as empty."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        """Write the manifest atomically; failures only cost the remembered state."""
+        try:
+            directory = os.path.dirname(self.manifest_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as e:
+            get_telemetry().log(f"⚠️ Could not write model manifest: {e}", level="warning")
@@ -0,0 +1,98 @@
+"""Fast rendering of placeholder images for scenes that could not be generated."""
+
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from .display import caption_font, wrap_text
+
+PLACEHOLDER_HEADING = "IMAGE PLACEHOLDER"
+
+
+class PlaceholderRenderer:
+    """Draws placeholder images from cached fonts and backgrounds.
+
+    The background of each size, with its heading already drawn, is rendered
+    once; a placeholder then only costs copying it and drawing the prompt.
+    Fonts come from display.caption_font(), which tries common TrueType
+    fonts before Pillow's built-in one and caches what it found. The last
+    few finished placeholders are cached too, since the same scene is often
+    asked for again while the image model is down.
+    """
+
+    def __init__(self, color="lightblue", font_size=16, max_lines=6, max_cached=32):
+        """
+        Initialize the placeholder renderer.
+
+        Args:
+            color (str): Background color
+            font_size (int): Text size in pixels
+            max_lines (int): Maximum lines of prompt text
+            max_cached (int): Finished placeholders kept for reuse
+        """
+        self.color = color
+        self.font_size = font_size
+        self.max_lines = max_lines
+        self.max_cached = max_cached
+        self._backgrounds = {}
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, text, size=(512, 512)):
+        """
+        Render a placeholder image.
+
+        Args:
+            text (str): Prompt shown on the placeholder
+            size (tuple): Image size
+
+        Returns:
+            PIL.Image: Placeholder image (a copy the caller may modify)
+        """
+        key = (text, tuple(size))
+        with self._lock:
+            image = self._rendered.get(key)
+            if image is not None:
+                self._rendered.move_to_end(key)
+                return image.copy()
+            background, text_top = self._background(tuple(size))
+
+        image = background.copy()
+        draw = ImageDraw.Draw(image)
+        font = caption_font(self.font_size)
+        width, height = image.size
+        line_height = self.font_size + 4
+        for number, line in enumerate(wrap_text(draw, text, font, width - 40, max_lines=self.max_lines)):
+            x = (width - draw.textlength(line, font=font)) // 2
+            y = text_top + number * line_height
+            if y + line_height > height:
+                break
+            # Text with a shadow, like the heading
+            draw.text((x + 2, y + 2), line, fill='gray', font=font)
+            draw.text((x, y), line, fill='black', font=font)
+
+        with self._lock:
+            self._rendered[key] = image
+            while len(self._rendered) > self.max_cached:
+                self._rendered.popitem(last=False)
+        return image.copy()
+
+    def _background(self, size):
+        """Get the background with heading for a size, and where the prompt text starts; call with the lock held."""
+        cached = self._backgrounds.get(size)
+        if cached is not None:
+            return cached
+
+        image = Image.new('RGB', size, color=self.color)
+        draw = ImageDraw.Draw(image)
+        font = caption_font(self.font_size + 4)
+        heading_width = draw.textlength(PLACEHOLDER_HEADING, font=font)
+        x = (size[0] - heading_width) // 2
+        y = size[1] // 3
+        draw.text((x + 2, y + 2), PLACEHOLDER_HEADING, fill='gray', font=font)
+        draw.text((x, y), PLACEHOLDER_HEADING, fill='black', font=font)
+
+        cached = (image, y + 2 * (self.font_size + 4))
+        self._backgrounds[size] = cached
+        return cached
@@ -0,0 +1,231 @@
+"""Attention caches of frequently used prompt prefixes, shared between requests."""
+
+import copy
+import threading
+from collections import OrderedDict
+
+from .telemetry import get_telemetry
+
+
+def cache_bytes(past_key_values):
+    """
+    Measure the memory held by an attention cache.
+
+    Args:
+        past_key_values: Cache object with per-layer keys and values, or the
+            legacy tuple of (key, value) tensor pairs
+
+    Returns:
+        int: Size in bytes
+    """
+    layers = getattr(past_key_values, 'layers', None)
+    if layers is not None:
+        pairs = [(layer.keys, layer.values) for layer in layers]
+    else:
+        pairs = past_key_values
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for pair in pairs for tensor in pair if tensor is not None
+    )
+
+
+def _copy_prefix(past_key_values, length):
+    """Copy an attention cache, keeping only its first length tokens."""
+    if hasattr(past_key_values, 'crop'):
+        past_key_values = copy.deepcopy(past_key_values)
+        surplus = past_key_values.get_seq_length() - length
+        if surplus > 0:
+            past_key_values.crop(-surplus)
+        return past_key_values
+    # Legacy caches: tensors shaped (batch, heads, tokens, head_dim)
+    return tuple(
+        tuple(tensor[..., :length, :].clone() for tensor in pair)
+        for pair in past_key_values
+    )
+
+
+class PrefixCache:
+    """Keeps the attention caches of recent prompts for reuse by later prompts.
+
+    Cached prompts are indexed in a token trie. A new prompt is walked down
+    the trie as far as it matches, and any cached prompt below the point
+    where it stops shares that many leading tokens with it; a copy of that
+    prompt's cache, cut to the shared length, replaces the prefill of those
+    tokens. So "Once upon a time, in a magical kingdom" also speeds up
+    "Once upon a time, in a dark forest".
+
+    Caches are kept in a least-recently-used order and evicted once their
+    total size exceeds max_bytes. Stored caches are never modified: lookup()
+    hands out copies, since generation appends to the cache it is given.
+    The cache is thread-safe.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, min_tokens=4, name="prefix_cache"):
+        """
+        Initialize the prefix cache.
+
+        Args:
+            max_bytes (int): Memory cap for the stored attention caches
+            min_tokens (int): Shortest prefix worth storing or reusing; copying
+                the cache of a few tokens costs about as much as computing it
+            name (str): Prefix of the metrics emitted by this cache
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+        if min_tokens < 1:
+            raise ValueError("min_tokens must be at least 1")
+
+        self.max_bytes = max_bytes
+        self.min_tokens = min_tokens
+        self.name = name
+        # Trie node: {'children': {token: node}, 'entries': {key: None}} where
+        # entries lists the cached prompts that pass through the node
+        self._root = {'children': {}, 'entries': {}}
+        # Prompt token tuple -> (attention cache, size in bytes), oldest first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'reused_tokens': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+
+    def lookup(self, token_ids):
+        """
+        Find the longest cached prefix of a prompt.
+
+        Args:
+            token_ids (list): Prompt token ids
+
+        Returns:
+            tuple: (number of leading tokens covered, a private copy of their
+                attention cache), or (0, None) when nothing useful is cached
+        """
+        telemetry = get_telemetry()
+        with self._lock:
+            node = self._root
+            length = 0
+            for token in token_ids:
+                child = node['children'].get(token)
+                if child is None:
+                    break
+                node = child
+                length += 1
+
+            if length < self.min_tokens or not node['entries']:
+                self._stats['misses'] += 1
+                telemetry.counter(f"{self.name}.misses")
+                return 0, None
+
+            key = next(iter(node['entries']))
+            self._entries.move_to_end(key)
+            past_key_values = self._entries[key][0]
+            self._stats['hits'] += 1
+            self._stats['reused_tokens'] += length
+
+        telemetry.counter(f"{self.name}.hits")
+        telemetry.counter(f"{self.name}.reused_tokens", length)
+        # Stored caches are never modified, so copying needs no lock
+        return length, _copy_prefix(past_key_values, length)
+
+    def store(self, token_ids, past_key_values):
+        """
+        Cache the attention cache of a prompt.
+
+        Nothing is stored when the prompt is shorter than min_tokens, larger
+        than max_bytes, or already covered by a longer cached prompt.
+
+        Args:
+            token_ids (list): Prompt token ids
+            past_key_values: Attention cache covering exactly these tokens;
+                a copy is stored, so the caller may go on using it
+
+        Returns:
+            bool: Whether the cache was stored
+        """
+        key = tuple(token_ids)
+        if len(key) < self.min_tokens:
+            return False
+        size = cache_bytes(past_key_values)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            node = self._root
+            for token in key:
+                node = node['children'].get(token)
+                if node is None:
+                    break
+            if node is not None and node['entries']:
+                # A cached prompt already starts with all of these tokens
+                return False
+
+        stored = _copy_prefix(past_key_values, len(key))
+        telemetry = get_telemetry()
+        with self._lock:
+            if key in self._entries:
+                return False
+            node = self._root
+            node['entries'][key] = None
+            for token in key:
+                node = node['children'].setdefault(token, {'children': {}, 'entries': {}})
+                node['entries'][key] = None
+            self._entries[key] = (stored, size)
+            self._bytes += size
+            self._stats['stored'] += 1
+
+            evicted = 0
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            self._stats['evicted'] += evicted
+
+        telemetry.counter(f"{self.name}.stored")
+        if evicted:
+            telemetry.counter(f"{self.name}.evicted", evicted)
+        return True
+
+    def clear(self):
+        """Drop every cached prefix."""
+        with self._lock:
+            self._root = {'children': {}, 'entries': {}}
+            self._entries.clear()
+            self._bytes = 0
+
+    def memory_usage(self):
+        """
+        Get the memory held by the stored attention caches.
+
+        Returns:
+            int: Size in bytes
+        """
+        with self._lock:
+            return self._bytes
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits, misses, prefix tokens reused instead of recomputed,
+                caches stored and evicted, cached prompts and bytes in use
+        """
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'bytes': self._bytes}
+
+    def __len__(self):
+        """Number of cached prompts."""
+        with self._lock:
+            return len(self._entries)
+
+    def _remove(self, key):
+        """Forget a cached prompt and prune its trie path; call with the lock held."""
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+        node = self._root
+        del node['entries'][key]
+        for token in key:
+            child = node['children'][token]
+            del child['entries'][key]
+            if not child['entries']:
+                # No other cached prompt goes through here
+                del node['children'][token]
+                break
+            node = child
@@ -0,0 +1,267 @@
+"""Ranked extraction of visual scene descriptions from story text."""
+
+import re
+from bisect import bisect_right
+from itertools import accumulate, compress
+
+# Keywords that mark a sentence as describing something that can be drawn,
+# with how strongly each one does. Settings and visual qualities count for
+# more than verbs of seeing and moving, which say little about the picture.
+DEFAULT_VISUAL_KEYWORDS = {
+    'forest': 1.0, 'castle': 1.0, 'mountain': 1.0, 'ocean': 1.0,
+    'sky': 1.0, 'moon': 1.0, 'sun': 1.0,
+    'dark': 1.0, 'bright': 1.0, 'beautiful': 1.0, 'scary': 1.0,
+    'ancient': 1.0, 'mysterious': 1.0, 'golden': 1.0, 'silver': 1.0,
+    'looked': 0.5, 'saw': 0.5, 'appeared': 0.5, 'stood': 0.5, 'walked': 0.5,
+}
+
+# Abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'st', 'sr', 'jr', 'prof', 'mt', 'vs', 'etc', 'e.g', 'i.e'}
+
+_TERMINATORS = '.!?'
+# Quotes and brackets, which can close a sentence or open a word
+_QUOTES = '"\'“”‘’()[]'
+
+# Turns lowercased text into a scanning copy of the same length in which
+# every sentence break reads ". " and every word follows a space, so that
+# sentences can be split and keywords found with fast literal searches
+_SCAN_TRANSLATION = str.maketrans({
+    '!': '.', '?': '.',
+    '\n': ' ', '\r': ' ', '\t': ' ', '-': ' ', '—': ' ', '\0': ' ',
+    **{quote: ' ' for quote in _QUOTES}
+})
+
+# Marks where the scanning copy is split into pieces; translated away
+# beforehand, so it never occurs in the text itself
+_SPLIT = '\0'
+_UNSAFE_CHARACTERS = re.compile(r'[^\w\s,.-]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class SceneExtractor:
+    """Finds the most visually descriptive sentences of a story.
+
+    All keywords are compiled into one regex, factored by common prefix, so
+    each sentence is searched for keywords in one call instead of once per
+    keyword, and sentences are only looked at in Python when they contain a
+    keyword. Sentences are ranked by the summed weight of the
+    distinct keywords they contain; ties go to the earlier sentence.
+    Keywords match at the start of a word, so "forest" also matches
+    "forests" and "moon" matches "moonlight", but "sun" does not match
+    "unsung".
+    """
+
+    def __init__(self, keywords=None, max_scenes=2, min_length=20):
+        """
+        Initialize the scene extractor.
+
+        Args:
+            keywords (dict or list): Keyword -> weight mapping, or a list of
+                keywords that all weigh 1.0 (defaults to DEFAULT_VISUAL_KEYWORDS)
+            max_scenes (int): Maximum number of scenes returned per text
+            min_length (int): Minimum sentence length in characters
+        """
+        if keywords is None:
+            keywords = DEFAULT_VISUAL_KEYWORDS
+        if not isinstance(keywords, dict):
+            keywords = {keyword: 1.0 for keyword in keywords}
+        self.keywords = {keyword.lower(): float(weight) for keyword, weight in keywords.items() if keyword}
+        if not self.keywords:
+            raise ValueError("At least one keyword is required")
+        self.max_scenes = max_scenes
+        self.min_length = min_length
+
+        # Keywords are matched in the scanning copy of the text, with the space
+        # before them; the space anchors them to word starts and gives the
+        # regex engine a literal character to search for
+        self._weights = {}
+        for keyword, weight in self.keywords.items():
+            key = " " + keyword.translate(_SCAN_TRANSLATION)
+            self._weights[key] = max(weight, self._weights.get(key, weight))
+        self._keyword_pattern = re.compile(" " + _trie_pattern(key[1:] for key in self._weights))
+
+    def extract(self, text, max_scenes=None):
+        """
+        Extract the best scene descriptions from one text.
+
+        Args:
+            text (str): Story text
+            max_scenes (int): Overrides the extractor's max_scenes
+
+        Returns:
+            list: Scene descriptions, most visual first
+        """
+        limit = self.max_scenes if max_scenes is None else max_scenes
+        scenes = []
+        for _, _, sentence in self.rank(text):
+            if len(scenes) == limit:
+                break
+            scene = self._clean(sentence)
+            if len(scene) > 10:
+                scenes.append(scene)
+        return scenes
+
+    def rank(self, text):
+        """
+        Score every qualifying sentence of a text.
+
+        Args:
+            text (str): Story text
+
+        Returns:
+            list: (score, start offset, sentence) tuples, best first
+        """
+        document = _Document(text)
+        hits = list(map(self._keyword_pattern.findall, document.pieces))
+        weights = self._weights
+        ranked = []
+        last = -1
+        for piece in compress(range(len(hits)), hits):
+            if piece <= last:
+                # Part of the sentence scored last
+                continue
+            first, last = document.sentence_pieces(piece)
+            start, sentence = document.sentence_text(first, last)
+            if len(sentence) > self.min_length:
+                keywords = set(hits[piece]).union(*hits[piece + 1:last + 1])
+                ranked.append((sum(map(weights.__getitem__, keywords)), start, sentence))
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def split_sentences(self, text):
+        """
+        Split text into sentences.
+
+        Sentences end at ".", "!" or "?" (plus any closing quotes) followed by
+        whitespace, except after common abbreviations such as "Mr.", and at
+        blank lines between paragraphs.
+
+        Args:
+            text (str): Text to split
+
+        Returns:
+            list: Sentences without surrounding whitespace
+        """
+        document = _Document(text)
+        sentences = []
+        piece = 0
+        while piece < len(document.pieces):
+            first, last = document.sentence_pieces(piece)
+            _, sentence = document.sentence_text(first, last)
+            if sentence:
+                sentences.append(sentence)
+            piece = last + 1
+        return sentences
+
+    @staticmethod
+    def _clean(sentence):
+        """Turn a sentence into an image prompt: one line, no terminal or unsafe punctuation."""
+        sentence = _WHITESPACE.sub(" ", sentence).rstrip(".!?\"'”’)] ")
+        return _UNSAFE_CHARACTERS.sub("", sentence).strip()
+
+
+class _Document:
+    """A text prepared for sentence lookups.
+
+    A lowercased scanning copy of the text is split at every ". " once.
+    Each piece keeps the space before it, so keywords at its start match,
+    and is a sentence of its own unless its period ends an abbreviation;
+    those few breaks are found by substring search and checked exactly.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to several; keep offsets aligned
+            lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+        # The leading space shifts scan offsets one past text offsets
+        self.scan = " " + lowered.replace("\n\n", ". ").translate(_SCAN_TRANSLATION)
+        # Piece i is scan[bounds[i]:bounds[i + 1]]: a space, the words and,
+        # except for the last piece, the period of its break
+        self.pieces = self.scan.replace(". ", "." + _SPLIT + " ").split(_SPLIT)
+        self.bounds = [0] + list(accumulate(map(len, self.pieces)))
+
+        # Pieces whose period does not end the sentence
+        self.joined = set()
+        for match in _ABBREVIATION_BREAK.finditer(self.scan):
+            period = match.end() - 2
+            if self._ends_in_abbreviation(period):
+                self.joined.add(bisect_right(self.bounds, period) - 1)
+
+    def sentence_pieces(self, piece):
+        """Return the first and last piece of the sentence containing a piece."""
+        first = last = piece
+        joined = self.joined
+        if joined:
+            while first > 0 and first - 1 in joined:
+                first -= 1
+            while last in joined:
+                last += 1
+        return first, last
+
+    def sentence_text(self, first, last):
+        """Return the text offset and whitespace-trimmed text of a run of pieces."""
+        text = self.text
+        # The space before a piece is the text's character before the break
+        start = self.bounds[first]
+        end = min(self.bounds[last + 1] - 1, len(text))
+        # Closing quotes after a terminator belong to that sentence, not the next
+        while end < len(text) and text[end] in _QUOTES and text[end - 1] in _TERMINATORS + _QUOTES:
+            end += 1
+        while start < end and start > 0 and text[start] in _QUOTES and text[start - 1] in _TERMINATORS + _QUOTES:
+            start += 1
+
+        raw = text[start:end]
+        return start + len(raw) - len(raw.lstrip()), raw.strip()
+
+    def _ends_in_abbreviation(self, end):
+        """Check whether the break whose "." is at a scan offset follows an abbreviation."""
+        if self.text[end - 1] != ".":
+            return False
+        # Abbreviations are at most four characters, so five are enough to see
+        # whether the word before the period is one of them
+        word = self.scan[max(0, end - 5):end].rsplit(None, 1)
+        return bool(word) and word[-1] in ABBREVIATIONS
+
+
+def _trie_pattern(keywords):
+    """
+    Build a regex matching any of the keywords, factored by common prefix.
+
+    Python's regex engine tries every branch of a flat alternation at each
+    position; factoring the keywords into a trie lets it reject a position
+    after one character in most cases.
+
+    Args:
+        keywords (iterable): Lowercase keywords
+
+    Returns:
+        str: Regular expression
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for character in keyword:
+            node = node.setdefault(character, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(character) + build(child) for character, child in sorted(node.items()) if character]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A keyword ends here; longer keywords continuing it are preferred
+            pattern = (pattern if len(branches) == 1 and len(branches[0]) == 1
+                       else "(?:" + pattern + ")") + "?"
+        return pattern
+
+    return build(trie)
+
+
+# Abbreviations followed by a break in the scanning copy; each match is then
+# checked exactly, as the break may come from "!" or "?"
+_ABBREVIATION_BREAK = re.compile(" " + _trie_pattern(ABBREVIATIONS) + r"\. ")
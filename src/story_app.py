@@ -1,29 +1,72 @@
 """Interactive story generator application with widgets."""
 
-import ipywidgets as widgets
-from IPython.display import display, clear_output
+import io
+import queue
+import threading
+from PIL import Image
 from .story_generator import StoryGenerator
-from .image_generator import ImageGenerator
+from .image_store import ImageStore
+from .image_generator import (
+    DEFAULT_QUALITY,
+    QUALITY_PRESETS,
+    CancellationToken,
+    GenerationCancelled,
+    ImageGenerator,
+    scene_seeds
+)
+from .telemetry import get_telemetry
 
 
 class StoryGeneratorApp:
     """Interactive story generator application with GUI."""
     
-    def __init__(self):
-        """Initialize the story generator app."""
-        self.story_generator = StoryGenerator()
-        self.image_generator = ImageGenerator()
-        self.image_generator.load_model()
+    def __init__(self, image_cache=None, precision="fp32", draft_model_name=None, image_quality=DEFAULT_QUALITY,
+                 image_store=None, display="notebook", prefix_cache_mb=64):
+        """
+        Initialize the story generator app.
+
+        Args:
+            image_cache (ImageCache): On-disk cache of generated images (defaults
+                to the user cache directory; pass False to turn caching off)
+            precision (str): Text model precision ("fp32", "bf16" or "int8-dynamic")
+            draft_model_name (str): Draft model for assisted generation (None to turn it off)
+            image_quality (str): Image quality preset ("draft", "standard" or "final")
+            image_store (ImageStore): Holds the session's images (defaults to a
+                store keeping up to 64MB of full images in memory)
+            display (NullDisplay or str): Where generated images are shown (see
+                ImageGenerator; "none" when nobody is looking)
+            prefix_cache_mb (int): Memory for the attention caches of prompt
+                prefixes reused between chapters, such as the default prompt (0 to turn it off)
+        """
+        self.story_generator = StoryGenerator(precision=precision, draft_model_name=draft_model_name)
+        if prefix_cache_mb:
+            self.story_generator.enable_prefix_cache(max_bytes=prefix_cache_mb * 2**20)
+        # The image model is loaded on the first image that is not cached
+        self.image_generator = ImageGenerator(image_cache=image_cache, quality=image_quality, display=display)
         
         self.current_story = ""
-        self.story_images = []
+        # Thumbnails and recent images stay in memory, older ones are spilled to disk
+        self.image_store = image_store if image_store is not None else ImageStore()
         self.chapter_count = 0
         
-        self._create_widgets()
-        self._bind_events()
+        # Chapters are generated in a background thread so that the widgets
+        # (the New Story button in particular) stay responsive
+        self._worker = None
+        self._cancel_token = None
+
+        # Widgets are created by display_app(), so ipywidgets is only
+        # imported when the interactive app is actually shown
+        self.output_area = None
     
+    @property
+    def story_images(self):
+        """list: Metadata of the session's images; load one with image_store.get(info['image_id'])."""
+        return self.image_store.entries()
+
     def _create_widgets(self):
         """Create all the UI widgets."""
+        import ipywidgets as widgets
+
         self.story_prompt = widgets.Textarea(
             value="Once upon a time, in a magical kingdom",
             placeholder="Enter your story prompt here...",
@@ -64,6 +107,13 @@ class StoryGeneratorApp:
             style={'description_width': 'initial'}
         )
 
+        self.image_quality = widgets.Dropdown(
+            options=list(QUALITY_PRESETS),
+            value=self.image_generator.quality,
+            description="Image Quality:",
+            style={'description_width': 'initial'}
+        )
+
         self.generate_button = widgets.Button(
             description="📖 Generate Chapter",
             button_style='primary',
@@ -82,6 +132,10 @@ class StoryGeneratorApp:
             layout=widgets.Layout(width='200px')
         )
 
+        self.preview_image = widgets.Image(format='png', width=256, height=256,
+                                           layout=widgets.Layout(display='none'))
+        self.preview_status = widgets.Label(value="")
+
         self.output_area = widgets.Output()
     
     def _bind_events(self):
@@ -91,7 +145,28 @@ class StoryGeneratorApp:
         self.reset_button.on_click(self.reset_story)
     
     def generate_chapter(self, button):
-        """Generate a new chapter and corresponding images."""
+        """Generate a new chapter and corresponding images in the background."""
+        if self._worker is not None and self._worker.is_alive():
+            with self.output_area:
+                print("⏳ A chapter is still being generated. Use 🔄 New Story to stop it.")
+            return
+
+        self._cancel_token = CancellationToken()
+        self._worker = threading.Thread(target=self._generate_chapter, args=(self._cancel_token,), daemon=True)
+        self._worker.start()
+
+    def cancel_generation(self):
+        """Stop the chapter being generated, if any, and wait until its thread has let go of the CPU."""
+        if self._cancel_token is not None:
+            self._cancel_token.cancel()
+        if self._worker is not None and self._worker is not threading.current_thread():
+            self._worker.join()
+        self._worker = None
+
+    def _generate_chapter(self, cancel_token):
+        """Generate a chapter and its images, stopping early if the token is cancelled."""
+        from IPython.display import clear_output
+
         with self.output_area:
             clear_output(wait=True)
 
@@ -102,43 +177,87 @@ class StoryGeneratorApp:
 
             print("🔄 Generating story chapter...")
 
-            # Generate story text
-            chapter_text = self.story_generator.generate_chapter(
-                prompt,
-                max_length=self.chapter_length.value,
-                temperature=self.creativity.value
-            )
-
             self.chapter_count += 1
-            self.current_story += f"\\n\\n**Chapter {self.chapter_count}**\\n{chapter_text}"
-
-            # Extract scene descriptions for images
-            scene_descriptions = self.story_generator.extract_scene_descriptions(chapter_text)
 
-            # Display the chapter
+            # Display the chapter progressively while the story text is generated
             print(f"📖 **Chapter {self.chapter_count}**")
             print("-" * 50)
-            print(chapter_text)
+
+            pieces = []
+            try:
+                for piece in self.story_generator.generate_chapter_stream(
+                    prompt,
+                    max_length=self.chapter_length.value,
+                    temperature=self.creativity.value
+                ):
+                    if cancel_token.cancelled:
+                        # Closing the stream stops the model
+                        break
+                    print(piece, end="", flush=True)
+                    pieces.append(piece)
+            except Exception as e:
+                pieces.append(f"Error generating story: {str(e)}")
+                print(pieces[-1], end="")
+            chapter_text = "".join(pieces)
             print("\\n")
+            if cancel_token.cancelled:
+                return
+
+            stats = self.story_generator.last_stream_stats
+            if stats and stats['time_to_first_token'] is not None:
+                latency = stats['mean_inter_token_latency'] or 0.0
+                print(f"⏱️ First token after {stats['time_to_first_token']:.2f}s, "
+                      f"{latency * 1000:.0f}ms per token, {stats['tokens']} tokens in {stats['seconds']:.1f}s")
+
+            self.current_story += f"\\n\\n**Chapter {self.chapter_count}**\\n{chapter_text}"
+
+            # Extract scene descriptions for images
+            scene_descriptions = self.story_generator.extract_scene_descriptions(chapter_text)
 
             # Generate and display images
             if scene_descriptions:
                 print("🎨 Generating images...")
-                chapter_images = self.image_generator.generate_story_images(
-                    scene_descriptions, 
-                    art_style=self.art_style.value
-                )
+                try:
+                    chapter_images = self.image_generator.generate_story_images(
+                        scene_descriptions, 
+                        art_style=self.art_style.value,
+                        quality=self.image_quality.value,
+                        on_preview=self._show_preview,
+                        cancel_token=cancel_token,
+                        title=f"Chapter {self.chapter_count}"
+                    )
+                except GenerationCancelled:
+                    return
+                finally:
+                    self.preview_image.layout.display = 'none'
+                    self.preview_status.value = ""
                 
                 for image_info in chapter_images:
-                    image_info['chapter'] = self.chapter_count
-                    self.story_images.append(image_info)
+                    self.image_store.add(
+                        image_info['image'],
+                        chapter=self.chapter_count,
+                        scene=image_info['scene'],
+                        description=image_info['description'],
+                        seed=image_info['seed']
+                    )
 
             print("\\n✅ Chapter generated successfully!")
+            usage = self.image_store.memory_usage()
+            print(f"🗂️ {usage['images']} images: {usage['memory_bytes'] / 2**20:.1f}MB in memory, "
+                  f"{usage['on_disk']} spilled to disk")
 
             # Update prompt for continuation
             last_sentence = chapter_text.split('.')[-2] + '.' if '.' in chapter_text else chapter_text[-50:]
             self.story_prompt.value = last_sentence
 
+    def _show_preview(self, images, step, total_steps):
+        """Show a low-resolution preview of the image being denoised."""
+        buffer = io.BytesIO()
+        images[0].save(buffer, format='PNG')
+        self.preview_image.value = buffer.getvalue()
+        self.preview_image.layout.display = None
+        self.preview_status.value = f"🎨 Denoising step {step}/{total_steps}"
+
     def continue_story(self, button):
         """Continue the current story."""
         if not self.current_story:
@@ -149,28 +268,50 @@ class StoryGeneratorApp:
         self.generate_chapter(button)
 
     def reset_story(self, button):
-        """Reset the story and start fresh."""
+        """Stop any generation in progress, then reset the story and start fresh."""
+        self.cancel_generation()
         self.current_story = ""
-        self.story_images = []
+        self.image_store.clear()
         self.chapter_count = 0
+
+        if self.output_area is None:
+            return
+
+        from IPython.display import clear_output
+
         self.story_prompt.value = "Once upon a time, in a magical kingdom"
 
         with self.output_area:
             clear_output()
             print("🔄 Story reset! Ready for a new adventure.")
 
+    def close(self):
+        """Stop any generation in progress and release the text and image models held by this app."""
+        self.cancel_generation()
+        self.image_store.clear()
+        self.story_generator.close()
+        self.image_generator.close()
+
     def display_app(self):
         """Display the complete story generator app."""
+        import ipywidgets as widgets
+        from IPython.display import display
+
+        if self.output_area is None:
+            self._create_widgets()
+            self._bind_events()
+
         # Create layout
         controls = widgets.VBox([
             widgets.HTML("<h3>🎯 Story Settings</h3>"),
             self.story_prompt,
             widgets.HBox([self.chapter_length, self.creativity]),
-            self.art_style,
+            widgets.HBox([self.art_style, self.image_quality]),
             widgets.HTML("<h3>🎮 Controls</h3>"),
             widgets.HBox([self.generate_button, self.continue_button, self.reset_button]),
             widgets.HTML("<hr>"),
-            widgets.HTML("<h3>📚 Generated Story</h3>")
+            widgets.HTML("<h3>📚 Generated Story</h3>"),
+            widgets.HBox([self.preview_image, self.preview_status])
         ])
 
         # Display the app
@@ -178,43 +319,215 @@ class StoryGeneratorApp:
         display(self.output_area)
     
     def generate_complete_story(self, initial_prompt, num_chapters=3, chapter_length=150, 
-                              temperature=0.8, art_style="fantasy art, detailed, high quality"):
+                              temperature=0.8, art_style="fantasy art, detailed, high quality",
+                              continuation="prompt", pipelined=False, queue_size=2, exporter=None, seed=None):
         """
         Generate a complete story with multiple chapters and images.
 
+        Each chapter's images are generated as soon as its text is finished.
+        With an exporter, the chapter and its images are then written to disk
+        right away, so a failure in a later chapter keeps the earlier ones on
+        disk, and the returned story data
+        references image files ("path") instead of holding the images, so
+        memory use does not grow with the number of chapters.
+
         Args:
             initial_prompt (str): Starting prompt for the story
             num_chapters (int): Number of chapters to generate
             chapter_length (int): Length of each chapter
             temperature (float): Creativity level
             art_style (str): Art style for images
+            continuation (str): Chapter chaining mode, "prompt" or "kv_cache"
+            pipelined (bool): Generate each chapter's images in a background
+                worker while the next chapter's text is being generated
+            queue_size (int): Maximum number of chapters waiting for images
+                in pipelined mode
+            exporter (StoryExporter): Optional exporter the story is written to
+            seed (int): Random seed for a reproducible story and images; each
+                chapter's seed is recorded with the chapter
 
         Returns:
             dict: Complete story with text and images
         """
-        # Generate story text
-        story_data = self.story_generator.generate_complete_story(
-            initial_prompt, num_chapters, chapter_length, temperature
-        )
-        
-        # Generate images for each chapter
+        if exporter is not None and not exporter.started:
+            exporter.start({'initial_prompt': initial_prompt, 'art_style': art_style})
+
+        if pipelined:
+            return self._generate_complete_story_pipelined(
+                initial_prompt, num_chapters, chapter_length, temperature,
+                art_style, continuation, queue_size, exporter, seed
+            )
+
         all_images = []
-        
-        for chapter in story_data['chapters']:
+
+        def finish_chapter(chapter):
+            """Generate a finished chapter's images and export it."""
+            chapter_images = []
             if chapter['scene_descriptions']:
-                print(f"\\n🎨 Generating images for Chapter {chapter['number']}...")
+                get_telemetry().log(f"\\n🎨 Generating images for Chapter {chapter['number']}...")
                 chapter_images = self.image_generator.generate_story_images(
                     chapter['scene_descriptions'], 
-                    art_style=art_style
+                    art_style=art_style,
+                    title=f"Chapter {chapter['number']}",
+                    seed=scene_seeds(chapter['seed'], len(chapter['scene_descriptions']))
                 )
-                
-                # Add chapter info to each image
-                for image_info in chapter_images:
-                    image_info['chapter'] = chapter['number']
-                    all_images.append(image_info)
+
+            if exporter is not None:
+                # Keep file references only; the images are on disk now
+                chapter_images = exporter.add_chapter(chapter, chapter_images)
+            
+            # Add chapter info to each image
+            for image_info in chapter_images:
+                image_info['chapter'] = chapter['number']
+                all_images.append(image_info)
+
+        story_data = self.story_generator.generate_complete_story(
+            initial_prompt, num_chapters, chapter_length, temperature,
+            continuation=continuation,
+            on_chapter=finish_chapter,
+            seed=seed
+        )
         
         story_data['images'] = all_images
+        if exporter is not None:
+            exporter.finish(story_data['metadata'])
+            story_data['export'] = exporter.summary()
         
-        print(f"\\n🖼️ Total images generated: {len(all_images)}")
+        get_telemetry().log(f"\\n🖼️ Total images generated: {len(all_images)}")
         
-        return story_data
\ No newline at end of file
+        return story_data
+
+    def _generate_complete_story_pipelined(self, initial_prompt, num_chapters, chapter_length,
+                                           temperature, art_style, continuation, queue_size, exporter=None,
+                                           seed=None):
+        """
+        Generate a complete story, overlapping image generation with text generation.
+
+        Finished chapters are handed to a background worker through a bounded
+        queue, so chapter N's images are rendered while chapter N+1's text is
+        generated. If the queue is full, text generation waits for the worker.
+        Images are collected per chapter and reassembled in chapter order once
+        both stages are done. An error in either stage stops the other one and
+        is raised to the caller. With an exporter, the worker writes every
+        chapter to disk, in order, once its images are done, and keeps only
+        the file references.
+
+        Args:
+            initial_prompt (str): Starting prompt for the story
+            num_chapters (int): Number of chapters to generate
+            chapter_length (int): Length of each chapter
+            temperature (float): Creativity level
+            art_style (str): Art style for images
+            continuation (str): Chapter chaining mode, "prompt" or "kv_cache"
+            queue_size (int): Maximum number of chapters waiting for images
+            exporter (StoryExporter): Optional exporter the story is written to
+            seed (int): Random seed for a reproducible story and images
+
+        Returns:
+            dict: Complete story with text and images
+        """
+        pending = queue.Queue(maxsize=max(queue_size, 1))
+        stop = threading.Event()
+        chapter_images = {}
+        errors = []
+
+        def image_worker():
+            while not stop.is_set():
+                try:
+                    item = pending.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    return
+
+                number = item['number']
+                try:
+                    images = []
+                    if item['scene_descriptions']:
+                        get_telemetry().log(f"\n🎨 Generating images for Chapter {number}...")
+                        # Images are displayed from the main thread after reassembly
+                        images = self.image_generator.generate_story_images(
+                            item['scene_descriptions'],
+                            art_style=art_style,
+                            display=False,
+                            seed=scene_seeds(item['seed'], len(item['scene_descriptions']))
+                        )
+                    if exporter is not None:
+                        images = exporter.add_chapter(item, images)
+                    chapter_images[number] = images
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                    return
+
+        def submit_chapter(chapter):
+            # Chapters without scenes only need the worker when they are exported
+            if not chapter['scene_descriptions'] and exporter is None:
+                return
+            while True:
+                if errors:
+                    raise errors[0]
+                try:
+                    pending.put(chapter, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        worker = threading.Thread(target=image_worker, daemon=True)
+        worker.start()
+
+        try:
+            story_data = self.story_generator.generate_complete_story(
+                initial_prompt, num_chapters, chapter_length, temperature,
+                continuation=continuation,
+                on_chapter=submit_chapter,
+                seed=seed
+            )
+        except BaseException:
+            stop.set()
+            worker.join()
+            raise
+
+        # Let the worker drain the remaining chapters, then stop it
+        while worker.is_alive():
+            try:
+                pending.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        worker.join()
+
+        if errors:
+            raise errors[0]
+
+        # Reassemble images in chapter order
+        all_images = []
+        for chapter in story_data['chapters']:
+            items = []
+            opened = []
+            for image_info in chapter_images.get(chapter['number'], []):
+                image_info['chapter'] = chapter['number']
+                all_images.append(image_info)
+                if 'image' in image_info:
+                    image = image_info['image']
+                else:
+                    # Exported images are loaded back one chapter at a time
+                    image = Image.open(image_info['path'])
+                    opened.append(image)
+                items.append((image, f"Scene {image_info['scene']}: {image_info['description'][:50]}..."))
+            try:
+                if items:
+                    self.image_generator.display.show_group(items, title=f"Chapter {chapter['number']}")
+            finally:
+                for image in opened:
+                    image.close()
+
+        story_data['images'] = all_images
+        story_data['metadata']['pipelined'] = True
+        if exporter is not None:
+            exporter.finish(story_data['metadata'])
+            story_data['export'] = exporter.summary()
+
+        get_telemetry().log(f"\n🖼️ Total images generated: {len(all_images)}")
+
+        return story_data
@@ -0,0 +1,255 @@
+"""Incremental export of stories and their images to a Markdown/HTML bundle."""
+
+import html
+import json
+import os
+import tempfile
+
+from .telemetry import get_telemetry
+
+EXPORT_FORMATS = ("md", "html")
+
+# PIL format name and save options per image file extension
+_IMAGE_FORMATS = {
+    'png': ("PNG", {}),
+    'jpg': ("JPEG", {'quality': 90}),
+    'webp': ("WEBP", {'quality': 90}),
+}
+
+_HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ max-width: 48em; margin: 2em auto; font-family: Georgia, serif; line-height: 1.5; }}
+figure {{ margin: 1.5em 0; }}
+img {{ max-width: 100%; }}
+figcaption {{ font-style: italic; color: #555; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+
+_HTML_FOOTER = "</body>\n</html>\n"
+
+
+class StoryExporter:
+    """Writes a story to disk one chapter at a time.
+
+    Every chapter is appended to story.md and/or story.html as soon as it is
+    added, and its images are saved to images/ and dropped, so the memory
+    used does not grow with the length of the story. An index.json manifest
+    lists the chapters, their prompts and scenes and the image files; it is
+    rewritten atomically after every chapter, so an interrupted export is
+    still a readable bundle of the chapters finished so far.
+
+    Bundle layout::
+
+        <directory>/
+            index.json
+            story.md
+            story.html
+            images/chapter-001-scene-1.png
+    """
+
+    def __init__(self, directory, formats=EXPORT_FORMATS, image_format="png"):
+        """
+        Initialize the exporter.
+
+        Args:
+            directory (str): Bundle directory, created if missing
+            formats (tuple): Story files to write, any of "md" and "html"
+            image_format (str): Image file format, "png", "jpg" or "webp"
+        """
+        formats = tuple(formats)
+        unknown = [name for name in formats if name not in EXPORT_FORMATS]
+        if unknown or not formats:
+            raise ValueError(f"Unsupported export formats: {', '.join(unknown) or 'none given'}")
+        if image_format not in _IMAGE_FORMATS:
+            raise ValueError(f"Unsupported export image format: {image_format}")
+
+        self.directory = directory
+        self.formats = formats
+        self.image_format = image_format
+        self.manifest_path = os.path.join(directory, "index.json")
+        self._manifest = None
+
+    @property
+    def started(self):
+        """bool: Whether the bundle files have been created."""
+        return self._manifest is not None
+
+    def start(self, metadata=None):
+        """
+        Create the bundle directory and empty story files.
+
+        Existing story files and manifest in the directory are replaced.
+        Called by add_chapter() if it has not been called yet.
+
+        Args:
+            metadata (dict): Story metadata; its "initial_prompt" becomes the title
+        """
+        metadata = dict(metadata or {})
+        title = metadata.get('initial_prompt') or "Story"
+
+        os.makedirs(os.path.join(self.directory, "images"), exist_ok=True)
+        if "md" in self.formats:
+            with open(os.path.join(self.directory, "story.md"), "w", encoding="utf-8") as f:
+                f.write(f"# {title}\n")
+        if "html" in self.formats:
+            with open(os.path.join(self.directory, "story.html"), "w", encoding="utf-8") as f:
+                f.write(_HTML_HEADER.format(title=html.escape(title)))
+
+        self._manifest = {
+            'complete': False,
+            'metadata': metadata,
+            'files': {name: f"story.{name}" for name in self.formats},
+            'chapters': []
+        }
+        self._write_manifest()
+
+    def add_chapter(self, chapter, images=None):
+        """
+        Write one chapter and its images.
+
+        Args:
+            chapter (dict): Chapter data with "number", "text", "prompt" and
+                "scene_descriptions", as produced by generate_complete_story
+            images (list): Image info dicts with "scene", "description" and
+                "image" (a PIL image), as returned by generate_story_images
+
+        Returns:
+            list: The image info dicts with the image replaced by its file
+                "path" and with the chapter "number" under "chapter"
+        """
+        if not self.started:
+            self.start()
+
+        telemetry = get_telemetry()
+        number = chapter['number']
+        with telemetry.span("export.chapter", chapter=number):
+            references = []
+            for image_info in images or []:
+                file_name = f"images/chapter-{number:03d}-scene-{image_info['scene']}.{self.image_format}"
+                self._save_image(image_info['image'], file_name)
+                references.append({
+                    'chapter': number,
+                    'scene': image_info['scene'],
+                    'description': image_info['description'],
+                    'seed': image_info.get('seed'),
+                    'path': os.path.join(self.directory, file_name),
+                    'file': file_name
+                })
+
+            if "md" in self.formats:
+                self._append("story.md", self._markdown(chapter, references))
+            if "html" in self.formats:
+                self._append("story.html", self._html(chapter, references))
+
+            self._manifest['chapters'].append({
+                'number': number,
+                'prompt': chapter.get('prompt'),
+                'seed': chapter.get('seed'),
+                'scene_descriptions': chapter.get('scene_descriptions', []),
+                'images': [
+                    {key: ref[key] for key in ('scene', 'description', 'seed', 'file')} for ref in references
+                ]
+            })
+            self._write_manifest()
+
+        telemetry.counter("export.chapters")
+        telemetry.counter("export.images", len(references))
+        return references
+
+    def finish(self, metadata=None):
+        """
+        Close the story files and mark the bundle as complete.
+
+        Args:
+            metadata (dict): Final story metadata, merged into the manifest
+
+        Returns:
+            dict: The bundle manifest
+        """
+        if not self.started:
+            self.start(metadata)
+        if metadata:
+            self._manifest['metadata'].update(metadata)
+        if "html" in self.formats:
+            self._append("story.html", _HTML_FOOTER)
+
+        self._manifest['complete'] = True
+        self._write_manifest()
+        get_telemetry().log(f"📁 Story exported to: {self.directory}")
+        return self._manifest
+
+    def summary(self):
+        """
+        Describe the bundle for inclusion in the returned story data.
+
+        Returns:
+            dict: Bundle directory, manifest path and story file paths
+        """
+        return {
+            'directory': self.directory,
+            'manifest': self.manifest_path,
+            'files': {name: os.path.join(self.directory, f"story.{name}") for name in self.formats}
+        }
+
+    @staticmethod
+    def _markdown(chapter, references):
+        """Render a chapter as Markdown."""
+        parts = [f"\n## Chapter {chapter['number']}\n\n{chapter['text'].strip()}\n"]
+        for ref in references:
+            caption = f"Scene {ref['scene']}: {ref['description']}"
+            parts.append(f"\n![{caption}]({ref['file']})\n\n*{caption}*\n")
+        return "".join(parts)
+
+    @staticmethod
+    def _html(chapter, references):
+        """Render a chapter as an HTML fragment."""
+        parts = [f"<h2>Chapter {chapter['number']}</h2>\n"]
+        for paragraph in chapter['text'].strip().split("\n\n"):
+            if paragraph.strip():
+                parts.append(f"<p>{html.escape(paragraph.strip())}</p>\n")
+        for ref in references:
+            caption = html.escape(f"Scene {ref['scene']}: {ref['description']}")
+            parts.append(f'<figure><img src="{html.escape(ref["file"])}" alt="{caption}">'
+                         f"<figcaption>{caption}</figcaption></figure>\n")
+        return "".join(parts)
+
+    def _append(self, file_name, text):
+        """Append text to a story file and flush it to disk."""
+        with open(os.path.join(self.directory, file_name), "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def _save_image(self, image, file_name):
+        """Save an image atomically (temporary file + rename)."""
+        pil_format, options = _IMAGE_FORMATS[self.image_format]
+        path = os.path.join(self.directory, file_name)
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=f".{self.image_format}",
+                                         dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if pil_format == "JPEG" and image.mode != "RGB":
+                    image = image.convert("RGB")
+                image.save(f, format=pil_format, **options)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _write_manifest(self):
+        """Write the manifest atomically, so readers never see a partial file."""
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._manifest, f, indent=2, ensure_ascii=False, default=str)
+            os.replace(temp_path, self.manifest_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -1,82 +1,748 @@
 """Story text generation module using transformers."""
 
 import torch
-import re
-from transformers import pipeline
+import time
+import threading
+import weakref
+from transformers import (
+    LogitsProcessor,
+    LogitsProcessorList,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TemperatureLogitsWarper,
+    TextIteratorStreamer,
+    TopKLogitsWarper,
+    TopPLogitsWarper,
+    pipeline
+)
 import warnings
+from .batch_scheduler import MicroBatchScheduler
+from .coalescer import RequestCoalescer
+from .model_registry import get_registry
+from .prefix_cache import PrefixCache
+from .scene_extractor import SceneExtractor
+from .telemetry import get_telemetry
 
 warnings.filterwarnings('ignore')
 
+# Precision option -> dtype recorded in the model registry key
+PRECISIONS = {
+    'fp32': 'float32',
+    'bf16': 'bfloat16',
+    'int8-dynamic': 'int8-dynamic',
+}
+
+
+class SeededSampler(LogitsProcessor):
+    """Draws every next token from a random generator owned by one request.
+
+    transformers samples from torch's global random generator, which every
+    thread shares, so a seed set there would not survive concurrent
+    generations. This processor applies the temperature, top-k and top-p
+    warping itself, samples the token from its own torch.Generator and
+    leaves only that token possible; the sampling step that follows then
+    has a single choice, whatever the global generator's state.
+    """
+
+    def __init__(self, seed, temperature=1.0, top_p=1.0, top_k=None, device=None):
+        """
+        Initialize the sampler.
+
+        Args:
+            seed (int): Random seed
+            temperature (float): Sampling temperature
+            top_p (float): Nucleus sampling threshold
+            top_k (int): Number of most likely tokens kept (None or 0 for all)
+            device (torch.device): Device the model runs on
+        """
+        self.generator = torch.Generator(device=device or "cpu").manual_seed(seed)
+        self.warpers = LogitsProcessorList([TemperatureLogitsWarper(temperature)])
+        if top_k:
+            self.warpers.append(TopKLogitsWarper(top_k))
+        if top_p < 1.0:
+            self.warpers.append(TopPLogitsWarper(top_p))
+
+    def __call__(self, input_ids, scores):
+        """Sample one token per sequence and mask out all other tokens."""
+        probs = torch.softmax(self.warpers(input_ids, scores).float(), dim=-1)
+        tokens = torch.multinomial(probs, 1, generator=self.generator)
+        return torch.full_like(scores, -float("inf")).scatter_(1, tokens, 0.0)
+
+
+def seeded_sampling(seed, model, temperature, top_p):
+    """
+    Build the logits processors that make sampling reproducible.
+
+    Args:
+        seed (int): Random seed, or None
+        model: Text model; its device and generation config are used
+        temperature (float): Sampling temperature
+        top_p (float): Nucleus sampling threshold
+
+    Returns:
+        LogitsProcessorList: Processors for model.generate, or None without a seed
+    """
+    if seed is None:
+        return None
+    top_k = getattr(model.generation_config, 'top_k', None)
+    return LogitsProcessorList([SeededSampler(seed, temperature, top_p, top_k, model.device)])
+
+
+class _TimedTextStreamer(TextIteratorStreamer):
+    """Text streamer that also records when each generated token arrives."""
+
+    def __init__(self, tokenizer, **kwargs):
+        super().__init__(tokenizer, **kwargs)
+        self.token_times = []
+
+    def put(self, value):
+        if not (self.skip_prompt and self.next_tokens_are_prompt):
+            # Assisted generation hands over several accepted tokens at once
+            self.token_times.extend([time.perf_counter()] * max(value.numel(), 1))
+        super().put(value)
+
+
+class _StopEvent(StoppingCriteria):
+    """Stopping criterion that ends generation once an event is set."""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class _ForwardCounter:
+    """Counts the forward passes of a model inside a with block."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._handle = self.model.register_forward_hook(self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._handle.remove()
+
+    def _count(self, module, inputs, output):
+        self.calls += 1
+
+
+def _conv1d_to_linear(model):
+    """
+    Replace GPT-2's Conv1D layers with equivalent nn.Linear layers, in place.
+
+    GPT-2 implements its projections as Conv1D (a linear layer with a
+    transposed weight), which dynamic quantization does not recognise.
+
+    Args:
+        model (torch.nn.Module): Model to convert
+
+    Returns:
+        int: Number of layers replaced
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    replaced = 0
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                linear = torch.nn.Linear(child.nx, child.nf, bias=child.bias is not None)
+                with torch.no_grad():
+                    linear.weight.copy_(child.weight.t())
+                    if child.bias is not None:
+                        linear.bias.copy_(child.bias)
+                setattr(module, name, linear.to(child.weight.device))
+                replaced += 1
+    return replaced
+
+
+def _apply_precision(model, precision):
+    """
+    Convert a loaded model to the requested precision, in place.
+
+    Args:
+        model (torch.nn.Module): Model in fp32
+        precision (str): One of PRECISIONS
+    """
+    if precision == "bf16":
+        model.to(torch.bfloat16)
+    elif precision == "int8-dynamic":
+        _conv1d_to_linear(model)
+        # Weights are stored as int8; activations are quantized on the fly
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    model.eval()
+
 
 class StoryGenerator:
     """Handles story text generation using pre-trained language models."""
     
-    def __init__(self, model_name="gpt2-medium"):
+    def __init__(self, model_name="gpt2-medium", scene_extractor=None, precision="fp32", draft_model_name=None):
         """
         Initialize the story generator.
+
+        The model is loaded by load_model(), or automatically on first use.
         
         Args:
             model_name (str): Name of the pre-trained model to use
+            scene_extractor (SceneExtractor): Picks scene descriptions out of
+                chapters (defaults to the built-in visual keyword lexicon)
+            precision (str): "fp32", "bf16" (bfloat16 weights) or
+                "int8-dynamic" (linear layers quantized to int8, CPU only)
+            draft_model_name (str): Smaller model with the same tokenizer
+                (e.g. "distilgpt2") that drafts tokens for assisted generation
+                of single chapters; None turns assisted generation off
         """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision} (choose from {', '.join(PRECISIONS)})")
+        if draft_model_name is not None and draft_model_name == model_name:
+            raise ValueError("The draft model must be smaller than, and different from, the main model")
         self.model_name = model_name
+        self.precision = precision
+        self.draft_model_name = draft_model_name
+        self.scene_extractor = scene_extractor or SceneExtractor()
         self.text_generator = None
-        self.load_model()
+        self.draft_generator = None
+        self.last_batch_stats = None
+        self.last_stream_stats = None
+        self.last_assisted_stats = None
+        self._load_lock = threading.Lock()
+        self._release = None
+        self._draft_release = None
+        self._scheduler = None
+        self.prefix_cache = None
+        # Concurrent identical seeded requests share one generation
+        self.coalescer = RequestCoalescer(name="text.coalescer")
     
+    def _ensure_model(self):
+        """Load the model if it has not been loaded yet."""
+        with self._load_lock:
+            if not self.text_generator:
+                self.load_model()
+
     def load_model(self):
-        """Load the text generation model."""
-        print(f"Loading text generation model: {self.model_name}...")
-        
+        """
+        Load the text generation model, and the draft model if one is set.
+
+        The pipelines come from the process-wide model registry, so generators
+        using the same model on the same device share one copy of it.
+        """
+        # Quantized int8 kernels only exist for the CPU
+        device = "cuda" if torch.cuda.is_available() and self.precision != "int8-dynamic" else "cpu"
+        telemetry = get_telemetry()
+
         try:
-            self.text_generator = pipeline(
-                "text-generation",
-                model=self.model_name,
-                tokenizer=self.model_name,
-                device=0 if torch.cuda.is_available() else -1
-            )
-            print("✅ Text generation model loaded successfully!")
-            print(f"Device: {'GPU' if torch.cuda.is_available() else 'CPU'}")
+            text_generator, release = self._acquire_pipeline(self.model_name, device)
+            draft_generator = draft_release = None
+            if self.draft_model_name:
+                try:
+                    draft_generator, draft_release = self._acquire_pipeline(self.draft_model_name, device)
+                    if len(draft_generator.tokenizer) != len(text_generator.tokenizer):
+                        draft_release()
+                        raise ValueError(f"Draft model {self.draft_model_name} does not share the "
+                                         f"tokenizer of {self.model_name}")
+                except Exception:
+                    release()
+                    raise
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
+            telemetry.log(f"❌ Error loading model: {e}", level="error")
             raise
+
+        self._release_model()
+        self.text_generator = text_generator
+        self.draft_generator = draft_generator
+        self._release = release
+        self._draft_release = draft_release
+
+    def _acquire_pipeline(self, model_name, device):
+        """
+        Get a text generation pipeline from the model registry.
+
+        Args:
+            model_name (str): Model to load
+            device (str): "cuda" or "cpu"
+
+        Returns:
+            tuple: (pipeline, finalizer that gives it back to the registry)
+        """
+        key = ("text-generation", model_name, device, PRECISIONS[self.precision])
+        registry = get_registry()
+        telemetry = get_telemetry()
+
+        def load():
+            telemetry.log(f"Loading text generation model: {model_name} ({self.precision})...")
+            with telemetry.span("model.load", kind="text-generation", model=model_name, device=device,
+                                precision=self.precision):
+                text_generator = pipeline(
+                    "text-generation",
+                    model=model_name,
+                    tokenizer=model_name,
+                    device=0 if device == "cuda" else -1
+                )
+                _apply_precision(text_generator.model, self.precision)
+
+            # GPT-2 has no pad token; reuse EOS and pad on the left so that
+            # batched prompts all end at the position where generation starts.
+            tokenizer = text_generator.tokenizer
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = 'left'
+            telemetry.log("✅ Text generation model loaded successfully!")
+            telemetry.log(f"Device: {'GPU' if device == 'cuda' else 'CPU'}")
+            return text_generator
+
+        text_generator = registry.acquire(key, load)
+        # Give the model back to the registry when this generator is closed
+        # or garbage collected
+        return text_generator, weakref.finalize(self, registry.release, key)
+
+    def enable_micro_batching(self, window=0.01, max_batch_size=8, max_pending=64, submit_timeout=30.0):
+        """
+        Batch concurrent generate_chapter() calls into shared forward passes.
+
+        Calls arriving from several threads within the window are grouped by
+        max_length and temperature and generated as one left-padded batch,
+        which multiplies throughput under concurrent load. Each chapter gets
+        the same length budget as an unbatched call, whatever else is in
+        its batch.
+
+        Args:
+            window (float): Seconds to wait for more requests after the first
+            max_batch_size (int): Maximum number of chapters per batch
+            max_pending (int): Maximum number of queued chapters; further
+                calls wait up to submit_timeout seconds and then fail
+            submit_timeout (float): Seconds a call waits for queue space
+
+        Returns:
+            MicroBatchScheduler: The scheduler, e.g. for its stats()
+        """
+        self.disable_micro_batching()
+        self._scheduler = MicroBatchScheduler(
+            lambda prompts, key: self._generate_batch(prompts, *key)[0],
+            window=window,
+            max_batch_size=max_batch_size,
+            max_pending=max_pending,
+            submit_timeout=submit_timeout,
+            name="text.scheduler"
+        )
+        return self._scheduler
+
+    def disable_micro_batching(self):
+        """Finish queued chapters and go back to one forward pass per call."""
+        scheduler, self._scheduler = self._scheduler, None
+        if scheduler is not None:
+            scheduler.close()
+
+    def enable_prefix_cache(self, max_bytes=64 * 2**20, min_tokens=4):
+        """
+        Reuse the attention cache of prompt prefixes seen before.
+
+        The prefill of every single-sequence chapter (generate_chapter,
+        generate_chapter_stream and the first chapter of a kv_cache story) is
+        stored, and later prompts starting with the same tokens, such as the
+        sample prompts or a form's default text, only run their remaining
+        tokens through the model. Batched, multi-sequence and assisted
+        generations do not use it.
+
+        Args:
+            max_bytes (int): Memory cap for the cached attention caches
+            min_tokens (int): Shortest prefix worth storing or reusing
+
+        Returns:
+            PrefixCache: The cache, e.g. for its stats()
+        """
+        self.prefix_cache = PrefixCache(max_bytes=max_bytes, min_tokens=min_tokens, name="text.prefix_cache")
+        return self.prefix_cache
+
+    def disable_prefix_cache(self):
+        """Stop reusing prompt prefixes and free their attention caches."""
+        prefix_cache, self.prefix_cache = self.prefix_cache, None
+        if prefix_cache is not None:
+            prefix_cache.clear()
+
+    def warm_prefix_cache(self, prompts):
+        """
+        Compute and cache the prefill of prompts expected to be used often.
+
+        Args:
+            prompts (list): Prompts, e.g. utils.get_sample_prompts()
+
+        Returns:
+            int: Number of prompts that were not fully cached yet
+        """
+        if self.prefix_cache is None:
+            raise RuntimeError("Call enable_prefix_cache() before warming it")
+        self._ensure_model()
+
+        model = self.text_generator.model
+        tokenizer = self.text_generator.tokenizer
+        computed = 0
+        with torch.no_grad():
+            for prompt in prompts:
+                input_ids = tokenizer(prompt, return_tensors='pt')['input_ids'].to(model.device)
+                reused, _ = self._prefill(model, input_ids)
+                computed += reused < input_ids.shape[1] - 1
+        return computed
+
+    def close(self):
+        """Release the model so the registry can unload it when memory is needed."""
+        self.disable_micro_batching()
+        if self.prefix_cache is not None:
+            self.prefix_cache.clear()
+        self._release_model()
+
+    def _release_model(self):
+        """Give the models back to the registry."""
+        for release in (self._release, self._draft_release):
+            if release is not None:
+                release()
+        self._release = None
+        self._draft_release = None
+        self.text_generator = None
+        self.draft_generator = None
     
-    def generate_chapter(self, prompt, max_length=200, temperature=0.8, num_return_sequences=1):
+    def generate_chapter(self, prompt, max_length=200, temperature=0.8, num_return_sequences=1, seed=None):
         """
         Generate a story chapter based on a given prompt.
 
+        With a seed, the same prompt and settings always give the same
+        chapter, and identical seeded calls made while one is already running
+        wait for it and share its result instead of generating again. Seeded
+        calls bypass micro-batching, since batching would change the samples.
+
         Args:
             prompt (str): The starting prompt for the story
             max_length (int): Maximum length of generated text
             temperature (float): Controls randomness (0.1 = conservative, 1.0 = creative)
             num_return_sequences (int): Number of different versions to generate
+            seed (int): Random seed for reproducible sampling (None for random)
 
         Returns:
             str: Generated story text
         """
-        if not self.text_generator:
-            raise RuntimeError("Text generator not loaded. Call load_model() first.")
-        
-        try:
-            generated = self.text_generator(
-                prompt,
-                max_length=max_length,
-                temperature=temperature,
-                num_return_sequences=num_return_sequences,
-                pad_token_id=self.text_generator.tokenizer.eos_token_id,
-                do_sample=True,
-                top_p=0.9,
-                repetition_penalty=1.1
+        self._ensure_model()
+
+        if seed is not None:
+            return self.coalescer.run(
+                ("chapter", prompt, max_length, temperature, num_return_sequences, seed),
+                lambda: self._generate_chapter(prompt, max_length, temperature, num_return_sequences, seed)
             )
 
-            story_text = generated[0]['generated_text']
+        scheduler = self._scheduler
+        if scheduler is not None and num_return_sequences == 1:
+            try:
+                return scheduler.submit(prompt, key=(max_length, temperature)).result()
+            except Exception as e:
+                return f"Error generating story: {str(e)}"
+
+        return self._generate_chapter(prompt, max_length, temperature, num_return_sequences)
+
+    def _generate_chapter(self, prompt, max_length, temperature, num_return_sequences, seed=None):
+        """Generate a chapter directly with the model; see generate_chapter()."""
+        model = self.text_generator.model
+        tokenizer = self.text_generator.tokenizer
+        telemetry = get_telemetry()
+
+        try:
+            with telemetry.span("text.tokenize"):
+                inputs = tokenizer(prompt, return_tensors='pt').to(model.device)
+            prompt_length = inputs['input_ids'].shape[1]
+
+            with telemetry.span("text.decode", mode="single"):
+                with torch.no_grad():
+                    output_ids = self._generate(
+                        model,
+                        inputs,
+                        mode="single",
+                        max_new_tokens=max(max_length - prompt_length, 1),
+                        temperature=temperature,
+                        num_return_sequences=num_return_sequences,
+                        pad_token_id=tokenizer.pad_token_id,
+                        do_sample=True,
+                        top_p=0.9,
+                        repetition_penalty=1.1,
+                        logits_processor=seeded_sampling(seed, model, temperature, 0.9)
+                    )
 
-            # Clean up the text (remove the original prompt and clean formatting)
-            if story_text.startswith(prompt):
-                story_text = story_text[len(prompt):].strip()
+                # Keep only the continuation, without the original prompt
+                generated = output_ids[0, prompt_length:]
+                story_text = tokenizer.decode(generated, skip_special_tokens=True).strip()
+            telemetry.counter("text.tokens", len(generated), mode="single")
 
             return story_text
 
         except Exception as e:
             return f"Error generating story: {str(e)}"
+
+    def generate_chapter_stream(self, prompt, max_length=200, temperature=0.8, seed=None):
+        """
+        Generate a story chapter, yielding text pieces as soon as they are decoded.
+
+        Generation runs in a background thread. Timing statistics (time to first
+        token and mean inter-token latency) are stored in ``last_stream_stats``
+        once the stream is exhausted. Closing the generator early stops generation.
+
+        Args:
+            prompt (str): The starting prompt for the story
+            max_length (int): Maximum length of generated text (prompt included)
+            temperature (float): Controls randomness (0.1 = conservative, 1.0 = creative)
+            seed (int): Random seed for reproducible sampling (None for random)
+
+        Yields:
+            str: Newly decoded pieces of the chapter text
+        """
+        self._ensure_model()
+
+        model = self.text_generator.model
+        tokenizer = self.text_generator.tokenizer
+        telemetry = get_telemetry()
+
+        with telemetry.span("text.tokenize"):
+            inputs = tokenizer(prompt, return_tensors='pt').to(model.device)
+        streamer = _TimedTextStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = threading.Event()
+        errors = []
+        self.last_stream_stats = None
+
+        def run():
+            try:
+                with telemetry.span("text.decode", mode="stream"), torch.no_grad():
+                    self._generate(
+                        model,
+                        inputs,
+                        mode="stream",
+                        max_new_tokens=max(max_length - inputs['input_ids'].shape[1], 1),
+                        temperature=temperature,
+                        pad_token_id=tokenizer.pad_token_id,
+                        do_sample=True,
+                        top_p=0.9,
+                        repetition_penalty=1.1,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([_StopEvent(stop)]),
+                        logits_processor=seeded_sampling(seed, model, temperature, 0.9)
+                    )
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        start = time.perf_counter()
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+
+        first_piece = True
+        try:
+            for piece in streamer:
+                if first_piece:
+                    # Drop the whitespace between the prompt and the continuation
+                    piece = piece.lstrip()
+                    if not piece:
+                        continue
+                    first_piece = False
+                yield piece
+        finally:
+            stop.set()
+            worker.join()
+
+        if errors:
+            raise errors[0]
+
+        times = streamer.token_times
+        telemetry.counter("text.tokens", len(times), mode="stream")
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        self.last_stream_stats = {
+            'tokens': len(times),
+            'seconds': time.perf_counter() - start,
+            'time_to_first_token': times[0] - start if times else None,
+            'mean_inter_token_latency': sum(gaps) / len(gaps) if gaps else None
+        }
+
+    def _generate(self, model, inputs, mode, **kwargs):
+        """
+        Run model.generate, assisted by the draft model when one is loaded.
+
+        Assisted generation handles one sequence at a time, so batches,
+        multiple return sequences and seeded requests always decode with the
+        target model alone.
+        Acceptance statistics of assisted runs are stored in
+        ``last_assisted_stats``. Single sequences without a draft model start
+        from the prefix cache when it is enabled.
+
+        Args:
+            model: Target model
+            inputs (dict): Tokenized prompt
+            mode (str): Decoding mode label for metrics
+            **kwargs: Arguments for model.generate
+
+        Returns:
+            torch.Tensor: Prompt and generated token ids
+        """
+        draft = self.draft_generator
+        single = inputs['input_ids'].shape[0] == 1 and kwargs.get('num_return_sequences', 1) == 1
+        # Seeded sampling draws a varying number of tokens per step when
+        # assisted, so it would no longer reproduce the target model's samples
+        seeded = kwargs.get('logits_processor') is not None
+        if draft is None or not single or seeded:
+            if self.prefix_cache is not None and single:
+                _, kwargs['past_key_values'] = self._prefill(model, inputs['input_ids'])
+            return model.generate(**inputs, **kwargs)
+
+        start = time.perf_counter()
+        with _ForwardCounter(model) as target_passes, _ForwardCounter(draft.model) as draft_passes:
+            output_ids = model.generate(**inputs, assistant_model=draft.model, **kwargs)
+        seconds = time.perf_counter() - start
+
+        # Every verification pass of the target model keeps the accepted draft
+        # tokens plus one token of its own; every draft pass proposes one token
+        new_tokens = output_ids.shape[1] - inputs['input_ids'].shape[1]
+        accepted = min(max(new_tokens - target_passes.calls, 0), draft_passes.calls)
+        self.last_assisted_stats = {
+            'tokens': new_tokens,
+            'seconds': seconds,
+            'target_passes': target_passes.calls,
+            'draft_tokens': draft_passes.calls,
+            'accepted_tokens': accepted,
+            'acceptance_rate': accepted / draft_passes.calls if draft_passes.calls else 0.0,
+            'tokens_per_second': new_tokens / seconds if seconds > 0 else 0.0
+        }
+
+        telemetry = get_telemetry()
+        telemetry.counter("text.draft_tokens", draft_passes.calls, mode=mode)
+        telemetry.counter("text.accepted_draft_tokens", accepted, mode=mode)
+        telemetry.observe("text.acceptance_rate", self.last_assisted_stats['acceptance_rate'], mode=mode)
+        return output_ids
+
+    def _prefill(self, model, input_ids):
+        """
+        Build the attention cache of all but the last prompt token, reusing the longest cached prefix.
+
+        Only the tokens after the cached prefix are run through the model;
+        the resulting cache is stored for later prompts. The last token is
+        left for model.generate, which needs at least one new token.
+
+        Args:
+            model: Text model
+            input_ids (torch.Tensor): Token ids of one prompt, shape (1, length)
+
+        Returns:
+            tuple: (tokens taken from the prefix cache, attention cache, or
+                None when the prompt is too short to be worth caching)
+        """
+        prefix = input_ids[0, :-1].tolist()
+        if len(prefix) < self.prefix_cache.min_tokens:
+            return 0, None
+
+        reused, past_key_values = self.prefix_cache.lookup(prefix)
+        if reused < len(prefix):
+            with get_telemetry().span("text.prefill", tokens=len(prefix) - reused):
+                output = model(input_ids=input_ids[:, reused:-1], past_key_values=past_key_values, use_cache=True)
+            past_key_values = output.past_key_values
+            self.prefix_cache.store(prefix, past_key_values)
+        return reused, past_key_values
+
+    def generate_chapters(self, prompts, max_length=200, temperature=0.8, batch_size=8):
+        """
+        Generate one chapter per prompt, running prompts through the model in batches.
+
+        Prompts are sorted by token length before batching so that each batch
+        needs as little left-padding as possible. Results are returned in the
+        same order as the input prompts.
+
+        Args:
+            prompts (list): Starting prompts, one per chapter
+            max_length (int): Maximum length of generated text (prompt included)
+            temperature (float): Controls randomness (0.1 = conservative, 1.0 = creative)
+            batch_size (int): Number of prompts to run through the model at once
+
+        Returns:
+            list: Generated story text for each prompt, in input order
+        """
+        self._ensure_model()
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        prompts = list(prompts)
+        tokenizer = self.text_generator.tokenizer
+        telemetry = get_telemetry()
+        with telemetry.span("text.tokenize", mode="batch"):
+            lengths = [len(tokenizer(prompt)['input_ids']) for prompt in prompts]
+        order = sorted(range(len(prompts)), key=lambda i: lengths[i])
+
+        results = [None] * len(prompts)
+        new_tokens = 0
+        start = time.perf_counter()
+
+        for batch_start in range(0, len(order), batch_size):
+            indices = order[batch_start:batch_start + batch_size]
+            batch_prompts = [prompts[i] for i in indices]
+
+            try:
+                texts, batch_tokens = self._generate_batch(batch_prompts, max_length, temperature)
+                new_tokens += batch_tokens
+            except Exception as e:
+                texts = [f"Error generating story: {str(e)}"] * len(batch_prompts)
+
+            for i, text in zip(indices, texts):
+                results[i] = text
+
+        elapsed = time.perf_counter() - start
+        self.last_batch_stats = {
+            'prompts': len(prompts),
+            'batch_size': batch_size,
+            'new_tokens': new_tokens,
+            'seconds': elapsed,
+            'tokens_per_second': new_tokens / elapsed if elapsed > 0 else 0.0
+        }
+
+        return results
+
+    def _generate_batch(self, prompts, max_length, temperature):
+        """
+        Run a single left-padded batch of prompts through the model.
+
+        Every prompt gets max_length minus its own length in new tokens, as
+        in an unbatched call: the batch runs to the largest budget and each
+        row is cut to its own.
+
+        Args:
+            prompts (list): Prompts in this batch
+            max_length (int): Maximum length of generated text (prompt included)
+            temperature (float): Sampling temperature
+
+        Returns:
+            tuple: (list of generated texts, number of new non-padding tokens)
+        """
+        model = self.text_generator.model
+        tokenizer = self.text_generator.tokenizer
+        telemetry = get_telemetry()
+
+        with telemetry.span("text.tokenize", mode="batch"):
+            inputs = tokenizer(prompts, return_tensors='pt', padding=True).to(model.device)
+        prompt_length = inputs['input_ids'].shape[1]
+        budgets = [max(max_length - int(length), 1) for length in inputs['attention_mask'].sum(dim=1)]
+
+        with telemetry.span("text.decode", mode="batch", batch_size=len(prompts)), torch.no_grad():
+            output_ids = model.generate(
+                **inputs,
+                max_new_tokens=max(budgets),
+                temperature=temperature,
+                pad_token_id=tokenizer.pad_token_id,
+                do_sample=True,
+                top_p=0.9,
+                repetition_penalty=1.1
+            )
+
+            generated = [row[prompt_length:prompt_length + budget] for row, budget in zip(output_ids, budgets)]
+            new_tokens = sum(int((row != tokenizer.pad_token_id).sum()) for row in generated)
+            texts = [
+                text.strip()
+                for text in tokenizer.batch_decode(generated, skip_special_tokens=True)
+            ]
+        telemetry.counter("text.tokens", new_tokens, mode="batch")
+
+        return texts, new_tokens
     
     def extract_scene_descriptions(self, text):
         """
@@ -86,29 +752,14 @@ class StoryGenerator:
             text (str): Story text
 
         Returns:
-            list: List of scene descriptions suitable for image generation
-        """
-        sentences = text.split('.')
-        scene_descriptions = []
-
-        # Look for sentences with visual descriptors
-        visual_keywords = [
-            'looked', 'saw', 'appeared', 'stood', 'walked', 'dark', 'bright',
-            'beautiful', 'scary', 'ancient', 'mysterious', 'golden', 'silver',
-            'forest', 'castle', 'mountain', 'ocean', 'sky', 'moon', 'sun'
-        ]
-
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if len(sentence) > 20 and any(keyword in sentence.lower() for keyword in visual_keywords):
-                # Clean and format for image generation
-                clean_sentence = re.sub(r'[^\w\s,.-]', '', sentence)
-                if len(clean_sentence) > 10:
-                    scene_descriptions.append(clean_sentence)
-
-        return scene_descriptions[:2]  # Return max 2 scenes per chapter
+            list: Scene descriptions suitable for image generation, most
+                visually descriptive first (at most the extractor's max_scenes)
+        """
+        with get_telemetry().span("text.scene_extraction"):
+            return self.scene_extractor.extract(text)
     
-    def generate_complete_story(self, initial_prompt, num_chapters=3, chapter_length=150, temperature=0.8):
+    def generate_complete_story(self, initial_prompt, num_chapters=3, chapter_length=150, temperature=0.8,
+                                continuation="prompt", context_window=None, on_chapter=None, seed=None):
         """
         Generate a complete story with multiple chapters.
 
@@ -117,10 +768,24 @@ class StoryGenerator:
             num_chapters (int): Number of chapters to generate
             chapter_length (int): Length of each chapter
             temperature (float): Creativity level
+            continuation (str): How chapters are chained together. "prompt" starts
+                each chapter from a short transition prompt built from the last
+                sentences of the previous one. "kv_cache" keeps the model's
+                attention cache from the previous chapter so every chapter sees
+                the whole story so far and only new tokens are encoded.
+            context_window (int): Maximum tokens kept in context for "kv_cache"
+                mode (defaults to the model's maximum, 1024 for GPT-2)
+            on_chapter (callable): Optional function called with each chapter's
+                data as soon as that chapter is finished
+            seed (int): Random seed for a reproducible story; chapter N is
+                sampled with seed + N - 1. Recorded in the metadata and chapters
 
         Returns:
             dict: Complete story data with chapters and metadata
         """
+        if continuation not in ("prompt", "kv_cache"):
+            raise ValueError(f"Unknown continuation mode: {continuation}")
+
         story_data = {
             'chapters': [],
             'full_text': '',
@@ -128,51 +793,183 @@ class StoryGenerator:
                 'initial_prompt': initial_prompt,
                 'num_chapters': num_chapters,
                 'chapter_length': chapter_length,
-                'temperature': temperature
+                'temperature': temperature,
+                'continuation': continuation,
+                'seed': seed
             }
         }
 
+        # Joined once at the end; appending to a string copies the whole story every chapter
+        text_parts = []
         current_prompt = initial_prompt
+        context = None
+        if continuation == "kv_cache":
+            context = self._new_context(context_window)
 
-        print(f"📚 Generating a {num_chapters}-chapter story...")
-        print("=" * 60)
+        telemetry = get_telemetry()
+        telemetry.log(f"📚 Generating a {num_chapters}-chapter story...")
+        telemetry.log("=" * 60)
 
         for chapter_num in range(1, num_chapters + 1):
-            print(f"\n🔄 Generating Chapter {chapter_num}...")
+            telemetry.log(f"\n🔄 Generating Chapter {chapter_num}...")
+            chapter_seed = seed + chapter_num - 1 if seed is not None else None
 
             # Generate chapter text
-            chapter_text = self.generate_chapter(
-                current_prompt,
-                max_length=chapter_length,
-                temperature=temperature
-            )
+            if context is not None:
+                chapter_text = self._generate_continuation(
+                    context,
+                    current_prompt,
+                    max_length=chapter_length,
+                    temperature=temperature,
+                    seed=chapter_seed
+                )
+            else:
+                chapter_text = self.generate_chapter(
+                    current_prompt,
+                    max_length=chapter_length,
+                    temperature=temperature,
+                    seed=chapter_seed
+                )
 
             # Store chapter
             chapter_data = {
                 'number': chapter_num,
                 'text': chapter_text,
                 'prompt': current_prompt,
+                'seed': chapter_seed,
                 'scene_descriptions': self.extract_scene_descriptions(chapter_text)
             }
             
             story_data['chapters'].append(chapter_data)
-            story_data['full_text'] += f"\n\n**Chapter {chapter_num}**\n{chapter_text}"
+            text_parts.append(f"\n\n**Chapter {chapter_num}**\n{chapter_text}")
 
             # Display chapter
-            print(f"\n📖 **Chapter {chapter_num}**")
-            print("-" * 40)
-            print(chapter_text)
+            telemetry.log(f"\n📖 **Chapter {chapter_num}**")
+            telemetry.log("-" * 40)
+            telemetry.log(chapter_text)
+
+            if on_chapter is not None:
+                on_chapter(chapter_data)
 
             # Prepare prompt for next chapter
             if chapter_num < num_chapters:
-                last_sentences = chapter_text.split('.')[-3:-1]
-                transition_prompt = '. '.join(last_sentences) + '. Meanwhile,'
-                current_prompt = transition_prompt
+                if context is not None:
+                    # The cached context already holds the story so far
+                    current_prompt = "\n\nMeanwhile,"
+                else:
+                    last_sentences = chapter_text.split('.')[-3:-1]
+                    transition_prompt = '. '.join(last_sentences) + '. Meanwhile,'
+                    current_prompt = transition_prompt
+
+            telemetry.log(f"✅ Chapter {chapter_num} completed!")
 
-            print(f"✅ Chapter {chapter_num} completed!")
+        story_data['full_text'] = "".join(text_parts)
+        if context is not None:
+            story_data['metadata']['context_stats'] = dict(context['stats'])
 
-        print("\n" + "=" * 60)
-        print(f"🎉 Complete story generated successfully!")
-        print(f"📊 Total chapters: {len(story_data['chapters'])}")
+        telemetry.log("\n" + "=" * 60)
+        telemetry.log(f"🎉 Complete story generated successfully!")
+        telemetry.log(f"📊 Total chapters: {len(story_data['chapters'])}")
+
+        return story_data
+
+    def _new_context(self, context_window=None):
+        """
+        Create an empty generation context for cached chapter continuation.
 
-        return story_data
\ No newline at end of file
+        Args:
+            context_window (int): Maximum number of tokens kept in context
+
+        Returns:
+            dict: Context holding the token ids so far and their attention cache
+        """
+        self._ensure_model()
+
+        model_max = self.text_generator.model.config.n_positions
+        return {
+            'input_ids': None,
+            'past_key_values': None,
+            'window': min(context_window or model_max, model_max),
+            'stats': {'prefill_tokens': 0, 'reused_tokens': 0, 'window_shifts': 0}
+        }
+
+    def _generate_continuation(self, context, prompt, max_length=200, temperature=0.8, seed=None):
+        """
+        Append a prompt to a cached context and generate the next chapter.
+
+        Only tokens not already covered by the context's attention cache are
+        run through the model. When the context would no longer fit in the
+        window, the oldest tokens are dropped until at most half the window
+        remains, and that is encoded once more; GPT-2 uses absolute position
+        embeddings, so cached keys cannot simply be trimmed from the front. The first chapter
+        starts from the prefix cache when it is enabled.
+
+        Args:
+            context (dict): Context created by _new_context()
+            prompt (str): Text appended to the context before generating
+            max_length (int): Length budget of the chapter, prompt tokens included
+            temperature (float): Sampling temperature
+            seed (int): Random seed for reproducible sampling (None for random)
+
+        Returns:
+            str: Generated chapter text
+        """
+        model = self.text_generator.model
+        tokenizer = self.text_generator.tokenizer
+        telemetry = get_telemetry()
+
+        try:
+            with telemetry.span("text.tokenize"):
+                prompt_ids = tokenizer(prompt, return_tensors='pt')['input_ids'].to(model.device)
+            max_new_tokens = max(max_length - prompt_ids.shape[1], 1)
+
+            if context['input_ids'] is None:
+                input_ids = prompt_ids
+            else:
+                input_ids = torch.cat([context['input_ids'], prompt_ids], dim=1)
+
+            past_key_values = context['past_key_values']
+            fits = context['window'] - max_new_tokens
+            if fits < 1:
+                raise ValueError("chapter_length does not fit in the context window")
+            if input_ids.shape[1] > fits:
+                # Slide by at least half the window, so the re-encoding is
+                # shared by the next few chapters instead of repeated by each
+                input_ids = input_ids[:, -min(fits, context['window'] // 2):]
+                past_key_values = None
+                context['stats']['window_shifts'] += 1
+
+            cached = context['input_ids'].shape[1] - 1 if past_key_values is not None else 0
+            context['stats']['reused_tokens'] += cached
+            context['stats']['prefill_tokens'] += input_ids.shape[1] - cached
+
+            with telemetry.span("text.decode", mode="kv_cache"), torch.no_grad():
+                if context['input_ids'] is None and self.prefix_cache is not None:
+                    # A story's first chapter often starts from a common prompt
+                    _, past_key_values = self._prefill(model, input_ids)
+                output = model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=past_key_values,
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature,
+                    pad_token_id=tokenizer.pad_token_id,
+                    do_sample=True,
+                    top_p=0.9,
+                    repetition_penalty=1.1,
+                    logits_processor=seeded_sampling(seed, model, temperature, 0.9),
+                    return_dict_in_generate=True
+                )
+
+            context['input_ids'] = output.sequences
+            context['past_key_values'] = output.past_key_values
+
+            generated = output.sequences[0, input_ids.shape[1]:]
+            telemetry.counter("text.tokens", len(generated), mode="kv_cache")
+            return tokenizer.decode(generated, skip_special_tokens=True).strip()
+
+        except Exception as e:
+            # Start over from an empty cache rather than continue from a broken one
+            context['input_ids'] = None
+            context['past_key_values'] = None
+            return f"Error generating story: {str(e)}"
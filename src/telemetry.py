@@ -0,0 +1,305 @@
+"""Timing spans, counters and log messages with pluggable sinks."""
+
+import atexit
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+class NullSink:
+    """Sink that drops every event."""
+
+    def emit(self, event):
+        """Receive an event."""
+
+    def flush(self):
+        """Write out buffered data."""
+
+    def close(self):
+        """Release resources held by the sink."""
+
+
+class PrintSink(NullSink):
+    """Sink that prints log messages to the console, like the generators always did."""
+
+    def __init__(self, show_spans=False, stream=None):
+        """
+        Initialize the print sink.
+
+        Args:
+            show_spans (bool): Also print the duration of every finished span
+            stream: File to print to (defaults to standard output)
+        """
+        self.show_spans = show_spans
+        self.stream = stream
+
+    def emit(self, event):
+        """Print log messages, and span durations if enabled."""
+        stream = self.stream or sys.stdout
+        if event['type'] == 'log':
+            print(event['message'], file=stream)
+        elif event['type'] == 'span' and self.show_spans:
+            print(f"⏱️ {event['name']}: {event['seconds']:.3f}s", file=stream)
+
+
+class JsonLinesSink(NullSink):
+    """Sink that appends every event as one JSON object per line."""
+
+    def __init__(self, path):
+        """
+        Initialize the JSON lines sink.
+
+        Args:
+            path (str): File to append events to
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, event):
+        """Write the event as a JSON line."""
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+
+    def flush(self):
+        """Flush buffered lines to disk."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusSink(NullSink):
+    """Sink that aggregates events and writes a Prometheus text exposition file.
+
+    Spans and observations become summaries (``_count`` and ``_sum``),
+    counters become counters. The file is rewritten atomically at most once
+    per interval and when the sink is flushed, so it can be picked up by the
+    node exporter's textfile collector.
+    """
+
+    def __init__(self, path, prefix="story_generator", interval=5.0):
+        """
+        Initialize the Prometheus sink.
+
+        Args:
+            path (str): Exposition file to write (conventionally ``*.prom``)
+            prefix (str): Prefix for all metric names
+            interval (float): Minimum seconds between automatic rewrites
+        """
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self._summaries = {}
+        self._counters = {}
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        """Aggregate the event and rewrite the file if the interval passed."""
+        if event['type'] == 'log':
+            return
+
+        labels = tuple(sorted((key, str(value)) for key, value in event.get('labels', {}).items()))
+        with self._lock:
+            if event['type'] == 'counter':
+                key = (self._metric_name(event['name'], 'total'), labels)
+                self._counters[key] = self._counters.get(key, 0) + event['value']
+            else:
+                value = event['seconds'] if event['type'] == 'span' else event['value']
+                suffix = 'seconds' if event['type'] == 'span' else None
+                key = (self._metric_name(event['name'], suffix), labels)
+                count, total = self._summaries.get(key, (0, 0.0))
+                self._summaries[key] = (count + 1, total + value)
+
+            due = time.monotonic() - self._last_write >= self.interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Rewrite the exposition file with the current totals."""
+        with self._lock:
+            lines = []
+            for name in sorted({name for name, _ in self._summaries}):
+                lines.append(f"# TYPE {name} summary")
+                for (metric, labels), (count, total) in sorted(self._summaries.items()):
+                    if metric == name:
+                        lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+                        lines.append(f"{name}_sum{self._format_labels(labels)} {total:.6f}")
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._format_labels(labels)} {value}")
+            self._last_write = time.monotonic()
+
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".prom", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        """Write the final totals."""
+        self.flush()
+
+    def _metric_name(self, name, suffix):
+        """Turn an event name into a valid Prometheus metric name."""
+        parts = [self.prefix, re.sub(r'[^a-zA-Z0-9_]', '_', name)]
+        if suffix:
+            parts.append(suffix)
+        return "_".join(parts)
+
+    @staticmethod
+    def _format_labels(labels):
+        """Format label pairs as {key="value",...}."""
+        if not labels:
+            return ""
+        pairs = (f'{key}="{PrometheusSink._escape_label_value(value)}"' for key, value in labels)
+        return "{" + ",".join(pairs) + "}"
+
+    @staticmethod
+    def _escape_label_value(value):
+        """Escape backslashes, double quotes and newlines, as the text exposition format requires."""
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Telemetry:
+    """Emits timed spans, counters, observations and log messages to sinks."""
+
+    def __init__(self, sinks=None):
+        """
+        Initialize telemetry.
+
+        Args:
+            sinks (list): Sinks receiving every event (defaults to a PrintSink)
+        """
+        self.sinks = list(sinks) if sinks is not None else [PrintSink()]
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time a block of code.
+
+        Exceptions raised inside the block are counted as ``exceptions`` with
+        the span name as a label, and re-raised.
+
+        Args:
+            name (str): Span name, e.g. "text.generate"
+            **labels: Extra labels; the yielded dict can be updated inside the block
+
+        Yields:
+            dict: Labels of the span
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield labels
+        except BaseException as e:
+            status = "error"
+            self.counter("exceptions", span=name, error=type(e).__name__)
+            raise
+        finally:
+            self._emit({
+                'type': 'span',
+                'name': name,
+                'seconds': time.perf_counter() - start,
+                'status': status,
+                'labels': labels
+            })
+
+    def counter(self, name, value=1, **labels):
+        """
+        Increment a counter.
+
+        Args:
+            name (str): Counter name, e.g. "image.placeholder"
+            value (int): Amount to add
+            **labels: Extra labels
+        """
+        self._emit({'type': 'counter', 'name': name, 'value': value, 'labels': labels})
+
+    def observe(self, name, value, **labels):
+        """
+        Record a measured value, such as the duration of one diffusion step.
+
+        Args:
+            name (str): Observation name
+            value (float): Measured value
+            **labels: Extra labels
+        """
+        self._emit({'type': 'observation', 'name': name, 'value': value, 'labels': labels})
+
+    def log(self, message, level="info", **labels):
+        """
+        Emit a human-readable status message.
+
+        Args:
+            message (str): Message text
+            level (str): "info", "warning" or "error"
+            **labels: Extra labels
+        """
+        self._emit({'type': 'log', 'message': message, 'level': level, 'labels': labels})
+
+    def flush(self):
+        """Flush every sink."""
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        """Flush and close every sink."""
+        for sink in self.sinks:
+            sink.close()
+
+    def _emit(self, event):
+        """Send an event to all sinks; a failing sink never breaks generation."""
+        event['time'] = time.time()
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception:
+                pass
+
+
+_telemetry = Telemetry()
+atexit.register(lambda: _telemetry.close())
+
+
+def get_telemetry():
+    """
+    Get the process-wide telemetry instance.
+
+    Returns:
+        Telemetry: Telemetry used by all generators
+    """
+    return _telemetry
+
+
+def configure_telemetry(sinks):
+    """
+    Replace the sinks of the process-wide telemetry.
+
+    Args:
+        sinks (list): New sinks; previous sinks are flushed and closed
+    """
+    _telemetry.close()
+    _telemetry.sinks = list(sinks)
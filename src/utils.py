@@ -1,21 +1,27 @@
 """Utility functions for the story generator."""
 
 import os
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 
 def configure_network_settings():
-    """Configure network settings for better model download stability."""
-    os.environ['HF_HUB_DOWNLOAD_TIMEOUT'] = '300'  # 5 minutes
-    os.environ['TOKENIZERS_PARALLELISM'] = 'false'  # Avoid warnings
+    """Configure network settings for better model download stability.
+
+    Values already set in the environment are kept, so hosts without network
+    access can shorten the timeouts (or set HF_HUB_OFFLINE=1).
+    """
+    os.environ.setdefault('HF_HUB_DOWNLOAD_TIMEOUT', '300')  # 5 minutes per read while downloading
+    os.environ.setdefault('HF_HUB_ETAG_TIMEOUT', '10')  # Fail fast on metadata checks
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')  # Avoid warnings
     
     print("✅ Network configuration applied for stable downloads")
 
 
 def configure_requests_retry():
     """Configure retry strategy for network requests."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
     session = requests.Session()
     retry_strategy = Retry(
         total=3,